@@ -0,0 +1,11 @@
+"""
+Benchmarks for django-export.
+
+Run a benchmark from the project root, e.g.::
+
+    python -m benchmarks.csv_serializer
+
+or the suite of benchmarks, see suite.py::
+
+    python -m benchmarks.suite
+"""
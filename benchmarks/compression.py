@@ -0,0 +1,49 @@
+"""
+Benchmark the throughput and compression ratio of each download codec at
+several compression levels on a streamed CSV export.
+"""
+import sys
+
+from benchmarks import utils
+utils.setup()
+
+from export import compression  # noqa
+from export import utils as export_utils  # noqa
+
+from benchmarks.models import BenchmarkObject, populate  # noqa
+
+LEVELS = {
+    'gzip': [1, 6, 9],
+    'zip': [1, 6, 9],
+    'zstd': [1, 3, 9, 19],
+}
+
+
+def main(rows=100000):
+    utils.create_tables(BenchmarkObject)
+    populate(rows)
+    queryset = BenchmarkObject.objects.order_by('pk')
+    # Compress the serialized chunks only, not the serialization.
+    chunks = list(export_utils.stream_bytes('csv', queryset))
+    size = sum(len(chunk) for chunk in chunks)
+    print('csv %d bytes uncompressed' % size)
+    for codec in compression.get_codecs():
+        for level in LEVELS[codec]:
+            def run():
+                return sum(
+                    len(chunk) for chunk in compression.compress(
+                        chunks, codec, 'export.csv', level
+                    )
+                )
+            elapsed, peak = utils.measure(run)
+            compressed = run()
+            utils.report(
+                '%s level=%s ratio=%.1f' % (
+                    codec, level, float(size) / compressed
+                ),
+                size, elapsed, peak, size=compressed, unit='bytes'
+            )
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,44 @@
+"""
+Benchmark the CSV serializer on unsaved synthetic objects, and encoding
+cells with per-column encoders against process_item().
+"""
+import sys
+
+from benchmarks import utils
+utils.setup()
+
+from django.core import serializers  # noqa
+
+from export.serializers import csv_serializer  # noqa
+
+from benchmarks.models import BenchmarkObject, make_objects  # noqa
+
+
+def main(rows=100000):
+    serializer = serializers.get_serializer('csv')()
+    elapsed, peak = utils.measure(
+        lambda: serializer.serialize(make_objects(rows))
+    )
+    utils.report('csv serializer', rows, elapsed, peak)
+    names = [field.name for field in BenchmarkObject._meta.local_fields][1:]
+    cells = rows * len(names)
+    utils.report('csv serializer', cells, elapsed, peak, unit='cells')
+
+    python_serializer = serializers.get_serializer('python')()
+    values = [
+        list(obj['fields'].values())
+        for obj in python_serializer.serialize(make_objects(rows))
+    ]
+    encoders = csv_serializer.get_encoders(BenchmarkObject, names)
+    utils.report('process_item', cells, *utils.measure(lambda: [
+        [csv_serializer.process_item(value) for value in row]
+        for row in values
+    ]), unit='cells')
+    utils.report('column encoders', cells, *utils.measure(lambda: [
+        [encode(value) for encode, value in zip(encoders, row)]
+        for row in values
+    ]), unit='cells')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,40 @@
+"""
+Benchmark constructing forms.Export for models of increasing width, the
+first form of a model computing its metadata and later forms copying it.
+"""
+import sys
+
+from benchmarks import utils
+utils.setup()
+
+from export import forms  # noqa
+
+from benchmarks.models import make_wide_model  # noqa
+
+WIDTHS = [10, 50, 150]
+
+
+def main(count=100):
+    for width in WIDTHS:
+        model = make_wide_model(width)
+
+        def first():
+            forms._metadata.clear()
+            forms.Export(model)
+
+        def later():
+            for i in range(count):
+                forms.Export(model)
+
+        utils.report(
+            'width=%s first' % width, 1, *utils.measure(first), unit='forms'
+        )
+        forms.get_metadata(model)
+        utils.report(
+            'width=%s cached' % width, count, *utils.measure(later),
+            unit='forms'
+        )
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,47 @@
+"""
+Benchmark loading a CSV export with bulk.load against saving deserialized
+objects one at a time like loaddata.
+"""
+import sys
+
+from benchmarks import utils
+utils.setup()
+
+from django.core import serializers  # noqa
+from django.db import transaction  # noqa
+
+from export import bulk  # noqa
+from export import utils as export_utils  # noqa
+
+from benchmarks.models import BenchmarkObject, populate  # noqa
+
+
+def save_each(data):
+    with transaction.atomic():
+        for deserialized in serializers.deserialize('csv', data):
+            deserialized.save()
+
+
+def main(rows=100000):
+    utils.create_tables(BenchmarkObject)
+    populate(rows)
+    data = export_utils.serialize('csv', BenchmarkObject.objects.all())
+
+    def run(load):
+        def func():
+            BenchmarkObject.objects.all().delete()
+            load()
+        return func
+
+    utils.report('csv save each', rows, *utils.measure(
+        run(lambda: save_each(data))
+    ))
+    for batch_size in [100, 1000, 10000]:
+        utils.report('csv bulk batch_size=%s' % batch_size, rows,
+                     *utils.measure(run(
+                         lambda: bulk.load('csv', data, batch_size)
+                     )))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,193 @@
+import datetime
+from decimal import Decimal
+from itertools import islice
+
+from django.db import models
+
+
+class BenchmarkObject(models.Model):
+    name = models.CharField(max_length=64)
+    description = models.TextField()
+    count = models.IntegerField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    ratio = models.FloatField()
+    active = models.BooleanField(default=True)
+    notes = models.CharField(max_length=64, null=True)
+    created = models.DateTimeField()
+
+    class Meta:
+        app_label = 'export'
+
+
+class BenchmarkCategory(models.Model):
+    name = models.CharField(max_length=64)
+
+    class Meta:
+        app_label = 'export'
+
+
+class BenchmarkTag(models.Model):
+    name = models.CharField(max_length=64)
+
+    class Meta:
+        app_label = 'export'
+
+
+class RelatedObject(models.Model):
+    """
+    A tall model with a foreign key and a many to many field.
+    """
+    name = models.CharField(max_length=64)
+    count = models.IntegerField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    active = models.BooleanField(default=True)
+    created = models.DateTimeField()
+    category = models.ForeignKey(BenchmarkCategory, on_delete=models.CASCADE)
+    tags = models.ManyToManyField(BenchmarkTag)
+
+    class Meta:
+        app_label = 'export'
+
+
+# Number of categories and tags of related objects, each object has two tags.
+CATEGORIES = 100
+TAGS = 20
+
+# Field classes cycled through by the columns of wide models.
+WIDE_FIELDS = [
+    lambda: models.CharField(max_length=64),
+    lambda: models.IntegerField(),
+    lambda: models.DecimalField(max_digits=12, decimal_places=2),
+    lambda: models.BooleanField(default=True),
+    lambda: models.DateTimeField(),
+    lambda: models.TextField(),
+]
+
+
+# Values of the columns of wide models by field class.
+WIDE_VALUES = {
+    models.CharField: lambda i: 'value %s' % i,
+    models.IntegerField: lambda i: i,
+    models.DecimalField: lambda i: Decimal('%s.25' % i),
+    models.BooleanField: lambda i: bool(i % 2),
+    models.DateTimeField: lambda i: datetime.datetime(2017, 1, 1),
+    models.TextField: lambda i: 'text',
+}
+
+
+def make_wide_model(width, related=False):
+    """
+    Return a model with width columns of various field types, and a foreign
+    key to BenchmarkCategory and many to many field to BenchmarkTag if
+    related.
+    """
+    name = 'WideObject%s' % width
+    attrs = {
+        '__module__': __name__,
+        'Meta': type('Meta', (), {'app_label': 'export'}),
+    }
+    for i in range(width):
+        attrs['column%s' % i] = WIDE_FIELDS[i % len(WIDE_FIELDS)]()
+    if related:
+        name = 'RelatedWideObject%s' % width
+        attrs['category'] = models.ForeignKey(
+            BenchmarkCategory, on_delete=models.CASCADE,
+            related_name='%s_set' % name.lower()
+        )
+        attrs['tags'] = models.ManyToManyField(
+            BenchmarkTag, related_name='%s_set' % name.lower()
+        )
+    return type(name, (models.Model,), attrs)
+
+
+def make_objects(count):
+    created = datetime.datetime(2017, 1, 1)
+    for i in range(count):
+        yield BenchmarkObject(
+            pk=i + 1,
+            name='object %s' % i,
+            description='[description]' if i % 10 == 0 else 'description',
+            count=i,
+            amount=Decimal('%s.25' % i),
+            ratio=i / 3.0,
+            active=bool(i % 2),
+            notes=None if i % 3 else 'NULL',
+            created=created,
+        )
+
+
+def populate(count, batch_size=10000):
+    bulk_insert(BenchmarkObject, make_objects(count), batch_size)
+
+
+def bulk_insert(model, objects, batch_size=10000):
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            break
+        model.objects.bulk_create(batch)
+
+
+def make_related_objects(count):
+    created = datetime.datetime(2017, 1, 1)
+    for i in range(count):
+        yield RelatedObject(
+            pk=i + 1,
+            name='object %s' % i,
+            count=i,
+            amount=Decimal('%s.25' % i),
+            active=bool(i % 2),
+            created=created + datetime.timedelta(minutes=i),
+            category_id=i % CATEGORIES + 1,
+        )
+
+
+def make_wide_objects(model, count):
+    columns = [
+        (field.attname, WIDE_VALUES[field.__class__])
+        for field in model._meta.local_fields
+        if field.__class__ in WIDE_VALUES
+    ]
+    for i in range(count):
+        obj = model(pk=i + 1, **dict(
+            (attname, value(i)) for attname, value in columns
+        ))
+        if hasattr(obj, 'category_id'):
+            obj.category_id = i % CATEGORIES + 1
+        yield obj
+
+
+def make_tags(model, count):
+    """
+    Yield the many to many rows tagging count objects of model with two tags
+    each.
+    """
+    field = model._meta.get_field('tags')
+    through = field.remote_field.through
+    source = through._meta.get_field(field.m2m_field_name()).attname
+    target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+    for i in range(count):
+        yield through(**{source: i + 1, target: i % TAGS + 1})
+        yield through(**{source: i + 1, target: (i + TAGS // 2) % TAGS + 1})
+
+
+def populate_related(model, count, batch_size=10000):
+    """
+    Populate the categories and tags, and count objects of model, either
+    RelatedObject or a related wide model.
+    """
+    if not BenchmarkCategory.objects.exists():
+        BenchmarkCategory.objects.bulk_create([
+            BenchmarkCategory(pk=i + 1, name='category %s' % i)
+            for i in range(CATEGORIES)
+        ])
+        BenchmarkTag.objects.bulk_create([
+            BenchmarkTag(pk=i + 1, name='tag %s' % i) for i in range(TAGS)
+        ])
+    if model is RelatedObject:
+        objects = make_related_objects(count)
+    else:
+        objects = make_wide_objects(model, count)
+    bulk_insert(model, objects, batch_size)
+    through = model._meta.get_field('tags').remote_field.through
+    bulk_insert(through, make_tags(model, count), batch_size)
@@ -0,0 +1,34 @@
+"""
+Benchmark parallel.serialize across increasing numbers of worker processes
+against serializing in a single process.
+"""
+import sys
+
+from benchmarks import utils
+utils.setup()
+
+from export import parallel  # noqa
+
+from benchmarks.models import BenchmarkObject, populate  # noqa
+
+FORMATS = ['csv', 'json']
+
+PROCESSES = [1, 2, 4, 8]
+
+
+def main(rows=100000):
+    utils.create_tables(BenchmarkObject)
+    populate(rows)
+    queryset = BenchmarkObject.objects.order_by('pk')
+    for format in FORMATS:
+        for processes in PROCESSES:
+            utils.report(
+                '%s processes=%s' % (format, processes), rows,
+                *utils.measure(lambda: parallel.serialize(
+                    format, queryset, processes=processes
+                ))
+            )
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
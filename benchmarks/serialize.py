@@ -0,0 +1,46 @@
+"""
+Benchmark utils.serialize from model instances and from values_list() rows,
+and indented against compact output.
+"""
+import sys
+
+from benchmarks import utils
+utils.setup()
+
+from export import utils as export_utils  # noqa
+
+from benchmarks.models import BenchmarkObject, populate  # noqa
+
+FORMATS = ['csv', 'json', 'python']
+
+INDENTED_FORMATS = ['json', 'xml', 'yaml']
+
+
+def main(rows=100000):
+    utils.create_tables(BenchmarkObject)
+    populate(rows)
+    queryset = BenchmarkObject.objects.order_by('pk')
+    fields = [field.name for field in BenchmarkObject._meta.fields]
+    for format in FORMATS:
+        # A generator of instances can't be serialized from values.
+        utils.report('%s instances' % format, rows, *utils.measure(
+            lambda: export_utils.serialize(
+                format, export_utils.iter_objects(queryset), fields
+            )
+        ))
+        utils.report('%s values' % format, rows, *utils.measure(
+            lambda: export_utils.serialize(format, queryset, fields)
+        ))
+    for format in INDENTED_FORMATS:
+        for indent in [4, None]:
+            def run():
+                return export_utils.serialize(format, queryset, indent=indent)
+            elapsed, peak = utils.measure(run)
+            utils.report(
+                '%s indent=%s' % (format, indent), rows, elapsed, peak,
+                size=len(run())
+            )
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
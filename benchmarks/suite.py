@@ -0,0 +1,278 @@
+"""
+Benchmark suite measuring the throughput, peak memory and number of queries
+of exports of synthetic tall and wide models with foreign key, many to many,
+decimal and datetime fields.
+
+Every serializer format is exported, from a queryset and streamed, as are
+the objects matched by combinations of export form filters, forms are
+constructed and exports are mailed as export jobs. The wide model has rows
+divided by 10 objects. Results are printed and written as JSON for
+comparing runs, e.g.::
+
+    python -m benchmarks.suite --rows 10000 --rows 100000 -o before.json
+    python -m benchmarks.suite --rows 10000 --rows 100000 -o after.json
+    python -m benchmarks.suite --compare before.json after.json
+"""
+import argparse
+import datetime
+import json
+import platform
+import shutil
+import tempfile
+from collections import OrderedDict
+
+from benchmarks import utils
+utils.setup()
+
+import django  # noqa
+from django.core import mail, serializers  # noqa
+from django.test.utils import override_settings  # noqa
+
+from export import forms, jobs  # noqa
+from export import utils as export_utils  # noqa
+
+from benchmarks.models import (  # noqa
+    BenchmarkCategory, BenchmarkTag, RelatedObject, make_wide_model,
+    populate_related
+)
+
+ROWS = 10000
+
+WIDTH = 100
+
+# Formats mailed in parts written to storage and joined, and streamed in one
+# go.
+MAIL_FORMATS = ['csv', 'json', 'xml']
+
+FORM_COUNT = 100
+
+# Relative change in a result's elapsed time or peak memory --compare flags.
+THRESHOLD = 0.1
+
+
+def get_filters(rows):
+    """
+    Return export form filter data of RelatedObject by name, matching about
+    half of rows objects on each filter. Decimal range filters don't
+    validate and aren't included.
+    """
+    half = rows // 2
+    middle = datetime.datetime(2017, 1, 1) + datetime.timedelta(minutes=half)
+    filters = OrderedDict([
+        ('text', {'name': 'object 1'}),
+        ('integer', {'count_0': '0', 'count_1': str(half)}),
+        ('datetime', {
+            'created_0': '2017-01-01', 'created_1': '00:00:00',
+            'created_2': middle.strftime('%Y-%m-%d'),
+            'created_3': middle.strftime('%H:%M:%S'),
+        }),
+        ('boolean', {'active': 'True'}),
+        ('foreign key', {'category': [str(pk) for pk in range(1, 51)]}),
+    ])
+    combined = {}
+    for data in filters.values():
+        combined.update(data)
+    filters['all'] = combined
+    return filters
+
+
+def get_size(data):
+    if isinstance(data, (bytes, type(u''))):
+        return len(data)
+    return None
+
+
+class Suite(object):
+
+    def __init__(self):
+        self.results = []
+        self.model = None
+
+    def run(self, name, model, count, func, unit='rows', rows=None):
+        """
+        Profile func, exporting count units of model's table of rows
+        objects. func returns the size of its output or data to measure.
+        """
+        if model is not self.model:
+            self.model = model
+            print(model._meta.object_name)
+        elapsed, peak, queries, result = utils.profile(func)
+        if not isinstance(result, int) or isinstance(result, bool):
+            result = get_size(result)
+        rows = count if rows is None else rows
+        self.results.append(OrderedDict([
+            ('name', name),
+            ('model', model._meta.object_name),
+            ('rows', rows),
+            ('count', count),
+            ('unit', unit),
+            ('elapsed', elapsed),
+            ('rate', count / elapsed if elapsed else None),
+            ('peak', peak),
+            ('queries', queries),
+            ('size', result),
+        ]))
+        utils.report(
+            name, count, elapsed, peak, size=result, unit=unit,
+            queries=queries
+        )
+
+    def formats(self, model, rows):
+        queryset = model.objects.order_by('pk')
+        for format in serializers.get_serializer_formats():
+            self.run('serialize %s' % format, model, rows, lambda: (
+                export_utils.serialize(format, queryset)
+            ))
+            self.run('stream %s' % format, model, rows, lambda: sum(
+                len(chunk)
+                for chunk in export_utils.stream_bytes(format, queryset)
+            ))
+
+    def filters(self, model, rows):
+        for name, data in get_filters(rows).items():
+            form = forms.Export(model, dict(data, export_format='csv'))
+            assert form.is_valid(), form.errors
+            queryset = export_utils.get_queryset(form, model)
+            self.run(
+                'filter %s' % name, model, queryset.count(),
+                lambda: export_utils.serialize('csv', queryset), rows=rows
+            )
+
+    def forms(self, model, rows, data=None):
+        def first():
+            forms._metadata.clear()
+            forms.Export(model)
+
+        def later():
+            for i in range(FORM_COUNT):
+                forms.Export(model)
+
+        def bound():
+            for i in range(FORM_COUNT):
+                forms.Export(model, data).is_valid()
+
+        self.run('form first', model, 1, first, unit='forms', rows=rows)
+        forms.get_metadata(model)
+        self.run(
+            'form cached', model, FORM_COUNT, later, unit='forms', rows=rows
+        )
+        if data is not None:
+            self.run(
+                'form bound', model, FORM_COUNT, bound, unit='forms',
+                rows=rows
+            )
+
+    def mail(self, model, rows):
+        for format in MAIL_FORMATS:
+            form = forms.Export(model, {'export_format': format})
+            assert form.is_valid(), form.errors
+
+            def run():
+                job = jobs.create_job(
+                    form, model, None, 'export@example.com',
+                    'export.%s' % format
+                )
+                jobs.run_job(job.pk)
+                name, content, mimetype = mail.outbox.pop().attachments[0]
+                return len(content)
+
+            self.run('mail %s' % format, model, rows, run)
+
+    def main(self, sizes, width=WIDTH):
+        wide_model = make_wide_model(width, related=True)
+        for rows in sizes:
+            print('%s rows, %s of width %s' % (rows, rows // 10, width))
+            utils.create_tables(
+                BenchmarkCategory, BenchmarkTag, RelatedObject, wide_model
+            )
+            populate_related(RelatedObject, rows)
+            populate_related(wide_model, rows // 10)
+
+            self.formats(RelatedObject, rows)
+            self.formats(wide_model, rows // 10)
+            self.filters(RelatedObject, rows)
+            self.forms(RelatedObject, rows, get_filters(rows)['all'])
+            self.forms(wide_model, rows // 10)
+            self.mail(RelatedObject, rows)
+            self.mail(wide_model, rows // 10)
+
+            utils.drop_tables(
+                RelatedObject, wide_model, BenchmarkCategory, BenchmarkTag
+            )
+        return OrderedDict([
+            ('created', datetime.datetime.now().isoformat()),
+            ('python', platform.python_version()),
+            ('django', django.get_version()),
+            ('results', self.results),
+        ])
+
+
+def get_key(result):
+    return result['name'], result['model'], result['rows']
+
+
+def compare(before, after, threshold=THRESHOLD):
+    """
+    Print the relative change of each result of run after present in run
+    before, flagging changes of elapsed time or peak memory above threshold.
+    """
+    results = dict(
+        (get_key(result), result) for result in before['results']
+    )
+    for result in after['results']:
+        previous = results.get(get_key(result))
+        if previous is None:
+            continue
+        line = '%-40s %8d' % (
+            '%s %s' % (result['model'], result['name']), result['rows']
+        )
+        flagged = False
+        for measure in ['elapsed', 'peak', 'queries']:
+            if not previous[measure] or result[measure] is None:
+                continue
+            change = float(result[measure]) / previous[measure] - 1
+            line += ' %s %+7.1f%%' % (measure, change * 100)
+            flagged = flagged or (
+                measure != 'queries' and abs(change) > threshold
+            ) or (measure == 'queries' and change)
+        print('%s%s' % ('* ' if flagged else '  ', line))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument(
+        '--rows', type=int, action='append',
+        help='Number of tall model objects, may be repeated. Defaults to %s.'
+        % ROWS
+    )
+    parser.add_argument('--width', type=int, default=WIDTH)
+    parser.add_argument('-o', '--output', help='Write the results to a file.')
+    parser.add_argument(
+        '--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+        help='Compare the results of two runs instead of running.'
+    )
+    options = parser.parse_args(args)
+    if options.compare:
+        before, after = [
+            json.load(open(name)) for name in options.compare
+        ]
+        compare(before, after)
+        return
+
+    media_root = tempfile.mkdtemp()
+    try:
+        with override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+            MEDIA_ROOT=media_root
+        ):
+            mail.outbox = []
+            results = Suite().main(options.rows or [ROWS], options.width)
+    finally:
+        shutil.rmtree(media_root)
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+Benchmark UnicodeWriter on synthetic rows.
+"""
+import sys
+
+from benchmarks import utils
+utils.setup()
+
+from django.utils.six import StringIO  # noqa
+
+from export.serializers.csv_serializer import UnicodeWriter  # noqa
+
+
+def make_rows(count):
+    return [
+        [u'%s' % i, u'export.benchmarkobject', u'object %s' % i,
+         u'description', u'%s' % i, u'%s.25' % i, u'TRUE', u'NULL']
+        for i in range(count)
+    ]
+
+
+def main(rows=1000000):
+    data = make_rows(rows)
+
+    def writerow():
+        writer = UnicodeWriter(StringIO())
+        for row in data:
+            writer.writerow(row)
+
+    def writerows():
+        UnicodeWriter(StringIO()).writerows(data)
+
+    utils.report('UnicodeWriter.writerow', rows, *utils.measure(writerow))
+    utils.report('UnicodeWriter.writerows', rows, *utils.measure(writerows))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
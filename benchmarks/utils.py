@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import django
+
+
+def setup():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'test_settings')
+    django.setup()
+
+
+def create_tables(*models):
+    """
+    Create the tables of models in the test settings' in-memory database.
+    """
+    from django.core.management import call_command
+    from django.db import connection
+    call_command('migrate', verbosity=0)
+    with connection.schema_editor() as editor:
+        for model in models:
+            editor.create_model(model)
+
+
+def drop_tables(*models):
+    from django.db import connection
+    with connection.schema_editor() as editor:
+        for model in models:
+            editor.delete_model(model)
+
+
+def trace(func):
+    """
+    Return the peak memory allocated while calling func in bytes, or None if
+    tracemalloc is not available.
+    """
+    if tracemalloc is None:
+        return None
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def measure(func):
+    """
+    Return the time taken in seconds to call func and the peak memory
+    allocated during a second call in bytes, or None if tracemalloc is not
+    available. Memory is traced separately since tracing slows down the call.
+    """
+    start = time.time()
+    func()
+    elapsed = time.time() - start
+    return elapsed, trace(func)
+
+
+def profile(func):
+    """
+    Like measure() also return the number of queries run by func and its
+    result, both from the timed call.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    with CaptureQueriesContext(connection) as queries:
+        start = time.time()
+        result = func()
+        elapsed = time.time() - start
+    return elapsed, trace(func), len(queries), result
+
+
+def report(name, rows, elapsed, peak, size=None, unit='rows',
+           queries=None):
+    line = '%-30s %10d %s %8.3fs %12.0f %s/s' % (
+        name, rows, unit, elapsed, rows / elapsed, unit
+    )
+    if peak is not None:
+        line += ' %8.1f MiB peak' % (peak / 1024.0 / 1024.0)
+    if size is not None:
+        line += ' %8.1f MiB output' % (size / 1024.0 / 1024.0)
+    if queries is not None:
+        line += ' %6d queries' % queries
+    print(line)
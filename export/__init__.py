@@ -1,6 +1,11 @@
 import mimetypes
 
-# Add YAML mimetype.
+# Add YAML, JSON Lines, Arrow and Parquet mimetypes.
 if not mimetypes.inited:
     mimetypes.init()
 mimetypes.add_type('text/x-yaml', '.yaml')
+mimetypes.add_type('application/x-ndjson', '.jsonl')
+mimetypes.add_type('application/vnd.apache.arrow.file', '.arrow')
+mimetypes.add_type('application/vnd.apache.parquet', '.parquet')
+
+default_app_config = 'export.apps.ExportConfig'
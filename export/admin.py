@@ -0,0 +1,48 @@
+from django.contrib import admin
+
+from export import jobs, tools
+from export.models import ExportJob
+
+
+def resume_jobs(modeladmin, request, queryset):
+    for job in jobs.get_resumable(queryset):
+        tools.Export(job.content_type.model_class()).start_job(job)
+
+
+resume_jobs.short_description = 'Resume selected export jobs'
+
+
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'filename', 'user', 'status', 'progress', 'rows_processed',
+        'bytes_written', 'created', 'updated'
+    )
+    list_filter = ('status', 'content_type')
+    actions = [resume_jobs]
+    readonly_fields = [
+        field.name for field in ExportJob._meta.fields
+    ] + ['progress']
+
+    def progress(self, obj):
+        if not obj.total:
+            return '100%' if obj.status == ExportJob.DONE else '-'
+        return '%d%%' % (100 * obj.rows_processed // obj.total)
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_running(self, request):
+        return self.get_queryset(request).filter(
+            status__in=[ExportJob.PENDING, ExportJob.RUNNING]
+        ).exists()
+
+    def changelist_view(self, request, extra_context=None):
+        # The change list refreshes itself while jobs are running.
+        extra_context = dict(extra_context or {})
+        extra_context['refresh'] = self.get_running(request)
+        return super(ExportJobAdmin, self).changelist_view(
+            request, extra_context
+        )
+
+
+admin.site.register(ExportJob, ExportJobAdmin)
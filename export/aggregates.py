@@ -0,0 +1,125 @@
+"""
+Summarize exports with aggregates computed by the database.
+
+Aggregate exports group the exported objects on the selected fields and
+serialize one row per group with the selected aggregates, computed with a
+values().annotate() query, instead of the objects themselves. Aggregates are
+named like Django's default aliases, e.g. ``amount__sum``, ``pk__count``
+counts the objects of each group. Rows are serialized like objects without
+a primary key.
+"""
+from collections import OrderedDict
+
+from django.core import serializers
+from django.db.models import Avg, Count, Max, Min, Sum
+from django.db.models.constants import LOOKUP_SEP
+
+from export import fields, metrics, relations, utils, values
+
+# Aggregate functions over numeric fields, with their labels.
+FUNCTIONS = OrderedDict([
+    ('sum', (Sum, 'Sum')),
+    ('avg', (Avg, 'Average')),
+    ('min', (Min, 'Minimum')),
+    ('max', (Max, 'Maximum')),
+])
+
+COUNT = 'pk%scount' % LOOKUP_SEP
+
+# Filter fields of the numeric fields that can be aggregated.
+NUMERIC_FIELDS = (fields.IntegerField, fields.DecimalField, fields.FloatField)
+
+# Serializers aggregates can be serialized with, the ones serialized from
+# values except the columnar serializers, whose columns are typed from model
+# fields.
+AGGREGATE_SERIALIZER_MODULES = (
+    'django.core.serializers.json',
+    'django.core.serializers.python',
+    'django.core.serializers.pyyaml',
+    'export.serializers.csv_serializer',
+    'export.serializers.jsonl_serializer',
+)
+
+
+def get_choices(field):
+    """
+    Return (alias, label) choices of the aggregates of a numeric field.
+    """
+    return [
+        (
+            '%s%s%s' % (field.name, LOOKUP_SEP, name),
+            '%s of %s' % (label, field.verbose_name)
+        )
+        for name, (function, label) in FUNCTIONS.items()
+    ]
+
+
+def get_group_by(cleaned_data):
+    return cleaned_data.get('export_group_by') or []
+
+
+def get_aggregates(cleaned_data):
+    """
+    Return the aliases of the aggregates selected in the cleaned data of an
+    export form, counting objects if only fields to group on are selected.
+    """
+    aggregates = cleaned_data.get('export_aggregates') or []
+    if not aggregates and get_group_by(cleaned_data):
+        return [COUNT]
+    return aggregates
+
+
+def is_aggregate(cleaned_data):
+    return bool(get_aggregates(cleaned_data))
+
+
+def get_expression(alias):
+    name, function = alias.rsplit(LOOKUP_SEP, 1)
+    if alias == COUNT:
+        return Count(name)
+    return FUNCTIONS[function][0](name)
+
+
+def get_rows(queryset, group_by, aggregates):
+    """
+    Return the rows of values of the group_by fields followed by the
+    aggregates of queryset for each group, ordered on the group_by fields.
+    Without fields to group on the whole queryset is aggregated into one row.
+    """
+    annotations = OrderedDict(
+        (alias, get_expression(alias)) for alias in aggregates
+    )
+    # Clear the ordering first, ordering fields are grouped on too.
+    queryset = queryset.order_by()
+    if not group_by:
+        result = queryset.aggregate(**annotations)
+        return [tuple(result[alias] for alias in aggregates)]
+    queryset = queryset.values(*group_by).annotate(**annotations)
+    return list(
+        queryset.order_by(*group_by).values_list(*(group_by + aggregates))
+    )
+
+
+def can_serialize(format):
+    module = serializers.get_serializer(format).__module__
+    return module in AGGREGATE_SERIALIZER_MODULES
+
+
+def serialize(format, queryset, group_by, aggregates, indent=4):
+    """
+    Serialize the aggregates of queryset grouped on the group_by fields in
+    format.
+    """
+    model = queryset.model
+    group_by, aggregates = list(group_by), list(aggregates)
+    rows = [(None,) + row for row in get_rows(queryset, group_by, aggregates)]
+    metrics.add_rows(len(rows))
+    columns = [
+        (name, name,
+         values.get_export_converter(relations.get_field(model, name)))
+        for name in group_by
+    ] + [
+        (alias, alias, values.value_to_text) for alias in aggregates
+    ]
+    options = utils.get_serializer_options(format, rows, indent=indent)
+    return values.serialize(format, model, rows, columns, **options)
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class ExportConfig(AppConfig):
+    name = 'export'
+
+    def ready(self):
+        from export import cache
+        cache.connect_signals()
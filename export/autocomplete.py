@@ -0,0 +1,70 @@
+"""
+Search the objects related model filters can be set to, a page at a time.
+
+Objects are matched on a prefix of their search field, the first indexed or
+unique CharField of the related model, else its first CharField. The match
+is case sensitive so databases can use the index for it. Models without a
+CharField are matched on their primary key.
+"""
+from django.conf import settings
+from django.db import models
+
+# Default number of objects per page, override with the
+# EXPORT_AUTOCOMPLETE_PAGE_SIZE setting.
+PAGE_SIZE = 20
+
+
+def get_page_size():
+    return getattr(settings, 'EXPORT_AUTOCOMPLETE_PAGE_SIZE', PAGE_SIZE)
+
+
+def get_search_field(model):
+    """
+    Return the name of the field objects of model are searched on, None if
+    it has none.
+    """
+    char_fields = [
+        field for field in model._meta.fields
+        if isinstance(field, models.CharField)
+    ]
+    for field in char_fields:
+        if field.db_index or field.unique:
+            return field.name
+    if char_fields:
+        return char_fields[0].name
+    return None
+
+
+def search(field, term, page=1):
+    """
+    Return a list of {'id': value, 'text': label} dicts for page of the
+    objects of model choice field matching term, and whether there are more
+    pages.
+    """
+    queryset = field.queryset.all()
+    search_field = get_search_field(queryset.model)
+    if search_field is None:
+        if term:
+            try:
+                queryset = queryset.filter(pk=term)
+            except (ValueError, TypeError):
+                queryset = queryset.none()
+        queryset = queryset.order_by('pk')
+    else:
+        if term:
+            queryset = queryset.filter(
+                **{'%s__startswith' % search_field: term}
+            )
+        queryset = queryset.order_by(search_field, 'pk')
+
+    page_size = get_page_size()
+    start = (page - 1) * page_size
+    objects = list(queryset[start:start + page_size + 1])
+    results = [
+        {
+            'id': field.prepare_value(obj),
+            'text': field.label_from_instance(obj)
+        }
+        for obj in objects[:page_size]
+    ]
+    return results, len(objects) > page_size
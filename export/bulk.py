@@ -0,0 +1,97 @@
+"""
+Load serialized exports into the database in bulk.
+
+loaddata saves deserialized objects one at a time, with a query or more per
+object. The bulk loader collects the objects deserialized from a stream into
+batches of EXPORT_LOAD_BATCH_SIZE objects per model, inserted with one
+bulk_create() each along with their many to many relations.
+
+Unlike loaddata objects are only inserted, existing objects aren't updated,
+and save() isn't called nor are signals sent. Objects of models inheriting
+from concrete models can't be bulk created and are saved one at a time.
+"""
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core import serializers
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+# Default number of objects of a model inserted at a time, override with the
+# EXPORT_LOAD_BATCH_SIZE setting.
+BATCH_SIZE = 1000
+
+
+def get_batch_size():
+    return getattr(settings, 'EXPORT_LOAD_BATCH_SIZE', BATCH_SIZE)
+
+
+def can_bulk_create(model):
+    return not model._meta.parents
+
+
+def insert(model, batch, using):
+    """
+    Insert the objects of model deserialized in batch and their many to many
+    relations.
+    """
+    model._base_manager.using(using).bulk_create(
+        [deserialized.object for deserialized in batch]
+    )
+    for field in model._meta.many_to_many:
+        through = field.remote_field.through
+        if not through._meta.auto_created:
+            continue
+        source = through._meta.get_field(field.m2m_field_name()).attname
+        target = through._meta.get_field(field.m2m_reverse_field_name())
+        rows = [
+            through(**{source: deserialized.object.pk, target.attname: pk})
+            for deserialized in batch
+            for pk in (deserialized.m2m_data or {}).get(field.name, [])
+        ]
+        through._base_manager.using(using).bulk_create(rows)
+
+
+def load(format, stream_or_string, batch_size=None, using=DEFAULT_DB_ALIAS,
+         **options):
+    """
+    Deserialize the objects of stream_or_string in format and insert them
+    in batches of batch_size objects per model, EXPORT_LOAD_BATCH_SIZE by
+    default. Return the number of objects loaded.
+    """
+    batch_size = batch_size or get_batch_size()
+    connection = connections[using]
+    batches = OrderedDict()
+    models = set()
+    count = 0
+    with transaction.atomic(using=using):
+        # Objects may refer to objects in later batches, constraints are
+        # checked once all are inserted like loaddata does.
+        with connection.constraint_checks_disabled():
+            objects = serializers.deserialize(
+                format, stream_or_string, using=using, **options
+            )
+            for deserialized in objects:
+                model = deserialized.object.__class__
+                models.add(model)
+                count += 1
+                if not can_bulk_create(model):
+                    deserialized.save(using=using)
+                    continue
+                batch = batches.setdefault(model, [])
+                batch.append(deserialized)
+                if len(batch) >= batch_size:
+                    insert(model, batches.pop(model), using)
+            for model, batch in batches.items():
+                insert(model, batch, using)
+
+        connection.check_constraints(
+            table_names=[model._meta.db_table for model in models]
+        )
+        # Primary keys were inserted explicitly.
+        sequence_sql = connection.ops.sequence_reset_sql(no_style(), models)
+        if sequence_sql:
+            with connection.cursor() as cursor:
+                for line in sequence_sql:
+                    cursor.execute(line)
+    return count
@@ -0,0 +1,187 @@
+"""
+Cache serialized exports keyed by a fingerprint of the export form data.
+
+Results are stored in the Django cache named by the EXPORT_CACHE setting for
+EXPORT_CACHE_TIMEOUT seconds, eviction of least recently used entries is
+left to the cache backend. Exports larger than EXPORT_CACHE_MAX_SIZE bytes
+are not cached.
+
+Every model has a generation, a random token included in the keys of its
+cached exports, which is replaced whenever an object of the model is saved
+or deleted, or its many to many relations change. Exports with fields of
+related objects, or grouped on them, include the generations of their
+models too. Changes that don't send signals, like QuerySet.update(), are
+only picked up once entries expire.
+"""
+import datetime
+import hashlib
+import json
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Model
+from django.db.models.query import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils import six
+from django.utils.encoding import force_bytes, force_text
+
+from export import relations
+
+# Default number of seconds exports are cached for, override with the
+# EXPORT_CACHE_TIMEOUT setting.
+TIMEOUT = 5 * 60
+
+# Default size in bytes of the largest export cached, override with the
+# EXPORT_CACHE_MAX_SIZE setting.
+MAX_SIZE = 10 * 1024 * 1024
+
+
+def get_cache():
+    """
+    Return the cache exports are stored in, None if caching is disabled.
+    """
+    alias = getattr(settings, 'EXPORT_CACHE', None)
+    if alias is None:
+        return None
+    return caches[alias]
+
+
+def get_timeout():
+    return getattr(settings, 'EXPORT_CACHE_TIMEOUT', TIMEOUT)
+
+
+def get_max_size():
+    return getattr(settings, 'EXPORT_CACHE_MAX_SIZE', MAX_SIZE)
+
+
+def _generation_key(model):
+    return 'export:generation:%s' % model._meta.label_lower
+
+
+def get_generation(cache, model):
+    key = _generation_key(model)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        generation = cache.get(key)
+    return generation
+
+
+def invalidate(model):
+    cache = get_cache()
+    if cache is not None:
+        cache.set(_generation_key(model), uuid.uuid4().hex, None)
+
+
+def _canonical(value):
+    # Reduce form values to JSON serializable values that compare equal
+    # for equal filters.
+    if isinstance(value, QuerySet):
+        pks = value.values_list('pk', flat=True)
+        return sorted(force_text(pk) for pk in pks)
+    if isinstance(value, Model):
+        return force_text(value.pk)
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return force_text(value)
+    if value is None or isinstance(value, (bool, float) + six.integer_types):
+        return value
+    return force_text(value)
+
+
+def fingerprint(model, cleaned_data):
+    """
+    Return a digest of model and the cleaned data of an export form.
+    """
+    data = dict(
+        (name, _canonical(value)) for name, value in cleaned_data.items()
+    )
+    # The serializer orders fields as the model does.
+    data['export_fields'] = sorted(data.get('export_fields') or [])
+    # Cached exports are compressed when they are sent.
+    data.pop('export_compression', None)
+    data['model'] = model._meta.label_lower
+    return hashlib.sha1(
+        force_bytes(json.dumps(data, sort_keys=True))
+    ).hexdigest()
+
+
+def get_models(model, cleaned_data):
+    """
+    Return model followed by the models of related objects exported, or
+    grouped on, by relation paths.
+    """
+    models = [model]
+    names = (cleaned_data.get('export_fields') or []) + \
+        (cleaned_data.get('export_group_by') or [])
+    for name in names:
+        if relations.is_path(name):
+            for field in relations.get_path_fields(model, name)[1:]:
+                if field.model not in models:
+                    models.append(field.model)
+    return models
+
+
+def get_key(model, cleaned_data):
+    """
+    Return the cache key of the export of model for cleaned_data, None if
+    caching is disabled. The key includes the current generations of the
+    models exported, get it before running the export's queries so the
+    export is stored under the generations it was read at.
+    """
+    cache = get_cache()
+    if cache is None:
+        return None
+    # Exports with fields of related objects are invalidated with them.
+    generations = [
+        get_generation(cache, related_model)
+        for related_model in get_models(model, cleaned_data)
+    ]
+    return 'export:result:%s:%s:%s' % (
+        model._meta.label_lower, '-'.join(generations),
+        fingerprint(model, cleaned_data)
+    )
+
+
+def get_result(key):
+    """
+    Return the cached export for key, None if it isn't cached.
+    """
+    if key is None:
+        return None
+    return get_cache().get(key)
+
+
+def set_result(key, data):
+    """
+    Cache the serialized export data under key. Only string data, not
+    python objects, is cached.
+    """
+    if key is None or not isinstance(data, (bytes, six.text_type)) or \
+            len(data) > get_max_size():
+        return
+    get_cache().set(key, data, get_timeout())
+
+
+def _invalidate_sender(sender, **kwargs):
+    if get_cache() is not None:
+        # Exports of parent models include fields of child objects.
+        for model in [sender] + list(sender._meta.get_parent_list()):
+            invalidate(model)
+
+
+def _invalidate_m2m(sender, instance, action, model, **kwargs):
+    if get_cache() is not None and action.startswith('post_'):
+        invalidate(instance.__class__)
+        invalidate(model)
+
+
+def connect_signals():
+    post_save.connect(_invalidate_sender, dispatch_uid='export.cache')
+    post_delete.connect(_invalidate_sender, dispatch_uid='export.cache')
+    m2m_changed.connect(_invalidate_m2m, dispatch_uid='export.cache')
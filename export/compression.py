@@ -0,0 +1,174 @@
+"""
+Compress downloads as they are streamed.
+
+Encoders compress the chunks of bytes of a serialized export into the
+chunks of a gzip file, a zip archive or a Zstandard frame, a chunk at a time
+so streamed downloads stay streamed. Compressed downloads are sent as files
+of their compressed type, named with its extension, rather than with a
+Content-Encoding, which would have clients decompress them on the fly.
+
+zstd compression requires the zstandard package.
+"""
+import sys
+import tempfile
+import zipfile
+import zlib
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils import six
+from django.utils.encoding import force_bytes
+
+from export import utils
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Default compression level of each codec, override with the
+# EXPORT_COMPRESSION_LEVELS setting, e.g. {'gzip': 1}.
+LEVELS = {
+    'gzip': 6,
+    'zip': 6,
+    'zstd': 3,
+}
+
+# Extensions appended to the names of compressed downloads.
+EXTENSIONS = {
+    'gzip': 'gz',
+    'zip': 'zip',
+    'zstd': 'zst',
+}
+
+CONTENT_TYPES = {
+    'gzip': 'application/gzip',
+    'zip': 'application/zip',
+    'zstd': 'application/zstd',
+}
+
+
+def get_level(codec):
+    levels = getattr(settings, 'EXPORT_COMPRESSION_LEVELS', {})
+    return levels.get(codec, LEVELS[codec])
+
+
+def iter_bytes(data):
+    """
+    Yield the chunks of serialized data, a string or an iterable of chunks,
+    as bytes the way HttpResponse converts them.
+    """
+    if isinstance(data, (bytes, six.text_type)):
+        data = [data]
+    for chunk in data:
+        yield force_bytes(chunk)
+
+
+def gzip_encoder(data, filename, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in data:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+class _ZipStream(object):
+    """
+    Unseekable file collecting what a zip file writes to it, the zipfile
+    module writes data descriptors instead of seeking back.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def zip_encoder(data, filename, level):
+    if sys.version_info < (3, 6):
+        # Archive members can't be written to incrementally, archive the
+        # data in a temporary file and stream that.
+        with tempfile.SpooledTemporaryFile(max_size=utils.SPOOL_SIZE) as f:
+            utils.write_zip(f, filename, data)
+            f.seek(0)
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                yield chunk
+        return
+
+    options = {}
+    if sys.version_info >= (3, 7):
+        # zlib's default level is used before Python 3.7.
+        options['compresslevel'] = level
+    stream = _ZipStream()
+    zip_file = zipfile.ZipFile(
+        stream, mode='w', compression=zipfile.ZIP_DEFLATED, **options
+    )
+    with zip_file.open(str(filename), 'w', force_zip64=True) as f:
+        for chunk in data:
+            f.write(chunk)
+            compressed = stream.pop()
+            if compressed:
+                yield compressed
+    zip_file.close()
+    yield stream.pop()
+
+
+def zstd_encoder(data, filename, level):
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    for chunk in data:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+ENCODERS = OrderedDict([
+    ('gzip', gzip_encoder),
+    ('zip', zip_encoder),
+    ('zstd', zstd_encoder),
+])
+
+
+def get_codecs():
+    """
+    Return the names of the available codecs.
+    """
+    return [
+        codec for codec in ENCODERS
+        if codec != 'zstd' or zstandard is not None
+    ]
+
+
+def get_filename(filename, codec):
+    """
+    Return the name of the download of filename compressed with codec.
+    """
+    if not codec:
+        return filename
+    return '%s.%s' % (filename, EXTENSIONS[codec])
+
+
+def compress(data, codec, filename, level=None):
+    """
+    Yield the serialized data compressed with codec a chunk at a time.
+    filename names the zip archive member.
+    """
+    if level is None:
+        level = get_level(codec)
+    return ENCODERS[codec](iter_bytes(data), filename, level)
@@ -0,0 +1,166 @@
+"""
+Distribute mailed exports across Celery workers.
+
+The exported queryset is split into EXPORT_CELERY_SHARDS primary key
+ranges, each serialized by a task writing its part to default storage. A
+chord callback joins the parts in order into the zip archive that is
+mailed, or stored for a download link, and deletes them. If a task fails
+the chord's error callback deletes them and marks the export job failed.
+Querysets not ordered on their primary key, and formats whose parts can't
+be joined, are exported by a single part task.
+
+The tasks themselves are defined in export.tasks, exports are passed to
+them as ExportJobs.
+"""
+import json
+import uuid
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from export import downloads, metrics, parallel, utils
+from export.models import ExportJob
+
+# Default number of part tasks, override with the EXPORT_CELERY_SHARDS
+# setting. Mailed exports are not distributed when it is 1.
+SHARDS = 1
+
+
+def get_shard_count():
+    return getattr(settings, 'EXPORT_CELERY_SHARDS', SHARDS)
+
+
+def can_distribute(format):
+    return format in utils.STREAM_SPLITTERS
+
+
+def get_parts(serializer_kwargs, query_kwargs, delta=None):
+    """
+    Return the arguments of the export_part task for each part of an export,
+    in order.
+    """
+    format = serializer_kwargs['format']
+    fields = serializer_kwargs.get('fields', [])
+    queryset = utils.get_queryset(**query_kwargs)
+    if delta is not None:
+        queryset = delta.filter(queryset)
+    # Resolve automatic indentation for the whole queryset, not per part.
+    indent = utils.get_serializer_options(
+        format, queryset, fields, serializer_kwargs.get('indent', 4)
+    )['indent']
+
+    shards = [(None, None)]
+    if utils.get_keyset_ordering(queryset) is not None:
+        count = min(
+            get_shard_count(),
+            -(-queryset.count() // utils.get_chunk_size())
+        )
+        if count > 1:
+            shards = parallel.get_shards(queryset, count)
+    return [
+        (format, queryset.model, queryset.query, shard, fields, indent)
+        for shard in shards
+    ]
+
+
+def get_part_names(job_id, format, count):
+    """
+    Return the names the count parts of an export job are stored as.
+    """
+    return [
+        'export/parts/%s-%06d.%s' % (job_id, index, format)
+        for index in range(count)
+    ]
+
+
+def export_part(format, model, query, shard, fields, indent, name=None):
+    """
+    Serialize the objects of shard to default storage as name, a unique
+    name if None. Return the name of the stored part, None if the shard is
+    empty, and its number of objects.
+    """
+    queryset = parallel.get_shard_queryset(model, query, shard)
+    count = queryset.count()
+    if not count:
+        return None, 0
+    data = utils.serialize(format, queryset, fields, indent)
+    if name is None:
+        name = 'export/parts/%s.%s' % (uuid.uuid4().hex, format)
+    elif default_storage.exists(name):
+        # Written by a task run before, e.g. on a worker that died.
+        default_storage.delete(name)
+    name = default_storage.save(name, ContentFile(data.encode('utf-8')))
+    return name, count
+
+
+def iter_parts(names):
+    for name in names:
+        with default_storage.open(name, 'rb') as f:
+            yield f.read().decode('utf-8')
+
+
+def iter_bytes(serializer_kwargs, names):
+    """
+    Yield the UTF-8 encoded data of the stored parts joined into one
+    document.
+    """
+    empty = True
+    for data in utils.join_chunks(serializer_kwargs['format'],
+                                  iter_parts(names)):
+        empty = False
+        yield data.encode('utf-8')
+    if empty:
+        yield utils.serialize(
+            serializer_kwargs['format'], [],
+            serializer_kwargs.get('fields', []),
+            serializer_kwargs.get('indent', 4)
+        ).encode('utf-8')
+
+
+def merge_parts(parts, model, email, filename, serializer_kwargs,
+                download_url=None, delta=None, job_id=None, user_id=None):
+    """
+    Join the stored parts of an export of model, the (name, count) pairs
+    export_part returns, in order, and email them zipped, or a download link
+    to them for the user with primary key user_id if download_url is given.
+    The ExportJob with primary key job_id, if given, is marked done.
+    """
+    names = [name for name, count in parts if name is not None]
+    with metrics.Instrument(model, serializer_kwargs['format'], 'mail'):
+        metrics.add_rows(sum(count for name, count in parts))
+        data = metrics.iter_written(metrics.iter_phase(
+            iter_bytes(serializer_kwargs, names), 'storage'
+        ))
+        if download_url is None:
+            utils.mail_zip(email, filename, data)
+        else:
+            downloads.mail_link(
+                email, filename, data, download_url, model, user_id
+            )
+
+    delete_parts(names)
+    if delta is not None:
+        delta.commit()
+    if job_id is not None:
+        ExportJob.objects.filter(pk=job_id).update(status=ExportJob.DONE)
+
+
+def delete_parts(names):
+    for name in names:
+        if default_storage.exists(name):
+            default_storage.delete(name)
+
+
+def fail_job(job_id):
+    """
+    Mark the ExportJob with primary key job_id failed and delete the parts
+    stored for it, the error callback of the chord exporting it when a part
+    task or merge_parts fails.
+    """
+    job = ExportJob.objects.get(pk=job_id)
+    delete_parts(json.loads(job.parameters).get('parts', []))
+    job.status = ExportJob.FAILED
+    job.error = 'A task of the distributed export failed, see the Celery ' \
+        'worker logs.'
+    job.save(update_fields=['status', 'error', 'updated'])
@@ -0,0 +1,173 @@
+"""
+Store exports with Django's default storage and serve them from signed,
+expiring download links.
+"""
+import mimetypes
+import posixpath
+import re
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.mail import EmailMessage
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.translation import ugettext as _
+
+from export import metrics, utils
+
+# Default number of seconds download links are valid for, override with the
+# EXPORT_LINK_MAX_AGE setting.
+LINK_MAX_AGE = 7 * 24 * 60 * 60
+
+SALT = 'export.downloads'
+
+BLOCK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def get_link_max_age():
+    return getattr(settings, 'EXPORT_LINK_MAX_AGE', LINK_MAX_AGE)
+
+
+def mail_export(email, filename, serializer_kwargs, query_kwargs,
+                download_url, delta=None, user_id=None):
+    """
+    Store the export and email a download link for it. download_url is the
+    absolute URL of the download view the signed token is appended to,
+    delta an optional watermarks.Delta the export is limited to and user_id
+    the primary key of the only user the link is valid for.
+    """
+    queryset = utils.get_queryset(**query_kwargs)
+    with metrics.Instrument(queryset.model, serializer_kwargs['format'],
+                            'mail', queryset.db):
+        if delta is not None:
+            queryset = delta.filter(queryset)
+        data = metrics.iter_written(metrics.iter_phase(
+            utils.stream_bytes(queryset=queryset, **serializer_kwargs),
+            'serialize'
+        ))
+        mail_link(
+            email, filename, data, download_url, queryset.model, user_id
+        )
+
+    if delta is not None:
+        delta.commit()
+
+
+def mail_link(email, filename, data, download_url, model, user_id=None):
+    """
+    Store the chunks of bytes in data as filename and email a download link
+    for it, valid for the export tool of model and the user with primary
+    key user_id only.
+    """
+    name = store_export(filename, data)
+    url = '%s%s/' % (download_url, sign(name, model, user_id))
+
+    subject = _("Database Export")
+    message = _("Database Export available for download at %s") % url
+    email = EmailMessage(subject, message, to=[email])
+    with metrics.phase('mail'):
+        email.send()
+
+
+def store_export(filename, data):
+    """
+    Zip the chunks of bytes in data as filename and save the archive to
+    default storage. Return the name of the stored file.
+    """
+    name = 'export/%s/%s.zip' % (uuid.uuid4().hex, filename)
+    with tempfile.SpooledTemporaryFile(max_size=utils.SPOOL_SIZE) as f:
+        with metrics.phase('compress'):
+            utils.write_zip(f, filename, data)
+        f.seek(0)
+        with metrics.phase('storage'):
+            return default_storage.save(name, File(f))
+
+
+def sign(name, model, user_id=None):
+    return signing.dumps(
+        [name, model._meta.label_lower, user_id], salt=SALT
+    )
+
+
+def unsign(token):
+    """
+    Return the name of the stored file, the label of the model exported and
+    the primary key of the user for token. Raise signing.BadSignature if
+    the token is invalid or has expired.
+    """
+    value = signing.loads(token, salt=SALT, max_age=get_link_max_age())
+    # Tokens signed before links were bound to a model and user.
+    if not isinstance(value, list) or len(value) != 3:
+        raise signing.BadSignature(token)
+    return tuple(value)
+
+
+def iter_file(f, length, block_size=BLOCK_SIZE):
+    try:
+        while length > 0:
+            data = f.read(min(block_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        f.close()
+
+
+def parse_range(header, size):
+    """
+    Return the (start, end) byte positions, inclusive, of a single range
+    Range header for a file of size bytes. Return None if header is not a
+    single byte range, raise ValueError if the range can't be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # A suffix range of the last bytes of the file.
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def download_response(request, name):
+    """
+    Return a response serving stored file name, honouring single byte range
+    requests.
+    """
+    size = default_storage.size(name)
+    filename = posixpath.basename(name)
+    try:
+        byte_range = parse_range(request.META.get('HTTP_RANGE', ''), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */%s' % size
+        return response
+
+    f = default_storage.open(name, 'rb')
+    if byte_range is None:
+        response = StreamingHttpResponse(iter_file(f, size))
+        length = size
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        f.seek(start)
+        response = StreamingHttpResponse(iter_file(f, length), status=206)
+        response['Content-Range'] = 'bytes %s-%s/%s' % (start, end, size)
+    response['Content-Type'] = mimetypes.guess_type(filename)[0]
+    response['Content-Length'] = length
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = 'attachment; filename=%s' % filename
+    return response
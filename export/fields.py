@@ -8,10 +8,26 @@ from django.contrib.admin.widgets import AdminDateWidget, \
 from django.core import exceptions, validators
 from django.core.exceptions import ValidationError
 from django.utils import formats
+from django.utils.encoding import force_text
 from django.utils.safestring import mark_safe
 from django.utils.translation import ugettext as _
 
 
+def filter_range(name, value, queryset):
+    """
+    Filter queryset on field name being within the (start, end) range value,
+    inclusive. Either end of the range may be None, zero is a bound.
+    """
+    kwargs = {}
+    # Filter start.
+    if value[0] is not None:
+        kwargs['%s__gte' % name] = value[0]
+    # Filter end.
+    if value[1] is not None:
+        kwargs['%s__lte' % name] = value[1]
+    return queryset.filter(**kwargs)
+
+
 class AdminSplitDateTime(forms.SplitDateTimeWidget):
     """
     A SplitDateTime Widget that has some admin-specific styling.
@@ -186,14 +202,7 @@ class DateField(forms.fields.DateField):
         return (start_date, end_date)
 
     def filter(self, name, value, queryset):
-        kwargs = {}
-        # Filter start date.
-        if value[0]:
-            kwargs['%s__gte' % name] = value[0]
-        # Filter end date.
-        if value[1]:
-            kwargs['%s__lte' % name] = value[1]
-        return queryset.filter(**kwargs)
+        return filter_range(name, value, queryset)
 
 
 class DateTimeField(forms.fields.DateTimeField):
@@ -251,14 +260,7 @@ class DateTimeField(forms.fields.DateTimeField):
         return (start_datetime, end_datetime)
 
     def filter(self, name, value, queryset):
-        kwargs = {}
-        # Filter start datetime.
-        if value[0]:
-            kwargs['%s__gte' % name] = value[0]
-        # Filter end datetime.
-        if value[1]:
-            kwargs['%s__lte' % name] = value[1]
-        return queryset.filter(**kwargs)
+        return filter_range(name, value, queryset)
 
 
 class Field(forms.fields.Field):
@@ -313,14 +315,7 @@ class IntegerField(forms.fields.IntegerField):
         return (min, max)
 
     def filter(self, name, value, queryset):
-        kwargs = {}
-        # Filter min.
-        if value[0]:
-            kwargs['%s__gte' % name] = value[0]
-        # Filter max.
-        if value[1]:
-            kwargs['%s__lte' % name] = value[1]
-        return queryset.filter(**kwargs)
+        return filter_range(name, value, queryset)
 
 
 class FloatField(forms.fields.FloatField):
@@ -359,14 +354,7 @@ class FloatField(forms.fields.FloatField):
         return min, max
 
     def filter(self, name, value, queryset):
-        kwargs = {}
-        # Filter min.
-        if value[0]:
-            kwargs['%s__gte' % name] = value[0]
-        # Filter max.
-        if value[1]:
-            kwargs['%s__lte' % name] = value[1]
-        return queryset.filter(**kwargs)
+        return filter_range(name, value, queryset)
 
 
 class ImageField(BasicTextField):
@@ -415,14 +403,7 @@ class DecimalField(forms.fields.DecimalField):
                 super(DecimalField, self).validate(value[1]))
 
     def filter(self, name, value, queryset):
-        kwargs = {}
-        # Filter min.
-        if value[0]:
-            kwargs['%s__gte' % name] = value[0]
-        # Filter max.
-        if value[1]:
-            kwargs['%s__lte' % name] = value[1]
-        return queryset.filter(**kwargs)
+        return filter_range(name, value, queryset)
 
 
 class AutoField(IntegerField):
@@ -457,14 +438,68 @@ class IPAddressField(BasicTextField):
     pass
 
 
+class AutocompleteSelectMultiple(forms.SelectMultiple):
+    """
+    A multiple select rendering only its selected objects. Others are
+    searched for with the export tool's autocomplete view, so the related
+    queryset is never evaluated in full.
+    """
+    class Media:
+        js = ('export/js/autocomplete.js',)
+
+    def __init__(self, attrs=None):
+        # The autocomplete view's URL relative to the export page.
+        attrs = dict(attrs or {}, **{'data-autocomplete': 'autocomplete/'})
+        super(AutocompleteSelectMultiple, self).__init__(attrs)
+
+    def get_selected(self, values):
+        """
+        Return the (value, label) choices of the objects selected by values.
+        """
+        values = [value for value in values if value not in (None, '')]
+        if not values:
+            return []
+        field = self.choices.field
+        key = field.to_field_name or 'pk'
+        try:
+            objects = list(
+                field.queryset.filter(**{'%s__in' % key: values})
+            )
+        except (ValueError, ValidationError):
+            return []
+        return [self.choices.choice(obj) for obj in objects]
+
+    def optgroups(self, name, value, attrs=None):
+        options = [
+            self.create_option(
+                name, option_value, label, True, index, attrs=attrs
+            )
+            for index, (option_value, label) in enumerate(
+                self.get_selected(value)
+            )
+        ]
+        return [(None, options, 0)]
+
+    def render_options(self, *args):
+        # Django < 1.11, the selected choices are the last argument.
+        selected_choices = set(force_text(value) for value in args[-1])
+        return '\n'.join(
+            self.render_option(selected_choices, option_value, label)
+            for option_value, label in self.get_selected(args[-1])
+        )
+
+
 class ModelMultipleChoiceField(forms.models.ModelMultipleChoiceField):
+    widget = AutocompleteSelectMultiple
+
     def __init__(self, field, queryset, *args, **kwargs):
         super(ModelMultipleChoiceField, self).__init__(
             queryset=queryset,
             required=False,
             help_text="Only objects with relationships to the selected %s \
-                    above will be exported. Hold down 'Control', or 'Command' \
-                    on a Mac, to select more than one." % field.label.lower(),
+                    will be exported. Search for %s above and double click \
+                    them to select them, double click selected %s to remove \
+                    them." % ((field.label.lower(),) * 3),
             *args, **kwargs
         )
 
@@ -556,15 +591,7 @@ class TimeField(forms.fields.TimeField):
         return (start_time, end_time)
 
     def filter(self, name, value, queryset):
-        kwargs = {}
-        # Filter start date.
-        if value[0]:
-            kwargs['%s__gte' % name] = value[0]
-        # Filter end date.
-        if value[1]:
-            kwargs['%s__lte' % name] = value[1]
-
-        return queryset.filter(**kwargs)
+        return filter_range(name, value, queryset)
 
 
 class SlugField(BasicTextField):
@@ -1,9 +1,87 @@
+import copy
 import inspect
+from collections import OrderedDict, namedtuple
 
 from django import forms
 from django.core import serializers
+from django.utils.text import capfirst
 
-from export import fields
+from export import (
+    aggregates, compression, fields, relations, utils, values, watermarks
+)
+
+
+# The field choices and filter fields of a model, computed once and copied by
+# each form.
+ModelMetadata = namedtuple(
+    'ModelMetadata',
+    [
+        'field_choices', 'filter_fields', 'delta_choices', 'relation_choices',
+        'aggregate_choices'
+    ]
+)
+
+_metadata = {}
+
+
+def get_filter_field(field, form_field):
+    """
+    Return the filter field for model field field, None if there is none.
+    """
+    if form_field.__class__ in [forms.models.ModelChoiceField,
+                                forms.models.ModelMultipleChoiceField]:
+        return getattr(
+            fields, field.__class__.__name__
+        )(form_field, form_field.queryset)
+    try:
+        return getattr(fields, field.__class__.__name__)(form_field)
+    except AttributeError:
+        for parent_field in inspect.getmro(field.__class__):
+            if parent_field.__module__ == 'django.db.models.fields':
+                return getattr(fields, parent_field.__name__)(form_field)
+    return None
+
+
+def build_metadata(model, fieldnames=()):
+    field_choices = []
+    filter_fields = OrderedDict()
+    aggregate_choices = [(aggregates.COUNT, 'Number of objects')]
+    for field in model._meta.fields:
+        # Unlike "fields_for_model" non-editable fields are included since
+        # they're just used as filters.
+        form_field = field.formfield()
+        if form_field is None:
+            continue
+        name = field.name
+        field_choices.append((name, form_field.label.capitalize()))
+        filter_field = get_filter_field(field, form_field)
+        if isinstance(filter_field, aggregates.NUMERIC_FIELDS) and \
+                not field.primary_key:
+            aggregate_choices.extend(aggregates.get_choices(field))
+        if fieldnames and name not in fieldnames:
+            continue
+        if filter_field is not None:
+            filter_fields[name] = filter_field
+    delta_choices = [('', 'All objects')] + [
+        (field.name, capfirst(field.verbose_name))
+        for field in watermarks.get_watermark_fields(model)
+    ]
+    return ModelMetadata(
+        field_choices, filter_fields, delta_choices,
+        relations.get_choices(model), aggregate_choices
+    )
+
+
+def get_metadata(model, fieldnames=()):
+    """
+    Return the ModelMetadata of model, filtering on fieldnames or on all
+    fields if none are given.
+    """
+    key = (model, tuple(fieldnames), relations.get_depth())
+    metadata = _metadata.get(key)
+    if metadata is None:
+        metadata = _metadata[key] = build_metadata(model, fieldnames)
+    return metadata
 
 
 class Export(forms.Form):
@@ -20,8 +98,10 @@ class Export(forms.Form):
         required=False,
         label='Fields',
         help_text="Fields to be included in the exported data. If none are \
-                selected all fields will be exported. Hold down 'Control', \
-                or 'Command' on a Mac, to select more than one.",
+                selected all fields will be exported. Fields of related \
+                objects are exported as extra columns, except to XML. Hold \
+                down 'Control', or 'Command' on a Mac, to select more than \
+                one.",
     )
     export_order_by = forms.ChoiceField(
         required=False,
@@ -34,15 +114,54 @@ class Export(forms.Form):
         label='Order direction',
         help_text='Sort elements in ascending or descending order.',
     )
+    export_indent = forms.ChoiceField(
+        choices=[
+            (utils.AUTO_INDENT, 'Automatic'), ('compact', 'Compact'),
+            ('2', '2 spaces'), ('4', '4 spaces')
+        ],
+        required=False,
+        label='Indentation',
+        help_text='Indentation of JSON, XML and YAML exports. Automatic \
+                indents small exports by 4 spaces and outputs large exports \
+                compactly.',
+    )
+    export_compression = forms.ChoiceField(
+        required=False,
+        label='Compression',
+        help_text='Compress downloads into a file of the selected type. \
+                Emailed exports are always zipped.',
+    )
+    export_group_by = forms.MultipleChoiceField(
+        required=False,
+        label='Group by',
+        help_text='Export the selected aggregates of each group of objects \
+                with the same values of these fields instead of the objects.',
+    )
+    export_aggregates = forms.MultipleChoiceField(
+        required=False,
+        label='Aggregates',
+        help_text='Aggregates computed over the exported objects, or each \
+                group of them. Aggregate exports can be serialized to CSV, \
+                JSON, JSON Lines, Python and YAML.',
+    )
+    export_delta_field = forms.ChoiceField(
+        required=False,
+        label='Delta',
+        help_text='Only export objects added or changed since your last \
+                export with the same filters, tracked by the selected field.',
+    )
 
     def __init__(self, model, *args, **kwargs):
         fieldnames = kwargs.pop('fieldnames', [])
         super(Export, self).__init__(*args, **kwargs)
+        self.model = model
         self.fieldsets = (
             ('Options', {'fields': (
                 'export_format',
                 'export_fields', 'export_order_by',
-                'export_order_direction'
+                'export_order_direction', 'export_indent',
+                'export_compression', 'export_group_by',
+                'export_aggregates', 'export_delta_field'
             )}),
             ('Filters', {
                 'description': 'Objects will be filtered to match the criteria \
@@ -52,46 +171,46 @@ class Export(forms.Form):
             })
         )
 
-        field_choices = []
-        # "fields_for_model" excludes non-editable fields but we're just using
-        # the fields as filters, so override.
-        for field in model._meta.fields:
-            field.editable = True
-        all_form_fields = forms.models.fields_for_model(model)
-        # "fields_for_model" erroneously calls a list of fieldnames "fields".
-        if fieldnames:
-            filter_form_fields = forms.models.fields_for_model(model, fields=fieldnames)
-        else:
-            filter_form_fields = all_form_fields
-        for field in model._meta.fields:
-            name = field.name
-            if name not in all_form_fields:
-                continue
-            form_field = all_form_fields[name]
-            field_choices.append([name, form_field.label.capitalize()])
-            if name not in filter_form_fields.keys():
-                continue
-            if form_field.__class__ in [forms.models.ModelChoiceField,
-                                        forms.models.ModelMultipleChoiceField]:
-                self.fields[name] = getattr(
-                    fields, field.__class__.__name__
-                )(form_field, form_field.queryset)
-            else:
-                try:
-                    self.fields[name] = getattr(
-                        fields, field.__class__.__name__
-                    )(form_field)
-                except AttributeError:
-                    for parent_field in inspect.getmro(field.__class__):
-                        if parent_field.__module__ == \
-                                'django.db.models.fields':
-                            self.fields[name] = getattr(
-                                fields, parent_field.__name__
-                            )(form_field)
-                            break
-
-            if name not in self.fieldsets[1][1]['fields']:
-                self.fieldsets[1][1]['fields'].append(name)
-
-        self.fields['export_fields'].choices = field_choices
-        self.fields['export_order_by'].choices = field_choices
+        metadata = get_metadata(model, fieldnames)
+        for name, filter_field in metadata.filter_fields.items():
+            self.fields[name] = copy.deepcopy(filter_field)
+        self.fieldsets[1][1]['fields'].extend(metadata.filter_fields)
+
+        self.fields['export_fields'].choices = \
+            metadata.field_choices + metadata.relation_choices
+        self.fields['export_group_by'].choices = \
+            self.fields['export_fields'].choices
+        self.fields['export_aggregates'].choices = metadata.aggregate_choices
+        self.fields['export_order_by'].choices = [
+            ('', 'Primary key')
+        ] + metadata.field_choices
+        self.fields['export_delta_field'].choices = metadata.delta_choices
+        self.fields['export_compression'].choices = [('', 'None')] + [
+            (codec, codec) for codec in compression.get_codecs()
+        ]
+
+    def clean_export_indent(self):
+        indent = self.cleaned_data['export_indent']
+        if indent in ('', utils.AUTO_INDENT):
+            return utils.AUTO_INDENT
+        if indent == 'compact':
+            return None
+        return int(indent)
+
+    def clean(self):
+        cleaned_data = super(Export, self).clean()
+        format = cleaned_data.get('export_format')
+        fields = cleaned_data.get('export_fields') or []
+        if format and aggregates.is_aggregate(cleaned_data):
+            if not aggregates.can_serialize(format):
+                raise forms.ValidationError(
+                    "Aggregates can't be exported to %s." % format
+                )
+        elif format and any(relations.is_path(name) for name in fields):
+            queryset = self.model._default_manager.all()
+            if values.get_columns(format, queryset, fields) is None:
+                raise forms.ValidationError(
+                    "Fields of related objects can't be exported to %s."
+                    % format
+                )
+        return cleaned_data
@@ -0,0 +1,308 @@
+"""
+Run mailed exports as ExportJobs that record their progress and can be
+resumed after being interrupted.
+
+Exports ordered on their primary key in formats that can be joined are
+written to default storage in parts of EXPORT_JOB_PART_SIZE objects. After
+each part the job records the primary key of the last object exported, a
+job run again, for instance by a Celery worker redelivering the task of a
+worker that died, continues after it. The parts are joined into the export
+once all are written. Other exports are serialized in one go and start
+over when run again.
+"""
+import datetime
+import json
+import traceback
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.datastructures import MultiValueDict
+from django.utils.encoding import force_text
+
+from export import (
+    aggregates, distributed, downloads, forms, metrics, utils, watermarks
+)
+from export.models import ExportJob
+
+# Default number of objects per part, override with the
+# EXPORT_JOB_PART_SIZE setting.
+PART_SIZE = 100000
+
+# Default number of seconds after which a running job that hasn't recorded
+# progress is assumed to have been interrupted, override with the
+# EXPORT_JOB_STALE_AFTER setting.
+STALE_AFTER = 60 * 60
+
+
+def get_part_size():
+    return getattr(settings, 'EXPORT_JOB_PART_SIZE', PART_SIZE)
+
+
+def get_resumable(queryset):
+    """
+    Return the jobs of queryset that can be resumed, pending and failed jobs
+    and running jobs that haven't recorded progress for
+    EXPORT_JOB_STALE_AFTER seconds. Other running jobs may still be running
+    and would be exported twice.
+    """
+    stale = timezone.now() - datetime.timedelta(
+        seconds=getattr(settings, 'EXPORT_JOB_STALE_AFTER', STALE_AFTER)
+    )
+    return queryset.filter(
+        Q(status__in=[ExportJob.PENDING, ExportJob.FAILED]) |
+        Q(status=ExportJob.RUNNING, updated__lt=stale)
+    )
+
+
+def get_data(form):
+    """
+    Return the data of an export form's own fields as lists of values,
+    leaving out other posted data like the CSRF token. Fields with multiple
+    widgets are posted as one value per widget.
+    """
+    names = []
+    for name, field in form.fields.items():
+        name = form.add_prefix(name)
+        names.append(name)
+        widgets = getattr(field.widget, 'widgets', [])
+        names.extend('%s_%s' % (name, index) for index in range(len(widgets)))
+    data = {}
+    for name in names:
+        if name not in form.data:
+            continue
+        if hasattr(form.data, 'getlist'):
+            data[name] = form.data.getlist(name)
+        else:
+            value = form.data[name]
+            data[name] = value if isinstance(value, list) else [value]
+    return data
+
+
+def create_job(form, model, user, email, filename, download_url=None):
+    """
+    Return a pending ExportJob for a valid export form.
+    """
+    data = get_data(form)
+    return ExportJob.objects.create(
+        user=user if getattr(user, 'pk', None) else None,
+        content_type=ContentType.objects.get_for_model(model),
+        email=email,
+        filename=filename,
+        parameters=json.dumps({
+            'data': data,
+            'indent': form.cleaned_data['export_indent'],
+        }),
+        download_url=download_url or '',
+    )
+
+
+def get_form(job):
+    model = job.content_type.model_class()
+    data = json.loads(job.parameters)['data']
+    form = forms.Export(model, MultiValueDict(data))
+    if not form.is_valid():
+        raise ValueError(form.errors)
+    return form
+
+
+def get_indent(job, queryset, format, fields):
+    """
+    Return the indentation of a job's export, resolving automatic
+    indentation the first time so resumed parts are indented alike.
+    """
+    parameters = json.loads(job.parameters)
+    if parameters['indent'] == utils.AUTO_INDENT:
+        parameters['indent'] = utils.get_serializer_options(
+            format, queryset, fields, utils.AUTO_INDENT
+        )['indent']
+        job.parameters = json.dumps(parameters)
+        job.save(update_fields=['parameters', 'updated'])
+    return parameters['indent']
+
+
+def write_parts(job, queryset, format, fields, indent, ordering):
+    """
+    Serialize the objects of queryset after the job's checkpoint to default
+    storage a part at a time, checkpointing after each.
+    """
+    part_size = get_part_size()
+    pk_field = queryset.model._meta.pk
+    queryset = queryset.order_by(ordering)
+    if ordering.startswith('-'):
+        after, through = 'pk__lt', 'pk__gte'
+    else:
+        after, through = 'pk__gt', 'pk__lte'
+    while True:
+        remaining = queryset
+        if job.checkpoint:
+            remaining = queryset.filter(
+                **{after: pk_field.to_python(job.checkpoint)}
+            )
+        pks = list(remaining.values_list('pk', flat=True)[:part_size])
+        if not pks:
+            break
+        part = remaining.filter(**{through: pks[-1]})
+        with metrics.phase('serialize'):
+            data = utils.serialize(format, part, fields, indent)
+            data = data.encode('utf-8')
+        # A part written before the job was interrupted is written again.
+        name = job.get_part_name(job.parts)
+        with metrics.phase('storage'):
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name, ContentFile(data))
+
+        job.parts += 1
+        job.rows_processed += len(pks)
+        job.bytes_written += len(data)
+        job.checkpoint = force_text(pks[-1])
+        job.save(update_fields=[
+            'parts', 'rows_processed', 'bytes_written', 'checkpoint',
+            'updated'
+        ])
+
+
+def delete_parts(job):
+    for index in range(job.parts):
+        name = job.get_part_name(index)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+
+
+def reset(job):
+    delete_parts(job)
+    job.parts = job.rows_processed = job.bytes_written = 0
+    job.checkpoint = ''
+
+
+def iter_counted(job, data):
+    for chunk in data:
+        job.bytes_written += len(chunk)
+        yield chunk
+
+
+def get_kwargs(job):
+    """
+    Return the serializer and query keyword arguments of a job's export and
+    its watermarks.Delta, None if it isn't a delta export.
+    """
+    form = get_form(job)
+    model = job.content_type.model_class()
+    serializer_kwargs = {
+        'format': form.cleaned_data['export_format'],
+        'fields': form.cleaned_data['export_fields'],
+        'indent': json.loads(job.parameters)['indent'],
+    }
+    query_kwargs = {'form': form, 'model': model}
+    delta = watermarks.get_delta(form, model, job.user_id)
+    return serializer_kwargs, query_kwargs, delta
+
+
+def filter_delta(job, delta, queryset):
+    """
+    Filter queryset on a job's delta up to the high watermark of its first
+    run, resumed parts are exported up to it too so objects below the
+    checkpoint changed since aren't skipped.
+    """
+    parameters = json.loads(job.parameters)
+    if parameters.get('high') is not None:
+        return delta.filter(
+            queryset, delta.field.to_python(parameters['high'])
+        )
+    queryset = delta.filter(queryset)
+    if delta.high is not None:
+        parameters['high'] = force_text(delta.high)
+        job.parameters = json.dumps(parameters)
+        job.save(update_fields=['parameters', 'updated'])
+    return queryset
+
+
+def export(job):
+    serializer_kwargs, query_kwargs, delta = get_kwargs(job)
+    queryset = utils.get_queryset(**query_kwargs)
+    with metrics.Instrument(queryset.model, serializer_kwargs['format'],
+                            'mail', queryset.db):
+        if delta is not None:
+            queryset = filter_delta(job, delta, queryset)
+        cleaned_data = query_kwargs['form'].cleaned_data
+        mail(job, queryset, serializer_kwargs, cleaned_data)
+
+    if delta is not None:
+        delta.commit()
+    if not job.parts:
+        job.rows_processed = job.total
+
+
+def mail(job, queryset, serializer_kwargs, cleaned_data):
+    """
+    Serialize the job's export of queryset and mail it.
+    """
+    format = serializer_kwargs['format']
+    fields = serializer_kwargs['fields']
+    serializer_kwargs['indent'] = get_indent(job, queryset, format, fields)
+    if job.total is None:
+        job.total = queryset.count()
+        job.save(update_fields=['total', 'updated'])
+
+    ordering = utils.get_keyset_ordering(queryset)
+    if aggregates.is_aggregate(cleaned_data):
+        reset(job)
+        with metrics.phase('serialize'):
+            data = aggregates.serialize(
+                format, queryset, aggregates.get_group_by(cleaned_data),
+                aggregates.get_aggregates(cleaned_data),
+                serializer_kwargs['indent']
+            )
+        if format == 'python':
+            data = repr(data)
+        data = iter_counted(job, [data.encode('utf-8')])
+    elif distributed.can_distribute(format) and ordering is not None:
+        write_parts(
+            job, queryset, format, fields, serializer_kwargs['indent'],
+            ordering
+        )
+        names = [job.get_part_name(index) for index in range(job.parts)]
+        data = metrics.iter_phase(
+            distributed.iter_bytes(serializer_kwargs, names), 'storage'
+        )
+    else:
+        reset(job)
+        data = iter_counted(job, metrics.iter_phase(utils.stream_bytes(
+            queryset=queryset, **serializer_kwargs
+        ), 'serialize'))
+
+    data = metrics.iter_written(data)
+    if job.download_url:
+        downloads.mail_link(
+            job.email, job.filename, data, job.download_url,
+            job.content_type.model_class(), job.user_id
+        )
+    else:
+        utils.mail_zip(job.email, job.filename, data)
+
+
+def run_job(job_id):
+    """
+    Run, or resume, the export job with primary key job_id and mail it.
+    Finished jobs are not run again.
+    """
+    job = ExportJob.objects.get(pk=job_id)
+    if job.status == ExportJob.DONE:
+        return
+    job.status = ExportJob.RUNNING
+    job.error = ''
+    job.save(update_fields=['status', 'error', 'updated'])
+    try:
+        export(job)
+    except Exception:
+        job.status = ExportJob.FAILED
+        job.error = traceback.format_exc()
+        job.save()
+        raise
+    job.status = ExportJob.DONE
+    job.save()
+    delete_parts(job)
@@ -0,0 +1,34 @@
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from export import bulk
+
+
+class Command(BaseCommand):
+    help = 'Load exported objects into the database in bulk.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', metavar='path')
+        parser.add_argument(
+            '--format',
+            help='Format of the exports, by default their file extension.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            help='Number of objects of a model inserted at a time.'
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database to load the exports into.'
+        )
+
+    def handle(self, *args, **options):
+        for path in options['paths']:
+            format = options['format'] or os.path.splitext(path)[1][1:]
+            with open(path, 'rb') as f:
+                count = bulk.load(
+                    format, f, options['batch_size'], options['database']
+                )
+            self.stdout.write('Loaded %d objects from %s' % (count, path))
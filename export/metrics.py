@@ -0,0 +1,400 @@
+"""
+Instrument exports.
+
+Downloads and mailed exports are each timed by an Instrument, which sends
+the export_started, export_chunk_written and export_finished signals and
+records the export's metrics with the backend named by the
+EXPORT_METRICS_BACKEND setting:
+
+- the time spent in each phase of the export, query, serialize, compress,
+  storage, mail and other,
+- the number of objects exported and objects per second,
+- the number of bytes written,
+- the number of queries run,
+- the peak memory of the process, or the peak memory traced by tracemalloc
+  while it is tracing.
+
+Phases are timed exclusively, time spent serializing objects fetched from a
+compressed stream counts towards serialize, not compress. Queries are only
+counted, and their time split from the phase running them, when queries are
+logged, with DEBUG on or the EXPORT_METRICS_LOG_QUERIES setting.
+
+The running instrument is kept per thread, code exporting objects adds to it
+with the functions below, which do nothing outside of an instrumented
+export.
+"""
+import logging
+import socket
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.module_loading import import_string
+
+from export import signals
+
+try:
+    import resource
+except ImportError:
+    resource = None
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+# Default metrics backend, override with the EXPORT_METRICS_BACKEND setting,
+# None only sends the signals.
+BACKEND = 'export.metrics.LoggingBackend'
+
+PHASES = ['query', 'serialize', 'compress', 'storage', 'mail', 'other']
+
+# Default address and prefix of metrics sent by StatsdBackend, override
+# with the EXPORT_STATSD_ADDRESS and EXPORT_STATSD_PREFIX settings.
+STATSD_ADDRESS = ('localhost', 8125)
+STATSD_PREFIX = 'export'
+
+logger = logging.getLogger('export.metrics')
+
+_local = threading.local()
+
+
+def get_backend():
+    """
+    Return an instance of the EXPORT_METRICS_BACKEND class, None if there
+    is none.
+    """
+    path = getattr(settings, 'EXPORT_METRICS_BACKEND', BACKEND)
+    if path is None:
+        return None
+    return import_string(path)()
+
+
+def get_peak_memory():
+    """
+    Return the peak memory traced by tracemalloc in bytes if it's tracing,
+    else the peak resident set size of the process, None if neither can be
+    read.
+    """
+    if tracemalloc is not None and tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[1]
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _get_stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def get_current():
+    """
+    Return the running Instrument of this thread, None if there is none.
+    """
+    stack = _get_stack()
+    return stack[-1] if stack else None
+
+
+def add_rows(count):
+    instrument = get_current()
+    if instrument is not None:
+        instrument.rows += count
+
+
+@contextmanager
+def phase(name):
+    instrument = get_current()
+    if instrument is None:
+        yield
+        return
+    with instrument.phase(name):
+        yield
+
+
+def iter_phase(data, name):
+    instrument = get_current()
+    if instrument is None:
+        return data
+    return instrument.iter_phase(data, name)
+
+
+def iter_written(data):
+    instrument = get_current()
+    if instrument is None:
+        return data
+    return instrument.iter_written(data)
+
+
+class Instrument(object):
+    """
+    Times an export of model in format, kind being 'download' or 'mail'.
+    Use as a context manager, or call start() and finish().
+    """
+
+    def __init__(self, model, format, kind, using=DEFAULT_DB_ALIAS):
+        self.model = model
+        self.format = format
+        self.kind = kind
+        self.connection = connections[using]
+        self.rows = 0
+        self.bytes = 0
+        self.queries = None
+        self.phases = defaultdict(float)
+        self.current = 'other'
+        self.started = self.mark = None
+        self.log_queries = False
+        self.finished = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.finish(error=exc_type is not None)
+
+    def start(self):
+        self.log_queries = \
+            getattr(settings, 'EXPORT_METRICS_LOG_QUERIES', False) and \
+            not self.connection.queries_logged
+        if self.log_queries:
+            self.connection.force_debug_cursor = True
+        if self.connection.queries_logged:
+            self.queries = 0
+            log = self.connection.queries_log
+            self.last_query = log[-1] if log else None
+        _get_stack().append(self)
+        self.started = self.mark = time.time()
+        signals.export_started.send(sender=self.model, instrument=self)
+
+    def read_queries(self):
+        """
+        Count the queries logged since last read and return the time they
+        took. The log holds a limited number of queries, queries logged
+        after the last one read are counted.
+        """
+        if self.queries is None:
+            return 0
+        new = []
+        for query in reversed(self.connection.queries_log):
+            if query is self.last_query:
+                break
+            new.append(query)
+        if new:
+            self.last_query = new[0]
+        self.queries += len(new)
+        return sum(float(query['time']) for query in new)
+
+    def switch(self, phase):
+        """
+        Time the phase run since the last switch and start phase, return
+        the name of the phase left.
+        """
+        now = time.time()
+        query_time = self.read_queries()
+        if self.queries:
+            self.phases['query'] += query_time
+        self.phases[self.current] += max(now - self.mark - query_time, 0)
+        previous, self.current, self.mark = self.current, phase, now
+        return previous
+
+    @contextmanager
+    def phase(self, name):
+        previous = self.switch(name)
+        try:
+            yield
+        finally:
+            self.switch(previous)
+
+    def iter_phase(self, data, name):
+        """
+        Iterate over data, timing the production of each item as phase name.
+        """
+        iterator = iter(data)
+        while True:
+            previous = self.switch(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.switch(previous)
+            yield item
+
+    def iter_written(self, data):
+        """
+        Count the bytes of each chunk of data as written.
+        """
+        for chunk in data:
+            self.bytes += len(chunk)
+            signals.export_chunk_written.send(
+                sender=self.model, instrument=self, size=len(chunk)
+            )
+            yield chunk
+
+    def get_metrics(self, error=False):
+        duration = time.time() - self.started
+        return OrderedDict([
+            ('model', self.model._meta.label_lower),
+            ('format', self.format),
+            ('kind', self.kind),
+            ('status', 'error' if error else 'ok'),
+            ('rows', self.rows),
+            ('bytes', self.bytes),
+            ('duration', duration),
+            ('rows_per_second', self.rows / duration if duration else None),
+            ('queries', self.queries),
+            ('peak_memory', get_peak_memory()),
+            ('phases', OrderedDict(
+                (name, self.phases[name]) for name in PHASES
+                if name in self.phases
+            )),
+        ])
+
+    def finish(self, error=False):
+        """
+        Record the export's metrics, once.
+        """
+        if self.finished:
+            return
+        self.finished = True
+        self.switch(self.current)
+        if self.log_queries:
+            self.connection.force_debug_cursor = False
+        stack = _get_stack()
+        if self in stack:
+            stack.remove(self)
+
+        metrics = self.get_metrics(error)
+        signals.export_finished.send(
+            sender=self.model, instrument=self, metrics=metrics
+        )
+        backend = get_backend()
+        if backend is not None:
+            backend.record(metrics)
+
+
+class Stream(object):
+    """
+    Iterates over the data of a streamed export, starting its instrument on
+    the first iteration and finishing it once the data is exhausted or the
+    stream is closed, as responses close their content once sent. Streams
+    closed before being iterated over are never started.
+    """
+
+    def __init__(self, instrument, data):
+        self.instrument = instrument
+        self.data = data
+        self.iterator = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.iterator is None:
+            self.instrument.start()
+            self.iterator = iter(self.data)
+        try:
+            return next(self.iterator)
+        except StopIteration:
+            self.instrument.finish()
+            raise
+        except Exception:
+            self.instrument.finish(error=True)
+            raise
+
+    next = __next__
+
+    def close(self):
+        if hasattr(self.data, 'close'):
+            self.data.close()
+        if self.iterator is not None:
+            # Exhausted streams are already finished.
+            self.instrument.finish(error=True)
+
+
+class LoggingBackend(object):
+    """
+    Logs the metrics of each export to the export.metrics logger as a line
+    of key=value pairs named like Prometheus metrics, e.g.::
+
+        export_finished model=auth.user format=csv kind=download status=ok
+        export_rows=5 export_bytes=512 export_duration_seconds=0.012 ...
+
+    The metrics are also passed to handlers as the export_metrics attribute
+    of the record.
+    """
+
+    def record(self, metrics):
+        pairs = [
+            ('model', metrics['model']),
+            ('format', metrics['format']),
+            ('kind', metrics['kind']),
+            ('status', metrics['status']),
+            ('export_rows', metrics['rows']),
+            ('export_bytes', metrics['bytes']),
+            ('export_duration_seconds', metrics['duration']),
+            ('export_rows_per_second', metrics['rows_per_second']),
+            ('export_queries', metrics['queries']),
+            ('export_peak_memory_bytes', metrics['peak_memory']),
+        ] + [
+            ('export_%s_seconds' % name, duration)
+            for name, duration in metrics['phases'].items()
+        ]
+        logger.info(
+            'export_finished %s', ' '.join(
+                '%s=%s' % (name, format_value(value))
+                for name, value in pairs if value is not None
+            ),
+            extra={'export_metrics': metrics}
+        )
+
+
+def format_value(value):
+    if isinstance(value, float):
+        return '%.6f' % value
+    return value
+
+
+class StatsdBackend(object):
+    """
+    Sends the metrics of each export over UDP to the StatsD server at
+    EXPORT_STATSD_ADDRESS, tagged with the model, format, kind and status in
+    the DogStatsD format the Prometheus statsd_exporter also reads.
+    """
+
+    def record(self, metrics):
+        prefix = getattr(settings, 'EXPORT_STATSD_PREFIX', STATSD_PREFIX)
+        tags = ','.join(
+            '%s:%s' % (name, metrics[name])
+            for name in ['model', 'format', 'kind', 'status']
+        )
+        lines = [
+            '%s.count:1|c' % prefix,
+            '%s.rows:%d|c' % (prefix, metrics['rows']),
+            '%s.bytes:%d|c' % (prefix, metrics['bytes']),
+            '%s.duration:%d|ms' % (prefix, metrics['duration'] * 1000),
+        ] + [
+            '%s.phase.%s:%d|ms' % (prefix, name, duration * 1000)
+            for name, duration in metrics['phases'].items()
+        ]
+        for name in ['rows_per_second', 'queries', 'peak_memory']:
+            if metrics[name] is not None:
+                lines.append('%s.%s:%d|g' % (prefix, name, metrics[name]))
+        self.send('\n'.join('%s|#%s' % (line, tags) for line in lines))
+
+    def send(self, data):
+        address = getattr(settings, 'EXPORT_STATSD_ADDRESS', STATSD_ADDRESS)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.sendto(data.encode('utf-8'), tuple(address))
+        except socket.error:
+            logger.exception('Sending export metrics to StatsD failed')
+        finally:
+            sock.close()
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.utils.encoding import python_2_unicode_compatible
+
+
+@python_2_unicode_compatible
+class Watermark(models.Model):
+    """
+    The highest value of a field exported by a user from a model with a set
+    of filters, used to export only objects beyond it the next time.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, on_delete=models.CASCADE
+    )
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    fingerprint = models.CharField(max_length=40)
+    field = models.CharField(max_length=255)
+    value = models.CharField(max_length=64)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'content_type', 'fingerprint', 'field')
+
+    def __str__(self):
+        return '%s.%s > %s' % (self.content_type, self.field, self.value)
+
+
+@python_2_unicode_compatible
+class ExportJob(models.Model):
+    """
+    A mailed export, tracking its progress and the primary key of the last
+    object exported so an interrupted export can be resumed from it.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, on_delete=models.SET_NULL
+    )
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    email = models.EmailField()
+    filename = models.CharField(max_length=255)
+    parameters = models.TextField(
+        help_text='The export form data and options, as JSON.'
+    )
+    download_url = models.CharField(
+        max_length=255, blank=True,
+        help_text='Email a download link from this URL instead of the '
+                  'export.'
+    )
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=PENDING
+    )
+    total = models.PositiveIntegerField(null=True, blank=True)
+    rows_processed = models.PositiveIntegerField(default=0)
+    bytes_written = models.BigIntegerField(default=0)
+    checkpoint = models.CharField(
+        max_length=64, blank=True,
+        help_text='Primary key of the last object exported.'
+    )
+    parts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ('-created',)
+
+    def __str__(self):
+        return '%s (%s)' % (self.filename, self.get_status_display())
+
+    def get_part_name(self, index):
+        return 'export/jobs/%s/%06d' % (self.pk, index)
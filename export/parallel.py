@@ -0,0 +1,163 @@
+"""
+Serialize exports in parallel across a pool of worker processes.
+
+Querysets ordered on their primary key are split into contiguous primary
+key ranges, shards, of at least EXPORT_CHUNK_SIZE objects. Each shard is
+serialized in a worker process with its own database connections and the
+results are joined in order the way streamed chunks are, so the output is
+the same as serializing the queryset in one go.
+
+Workers are forked from the process serializing the export, so this is
+only available where the fork start method is, and requires
+concurrent.futures, which Python 2 only has with the futures backport.
+"""
+from itertools import chain
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.db.models.query import QuerySet
+
+from export import metrics, utils
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    ProcessPoolExecutor = None
+
+# Default number of worker processes, override with the EXPORT_PROCESSES
+# setting. Exports are serialized in the calling process when it is 1.
+PROCESSES = 1
+
+# Connections inherited by a worker from the process that forked it.
+_inherited = None
+
+
+def get_processes():
+    return getattr(settings, 'EXPORT_PROCESSES', PROCESSES)
+
+
+def get_shards(queryset, count):
+    """
+    Return the (start, end) primary key ranges splitting queryset into count
+    shards of about equal size. start is inclusive, end exclusive and None
+    for the last shard. Shards are in the order of queryset.
+    """
+    total = queryset.count()
+    size = -(-total // count)
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    bounds = [None]
+    for offset in range(size, total, size):
+        bounds.append(pks[offset])
+    bounds.append(None)
+    shards = list(zip(bounds[:-1], bounds[1:]))
+    if utils.get_keyset_ordering(queryset) == '-pk':
+        shards.reverse()
+    return shards
+
+
+def filter_shard(queryset, shard):
+    start, end = shard
+    if start is not None:
+        queryset = queryset.filter(pk__gte=start)
+    if end is not None:
+        queryset = queryset.filter(pk__lt=end)
+    return queryset
+
+
+def get_shard_queryset(model, query, shard):
+    """
+    Return the queryset of model with query limited to shard. Querysets are
+    passed to workers as their model and query since pickling a queryset
+    evaluates it.
+    """
+    queryset = model._default_manager.all()
+    queryset.query = query
+    return filter_shard(queryset, shard)
+
+
+def _reset_connections():
+    # Connections inherited from the parent process share its sockets.
+    # Keep them referenced so they aren't closed and let Django connect
+    # afresh. In memory SQLite databases only exist in the inherited
+    # connection.
+    global _inherited
+    if _inherited is not None:
+        return
+    _inherited = []
+    for connection in connections.all():
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            continue
+        _inherited.append(connection.connection)
+        connection.connection = None
+
+
+def serialize_shard(format, model, query, shard, fields, indent):
+    """
+    Serialize the objects of shard, None if it is empty. Runs in worker
+    processes.
+    """
+    if not apps.ready:
+        django.setup()
+    _reset_connections()
+    queryset = get_shard_queryset(model, query, shard)
+    if not queryset.exists():
+        return None
+    return utils.serialize(format, queryset, fields, indent)
+
+
+def join(format, shards):
+    """
+    Join the serialized data of shards, skipping empty shards, like
+    consecutive streamed chunks. Return None if all shards are empty.
+    """
+    shards = [data for data in shards if data is not None]
+    if not shards:
+        return None
+    if format == 'python':
+        return list(chain.from_iterable(shards))
+    return ''.join(utils.join_chunks(format, shards))
+
+
+def can_shard(format, queryset):
+    return ProcessPoolExecutor is not None and \
+        isinstance(queryset, QuerySet) and \
+        (format == 'python' or format in utils.STREAM_SPLITTERS) and \
+        utils.get_keyset_ordering(queryset) is not None
+
+
+def serialize(format, queryset, fields=[], indent=4, processes=None):
+    """
+    Serialize queryset in format across processes worker processes,
+    EXPORT_PROCESSES by default. Querysets and formats that can't be
+    sharded, or with too few objects, are serialized in this process.
+    """
+    processes = processes or get_processes()
+    if processes < 2 or not can_shard(format, queryset):
+        return utils.serialize(format, queryset, fields, indent)
+
+    total = queryset.count()
+    count = min(processes, -(-total // utils.get_chunk_size()))
+    if count < 2:
+        return utils.serialize(format, queryset, fields, indent)
+
+    # Resolve automatic indentation for the whole queryset, not per shard.
+    indent = utils.get_serializer_options(
+        format, queryset, fields, indent
+    )['indent']
+    shards = get_shards(queryset, count)
+    with ProcessPoolExecutor(max_workers=count) as executor:
+        futures = [
+            executor.submit(
+                serialize_shard, format, queryset.model, queryset.query,
+                shard, fields, indent
+            )
+            for shard in shards
+        ]
+        data = join(format, [future.result() for future in futures])
+    # Objects serialized by the workers aren't counted in this process.
+    metrics.add_rows(total)
+    if data is None:
+        return utils.serialize(format, [], fields, indent)
+    return data
@@ -0,0 +1,129 @@
+"""
+Fetch the many to many relations of exported objects a chunk at a time.
+
+Django's serializers query the related objects of each many to many field
+of each object they serialize, prefetched objects are not used. Instead the
+primary keys related to a chunk of objects are fetched from the through
+table of each field in one query and handed to the serializer, so the number
+of queries of an export grows with its chunks rather than its objects.
+
+Foreign keys need no prefetching, they are serialized from the value of
+their column. The related object is only fetched for natural keys, which
+exports don't use.
+"""
+from collections import defaultdict
+
+from django.core.serializers.python import Serializer as PythonSerializer
+from django.core.serializers.xml_serializer import Serializer as \
+    XMLSerializer
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.utils import six
+from django.utils.encoding import force_text
+
+
+def get_m2m_fields(model, fields=None):
+    """
+    Return the many to many fields of model the serializer serializes with
+    the selected fields, all fields if fields is empty.
+    """
+    return [
+        field for field in model._meta.concrete_model._meta.many_to_many
+        if field.serialize and field.remote_field.through._meta.auto_created
+        and (not fields or field.attname in fields)
+    ]
+
+
+def get_ordering(field):
+    """
+    Return the ordering of the through table of field listing related
+    objects the way the serializer does, in the default ordering of their
+    model. Unordered relations are ordered on the related primary key.
+    """
+    target = field.m2m_reverse_field_name()
+    ordering = []
+    for name in field.remote_field.model._meta.ordering:
+        if not isinstance(name, six.string_types) or name == '?':
+            continue
+        if name.startswith('-'):
+            ordering.append('-%s__%s' % (target, name[1:]))
+        else:
+            ordering.append('%s__%s' % (target, name))
+    return ordering or [target]
+
+
+def get_related(field, pks, using=None):
+    """
+    Return a dict of the lists of primary keys of the objects related to
+    each of pks by the many to many field. pks are queried in batches the
+    database can take as query parameters, one batch for most chunks.
+    """
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    queryset = field.remote_field.through._default_manager.using(using)
+    queryset = queryset.order_by(*get_ordering(field))
+    connection = connections[queryset.db]
+    batch_size = max(connection.ops.bulk_batch_size([source], pks), 1)
+
+    related = defaultdict(list)
+    for start in range(0, len(pks), batch_size):
+        batch = pks[start:start + batch_size]
+        rows = queryset.filter(**{'%s__in' % source: batch})
+        for pk, related_pk in rows.values_list(source, target):
+            related[pk].append(related_pk)
+    return related
+
+
+def _python_m2m_handler(serializer, related):
+    handle_m2m_field = serializer.handle_m2m_field
+
+    def handle(obj, field):
+        if field.name not in related or serializer.use_natural_foreign_keys:
+            return handle_m2m_field(obj, field)
+        serializer._current[field.name] = [
+            force_text(pk, strings_only=True)
+            for pk in related[field.name].get(obj.pk, [])
+        ]
+    return handle
+
+
+def _xml_m2m_handler(serializer, related):
+    handle_m2m_field = serializer.handle_m2m_field
+
+    def handle(obj, field):
+        if field.name not in related or serializer.use_natural_foreign_keys:
+            return handle_m2m_field(obj, field)
+        serializer._start_relational_field(field)
+        for pk in related[field.name].get(obj.pk, []):
+            serializer.xml.addQuickElement('object', attrs={
+                'pk': force_text(pk)
+            })
+        serializer.xml.endElement('field')
+    return handle
+
+
+def iter_objects(serializer, queryset, chunks, fields=None):
+    """
+    Yield the objects of chunks of queryset, having serializer serialize
+    their many to many fields from primary keys fetched a chunk at a time.
+    Serializers not derived from the python or xml serializers query them
+    per object as usual.
+    """
+    m2m_fields = []
+    if isinstance(queryset, QuerySet):
+        m2m_fields = get_m2m_fields(queryset.model, fields)
+    related = {}
+    if isinstance(serializer, PythonSerializer):
+        serializer.handle_m2m_field = _python_m2m_handler(serializer, related)
+    elif isinstance(serializer, XMLSerializer):
+        serializer.handle_m2m_field = _xml_m2m_handler(serializer, related)
+    else:
+        m2m_fields = []
+
+    for chunk in chunks:
+        if m2m_fields:
+            pks = [obj.pk for obj in chunk]
+            for field in m2m_fields:
+                related[field.name] = get_related(field, pks, queryset.db)
+        for obj in chunk:
+            yield obj
@@ -0,0 +1,91 @@
+"""
+Export fields of related objects by following foreign keys.
+
+Relation paths name a field of a related object the way queryset lookups
+do, e.g. ``customer__region__name``, following foreign keys and one to one
+fields from the exported model. They are fetched with the exported objects
+in one joined values_list() query and serialized as fields named by their
+path, flattened into columns by the CSV serializer.
+"""
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.constants import LOOKUP_SEP
+from django.utils.text import capfirst
+
+# Default number of relations followed to list related fields on the export
+# page, override with the EXPORT_RELATION_DEPTH setting.
+DEPTH = 2
+
+
+def get_depth():
+    return getattr(settings, 'EXPORT_RELATION_DEPTH', DEPTH)
+
+
+def is_path(name):
+    return LOOKUP_SEP in name
+
+
+def can_follow(field):
+    return field.concrete and (field.many_to_one or field.one_to_one)
+
+
+def get_path_fields(model, path):
+    """
+    Return the fields followed by the relation path from model, ending with
+    the field named last. Raise FieldDoesNotExist if path doesn't follow
+    foreign keys or one to one fields to a concrete field.
+    """
+    fields = []
+    for name in path.split(LOOKUP_SEP):
+        if fields:
+            if not can_follow(fields[-1]):
+                raise FieldDoesNotExist(
+                    '%s does not follow a foreign key' % path
+                )
+            model = fields[-1].related_model
+        field = model._meta.get_field(name)
+        if not field.concrete or field.many_to_many:
+            raise FieldDoesNotExist('%s is not a concrete field' % path)
+        fields.append(field)
+    return fields
+
+
+def get_field(model, name):
+    """
+    Return the field of model named name, or the last field of the relation
+    path name.
+    """
+    if is_path(name):
+        return get_path_fields(model, name)[-1]
+    return model._meta.get_field(name)
+
+
+def get_choices(model, depth=None, prefix='', label='', followed=()):
+    """
+    Return (path, label) choices for the fields of objects related to model
+    by up to depth foreign keys, the EXPORT_RELATION_DEPTH setting by
+    default. Relations back to a model already followed are skipped.
+    """
+    if depth is None:
+        depth = get_depth()
+    followed = followed + (model,)
+    choices = []
+    if depth < 1:
+        return choices
+    for field in model._meta.fields:
+        if not can_follow(field) or field.related_model in followed:
+            continue
+        related_prefix = '%s%s%s' % (prefix, field.name, LOOKUP_SEP)
+        related_label = '%s%s / ' % (label, capfirst(field.verbose_name))
+        for related_field in field.related_model._meta.fields:
+            if related_field.formfield() is None:
+                continue
+            choices.append((
+                related_prefix + related_field.name,
+                '%s%s' % (related_label, capfirst(related_field.verbose_name))
+            ))
+        choices.extend(get_choices(
+            field.related_model, depth - 1, related_prefix, related_label,
+            followed
+        ))
+    return choices
@@ -0,0 +1,38 @@
+"""
+Serialize data to/from the Apache Arrow IPC file format.
+
+Record batches are compressed with the codec given by the ``compression``
+option, lz4 by default, use None for uncompressed files readable by
+pyarrow < 2.0. See columnar.py for how fields are typed.
+"""
+import pyarrow
+import pyarrow.ipc
+
+from export.serializers import columnar
+
+
+class Serializer(columnar.Serializer):
+    """
+    Convert a queryset to an Arrow IPC file.
+    """
+
+    def open_writer(self, schema):
+        compression = self.options.get('compression', 'lz4')
+        if compression is None:
+            return pyarrow.ipc.new_file(self.stream, schema)
+        return pyarrow.ipc.new_file(
+            self.stream, schema,
+            options=pyarrow.ipc.IpcWriteOptions(compression=compression)
+        )
+
+
+def Deserializer(stream_or_string, **options):
+    """
+    Deserialize a stream or string of Arrow IPC file data.
+    """
+    reader = pyarrow.ipc.open_file(columnar.get_source(stream_or_string))
+    batches = (
+        reader.get_batch(i) for i in range(reader.num_record_batches)
+    )
+    for obj in columnar.Deserializer(batches, **options):
+        yield obj
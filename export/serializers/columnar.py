@@ -0,0 +1,202 @@
+"""
+Base classes for serializing to and from columnar Apache Arrow formats.
+
+Objects are collected into record batches of EXPORT_CHUNK_SIZE rows which
+are written to the stream as they fill up. Columns are typed from the model
+fields:
+
+- Integer, boolean, float, decimal, date, datetime and time fields map to the
+  corresponding Arrow types
+- Related fields take the type of the field they refer to, many to many
+  fields are lists of it
+- Fields of related objects exported by relation path take the type of the
+  field the path ends with
+- All other fields are strings
+
+Only objects of a single model can be serialized to one stream.
+"""
+from io import BytesIO
+
+import pyarrow
+
+from django.conf import settings
+from django.core.serializers.base import DeserializationError, \
+    SerializationError
+from django.core.serializers.python import Serializer as PythonSerializer
+from django.core.serializers.python import Deserializer as PythonDeserializer
+from django.utils import six, timezone
+from django.utils.encoding import force_text
+
+from export import relations, utils
+
+INTEGER_FIELDS = (
+    'AutoField', 'BigAutoField', 'BigIntegerField', 'IntegerField',
+    'PositiveIntegerField', 'PositiveSmallIntegerField', 'SmallIntegerField',
+)
+
+
+def get_arrow_type(field):
+    """
+    Return the Arrow type of values of field.
+    """
+    if field.many_to_many:
+        return pyarrow.list_(get_arrow_type(field.target_field))
+    if field.remote_field is not None:
+        return get_arrow_type(field.target_field)
+    internal_type = field.get_internal_type()
+    if internal_type in INTEGER_FIELDS:
+        return pyarrow.int64()
+    if internal_type in ('BooleanField', 'NullBooleanField'):
+        return pyarrow.bool_()
+    if internal_type == 'FloatField':
+        return pyarrow.float64()
+    if internal_type == 'DecimalField' and field.max_digits <= 38:
+        return pyarrow.decimal128(field.max_digits, field.decimal_places)
+    if internal_type == 'DateField':
+        return pyarrow.date32()
+    if internal_type == 'DateTimeField':
+        if settings.USE_TZ:
+            return pyarrow.timestamp('us', tz='UTC')
+        return pyarrow.timestamp('us')
+    if internal_type == 'TimeField':
+        return pyarrow.time64('us')
+    return pyarrow.string()
+
+
+def get_converter(arrow_type):
+    """
+    Return a function converting serialized values to values accepted by
+    the Arrow type, None if values are accepted as is.
+    """
+    if arrow_type == pyarrow.string():
+        def convert(value):
+            if value is None:
+                return value
+            return force_text(value)
+        return convert
+    if arrow_type == pyarrow.timestamp('us', tz='UTC'):
+        def convert(value):
+            if value is None or timezone.is_naive(value):
+                return value
+            return timezone.make_naive(value, timezone.utc)
+        return convert
+    return None
+
+
+class Serializer(PythonSerializer):
+    """
+    Convert a queryset to record batches written by the writer returned from
+    open_writer().
+    """
+    internal_use_only = False
+    stream_class = BytesIO
+
+    def open_writer(self, schema):
+        """
+        Return a writer for schema on self.stream with write_batch() and
+        close() methods.
+        """
+        raise NotImplementedError(
+            'subclasses of columnar Serializer must provide an open_writer() '
+            'method'
+        )
+
+    def start_serialization(self):
+        super(Serializer, self).start_serialization()
+        self.batch_size = utils.get_chunk_size()
+        self.model = None
+        self.schema = None
+        self.converters = None
+        self.writer = None
+
+    def start_table(self, obj):
+        self.model = obj._meta.concrete_model
+        opts = self.model._meta
+        fields = [opts.pk] + [
+            relations.get_field(self.model, name)
+            for name in self._current.keys()
+        ]
+        types = [get_arrow_type(field) for field in fields]
+        types.insert(1, pyarrow.string())
+        names = ['pk', 'model'] + list(self._current.keys())
+        self.schema = pyarrow.schema(list(zip(names, types)))
+        self.converters = [get_converter(t) for t in types]
+        self.columns = [[] for name in names]
+        self.writer = self.open_writer(self.schema)
+
+    def end_object(self, obj):
+        if self.model is None:
+            self.start_table(obj)
+        elif obj._meta.concrete_model is not self.model:
+            raise SerializationError(
+                'Objects of a single model can be serialized to %s, got %s '
+                'and %s.' % (
+                    self.__class__.__module__, self.model._meta,
+                    obj._meta.concrete_model._meta
+                )
+            )
+        d = self.get_dump_object(obj)
+        row = [d['pk'], d['model']] + list(d['fields'].values())
+        for column, value in zip(self.columns, row):
+            column.append(value)
+        self._current = None
+        if len(self.columns[0]) >= self.batch_size:
+            self.write_batch()
+
+    def write_batch(self):
+        arrays = []
+        for column, converter, field in zip(
+                self.columns, self.converters, self.schema):
+            if converter is not None:
+                column = [converter(value) for value in column]
+            arrays.append(pyarrow.array(column, type=field.type))
+        self.writer.write_batch(
+            pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema)
+        )
+        self.columns = [[] for field in self.schema]
+
+    def end_serialization(self):
+        if self.writer is None:
+            # Nothing to serialize, write a table without columns.
+            self.schema = pyarrow.schema([])
+            self.writer = self.open_writer(self.schema)
+        elif self.columns[0]:
+            self.write_batch()
+        self.writer.close()
+
+    def getvalue(self):
+        if callable(getattr(self.stream, 'getvalue', None)):
+            return self.stream.getvalue()
+
+
+def iter_rows(batches):
+    """
+    Yield python serializer dicts for rows in record batches.
+    """
+    for batch in batches:
+        names = batch.schema.names
+        if names[:2] != ['pk', 'model']:
+            raise DeserializationError(
+                'Expected pk and model columns, got %s.' % names[:2]
+            )
+        columns = [column.to_pylist() for column in batch.columns]
+        for row in zip(*columns):
+            yield {
+                'pk': row[0],
+                'model': row[1],
+                'fields': dict(zip(names[2:], row[2:])),
+            }
+
+
+def Deserializer(batches, **options):
+    """
+    Deserialize record batches.
+    """
+    for obj in PythonDeserializer(iter_rows(batches), **options):
+        yield obj
+
+
+def get_source(stream_or_string):
+    if isinstance(stream_or_string, (six.binary_type, bytearray)):
+        return pyarrow.BufferReader(stream_or_string)
+    return stream_or_string
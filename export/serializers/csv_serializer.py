@@ -26,69 +26,146 @@ try:
 except ImportError:
     from io import StringIO
 
-from itertools import groupby
-from operator import itemgetter
-
+from django.core.exceptions import FieldDoesNotExist
 from django.core.serializers.python import Serializer as PythonSerializer
 from django.core.serializers.python import Deserializer as PythonDeserializer
+from django.db import models
 from django.utils import six
 from django.utils.encoding import smart_text
 
+from export import relations
+
 
 class Serializer(PythonSerializer):
     """
     Convert a queryset to CSV.
+
+    Rows are written to the stream as objects are visited, a header is
+    written before the first object of each model.
     """
     internal_use_only = False
 
-    def end_serialization(self):
-
-        def process_item(item):
-            if isinstance(item, (list, tuple)):
-                item = process_m2m(item)
-            elif isinstance(item, bool):
-                item = str(item).upper()
-            elif isinstance(item, six.string_types):
-                if item in ('TRUE', 'FALSE', 'NULL') or _LIST_RE.match(item):
-                    # Wrap these in quotes, so as not to be confused with
-                    # builtin types when deserialized
-                    item = "'%s'" % item
-            elif item is None:
-                item = 'NULL'
-            return smart_text(item)
-
-        def process_m2m(seq):
-            parts = []
-            for item in seq:
-                if isinstance(item, (list, tuple)):
-                    parts.append(process_m2m(item))
-                else:
-                    parts.append(process_item(item))
-            return '[%s]' % ', '.join(parts)
-
-        writer = UnicodeWriter(self.stream)
-        # Group objects by model and write out a header and rows for each.
+    def start_serialization(self):
+        super(Serializer, self).start_serialization()
+        self.writer = UnicodeWriter(self.stream)
+        self.current_model = None
+
+    def end_object(self, obj):
+        # "flatten" the object. PK and model values come first, then field
+        # values. Flat is better than nested, right? :-)
+        d = self.get_dump_object(obj)
+        pk, model, fields = d['pk'], d['model'], d['fields']
+        # Rows of aggregate exports have no primary key.
+        pk = 'NULL' if pk is None else smart_text(pk)
+        model = smart_text(model)
         # Multiple models can be present when invoking from the command
         # line, e.g.: `python manage.py dumpdata --format csv auth`
-        for k, g in groupby(self.objects, key=itemgetter('model')):
-            write_header = True
-            for d in g:
-                # "flatten" the object. PK and model values come first,
-                # then field values. Flat is better than nested, right? :-)
-                pk, model, fields = d['pk'], d['model'], d['fields']
-                pk, model = smart_text(pk), smart_text(model)
-                row = [pk, model] + list(map(process_item, fields.values()))
-                if write_header:
-                    header = ['pk', 'model'] + list(fields.keys())
-                    writer.writerow(header)
-                    write_header = False
-                writer.writerow(row)
+        if model != self.current_model:
+            self.writer.writerow(['pk', 'model'] + list(fields.keys()))
+            self.current_model = model
+            self.encoders = get_encoders(
+                obj._meta.concrete_model, fields.keys()
+            )
+        self.writer.writerow([pk, model] + [
+            encode(value)
+            for encode, value in zip(self.encoders, fields.values())
+        ])
+        self._current = None
 
     def getvalue(self):
         if callable(getattr(self.stream, 'getvalue', None)):
             return self.stream.getvalue()
 
 
+def process_item(item):
+    if isinstance(item, (list, tuple)):
+        item = process_m2m(item)
+    elif isinstance(item, bool):
+        item = str(item).upper()
+    elif isinstance(item, six.string_types):
+        if item in _RESERVED or _LIST_RE.match(item):
+            # Wrap these in quotes, so as not to be confused with
+            # builtin types when deserialized
+            item = "'%s'" % item
+    elif item is None:
+        item = 'NULL'
+    return smart_text(item)
+
+
+def process_m2m(seq):
+    parts = []
+    for item in seq:
+        if isinstance(item, (list, tuple)):
+            parts.append(process_m2m(item))
+        else:
+            parts.append(process_item(item))
+    return '[%s]' % ', '.join(parts)
+
+
+def encode_value(item):
+    if item is None:
+        return 'NULL'
+    return smart_text(item)
+
+
+def encode_bool(item):
+    if item is True:
+        return 'TRUE'
+    if item is False:
+        return 'FALSE'
+    return process_item(item)
+
+
+def encode_text(item):
+    if item.__class__ is not six.text_type:
+        return process_item(item)
+    if item in _RESERVED or item[:1] == '[' and _LIST_RE.match(item):
+        return "'%s'" % item
+    return item
+
+
+# Encoders of the values of model fields by their exact class, fields of
+# other classes, including subclasses, are encoded with process_item().
+FIELD_ENCODERS = {
+    models.AutoField: encode_value,
+    models.BigIntegerField: encode_value,
+    models.DateField: encode_value,
+    models.DateTimeField: encode_value,
+    models.DecimalField: encode_value,
+    models.FloatField: encode_value,
+    models.IntegerField: encode_value,
+    models.PositiveIntegerField: encode_value,
+    models.PositiveSmallIntegerField: encode_value,
+    models.SmallIntegerField: encode_value,
+    models.TimeField: encode_value,
+    models.BooleanField: encode_bool,
+    models.NullBooleanField: encode_bool,
+    models.CharField: encode_text,
+    models.EmailField: encode_text,
+    models.SlugField: encode_text,
+    models.TextField: encode_text,
+    models.URLField: encode_text,
+}
+
+
+def get_encoders(model, names):
+    """
+    Return the functions encoding the values of the fields of model named
+    names into cells, chosen once per model from the field classes.
+    """
+    encoders = []
+    for name in names:
+        try:
+            field = relations.get_field(model, name)
+        except FieldDoesNotExist:
+            # Values like aggregates aren't model fields.
+            field = None
+        encoders.append(FIELD_ENCODERS.get(type(field), process_item))
+    return encoders
+
+
+_RESERVED = ('TRUE', 'FALSE', 'NULL')
+
 _QUOTED_BOOL_NULL = """ 'TRUE' 'FALSE' 'NULL' "TRUE" "FALSE" "NULL" """.split()
 
 # regular expressions used in deserialization
@@ -148,28 +225,34 @@ def Deserializer(stream_or_string, **options):
             li = _SPLIT_RE.split(contents)
         return li
 
+    def iter_objects(reader):
+        try:
+            header = next(reader)  # first line must be a header
+        except StopIteration:
+            return
+        for row in reader:
+            # Need to account for the presence of multiple headers in
+            # the stream since serialized data can contain them.
+            if row[:2] == ['pk', 'model']:
+                # Not the best check. Perhaps csv.Sniffer.has_header
+                # would be better?
+                header = row
+                continue
+            d = dict(zip(header[:2], row[:2]))
+            d['fields'] = dict(zip(header[2:], map(process_item, row[2:])))
+            yield d
+
+    if six.PY3 and isinstance(stream_or_string, bytes):
+        stream_or_string = stream_or_string.decode('utf-8')
     if isinstance(stream_or_string, six.string_types):
         stream = StringIO(stream_or_string)
     else:
         stream = stream_or_string
 
+    # Rows are parsed and deserialized one at a time, so memory use doesn't
+    # grow with the size of the stream.
     reader = UnicodeReader(stream)
-    header = next(reader)  # first line must be a header
-
-    data = []
-    for row in reader:
-        # Need to account for the presence of multiple headers in
-        # the stream since serialized data can contain them.
-        if row[:2] == ['pk', 'model']:
-            # Not the best check. Perhaps csv.Sniffer.has_header
-            # would be better?
-            header = row
-            continue
-        d = dict(zip(header[:2], row[:2]))
-        d['fields'] = dict(zip(header[2:], map(process_item, row[2:])))
-        data.append(d)
-
-    for obj in PythonDeserializer(data, **options):
+    for obj in PythonDeserializer(iter_objects(reader), **options):
         yield obj
 
 
@@ -186,22 +269,43 @@ class UTF8Recoder(object):
         return self
 
     def next(self):
-        return self.reader.next().encode('utf-8')
+        return next(self.reader).encode('utf-8')
+    __next__ = next
+
+
+def iter_decoded(f, encoding):
+    """
+    Iterate over the lines of "f", decoding them from the given encoding if
+    "f" is a binary stream.
+    """
+    for line in f:
+        if isinstance(line, bytes):
+            line = line.decode(encoding)
+        yield line
 
 
 class UnicodeReader(object):
     """
     A CSV reader which will iterate over lines in the CSV file "f",
     which is encoded in the given encoding.
+
+    On Python 3 "f" can be a text or binary stream, lines are read from it
+    one at a time.
     """
 
     def __init__(self, f, dialect=csv.excel, encoding='utf-8', **kwds):
-        f = UTF8Recoder(f, encoding)
+        if six.PY3:
+            f = iter_decoded(f, encoding)
+        else:
+            f = UTF8Recoder(f, encoding)
         self.reader = csv.reader(f, dialect=dialect, **kwds)
 
     def next(self):
-        row = self.reader.next()
-        return [unicode(s, 'utf-8') for s in row]
+        row = next(self.reader)
+        if six.PY3:
+            return row
+        return [six.text_type(s, 'utf-8') for s in row]
+    __next__ = next
 
     def __iter__(self):
         return self
@@ -211,30 +315,35 @@ class UnicodeWriter(object):
     """
     A CSV writer which will write rows to CSV file "f", which is encoded in
     the given encoding.
+
+    On Python 3 rows are written to "f" directly, "f" must be a text stream.
     """
 
     def __init__(self, f, dialect=csv.excel, encoding='utf-8',
                  quoting=csv.QUOTE_ALL, **kwds):
+        self.stream = f
+        if six.PY3:
+            self.writer = csv.writer(
+                f, dialect=dialect, quoting=quoting, **kwds
+            )
+            return
         # Redirect output to a queue
         self.queue = StringIO()
         self.writer = csv.writer(
             self.queue, dialect=dialect, quoting=quoting, **kwds
         )
-        self.stream = f
         self.encoder = codecs.getincrementalencoder(encoding)()
 
     def writerow(self, row):
-        if six.PY2:
-            self.writer.writerow([s.encode('utf-8') for s in row])
-        elif six.PY3:
+        if six.PY3:
             self.writer.writerow(row)
+            return
+        self.writer.writerow([s.encode('utf-8') for s in row])
         # Fetch UTF-8 output from the queue ...
         data = self.queue.getvalue()
-        if six.PY2:
-            data = data.decode('utf-8')
-            # ... and reencode it into the target encoding
-            data = self.encoder.encode(data)
-
+        data = data.decode('utf-8')
+        # ... and reencode it into the target encoding
+        data = self.encoder.encode(data)
         # write to the target stream
         self.stream.write(data)
         # empty queue and reset position
@@ -242,5 +351,8 @@ class UnicodeWriter(object):
         self.queue.seek(0)
 
     def writerows(self, rows):
+        if six.PY3:
+            self.writer.writerows(rows)
+            return
         for row in rows:
             self.writerow(row)
@@ -0,0 +1,71 @@
+"""
+Serialize data to/from JSON Lines
+
+Each object is serialized as compact JSON on a line of its own, written as
+soon as the object is visited. Data can be consumed, and deserialized, a
+line at a time. The ``indent`` option is ignored.
+
+See also:
+http://jsonlines.org/
+
+"""
+from __future__ import absolute_import
+
+import json
+import sys
+
+from django.core.serializers.base import DeserializationError
+from django.core.serializers.json import Serializer as JSONSerializer
+from django.core.serializers.python import Deserializer as PythonDeserializer
+from django.utils import six
+
+
+class Serializer(JSONSerializer):
+    """
+    Convert a queryset to JSON Lines.
+    """
+    internal_use_only = False
+
+    def _init_options(self):
+        super(Serializer, self)._init_options()
+        self.json_kwargs.pop('indent', None)
+        self.json_kwargs['separators'] = (',', ':')
+
+    def start_serialization(self):
+        self._init_options()
+
+    def end_serialization(self):
+        pass
+
+    def end_object(self, obj):
+        json.dump(self.get_dump_object(obj), self.stream, **self.json_kwargs)
+        self.stream.write('\n')
+        self._current = None
+
+
+def Deserializer(stream_or_string, **options):
+    """
+    Deserialize a stream or string of JSON Lines data a line at a time.
+    """
+    if isinstance(stream_or_string, (bytes, six.string_types)):
+        lines = stream_or_string.splitlines()
+    else:
+        lines = stream_or_string
+
+    def objects():
+        for line in lines:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            if line.strip():
+                yield json.loads(line)
+
+    try:
+        for obj in PythonDeserializer(objects(), **options):
+            yield obj
+    except (GeneratorExit, DeserializationError):
+        raise
+    except Exception as e:
+        # Map to deserializer error
+        six.reraise(
+            DeserializationError, DeserializationError(e), sys.exc_info()[2]
+        )
@@ -0,0 +1,55 @@
+"""
+Serialize data to/from Apache Parquet.
+
+Each record batch is written as a row group, compressed with the codec given
+by the ``compression`` option, snappy by default. See columnar.py for how
+fields are typed.
+"""
+import pyarrow
+import pyarrow.parquet
+
+from export.serializers import columnar
+
+
+class Serializer(columnar.Serializer):
+    """
+    Convert a queryset to Parquet.
+    """
+
+    def open_writer(self, schema):
+        writer = pyarrow.parquet.ParquetWriter(
+            self.stream, schema,
+            compression=self.options.get('compression', 'snappy')
+        )
+        return ParquetBatchWriter(writer)
+
+
+class ParquetBatchWriter(object):
+    """
+    Writes record batches as row groups with a ParquetWriter.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+
+    def write_batch(self, batch):
+        self.writer.write_table(pyarrow.Table.from_batches([batch]))
+
+    def close(self):
+        self.writer.close()
+
+
+def Deserializer(stream_or_string, **options):
+    """
+    Deserialize a stream or string of Parquet data.
+    """
+    parquet_file = pyarrow.parquet.ParquetFile(
+        columnar.get_source(stream_or_string)
+    )
+    batches = (
+        batch
+        for i in range(parquet_file.num_row_groups)
+        for batch in parquet_file.read_row_group(i).to_batches()
+    )
+    for obj in columnar.Deserializer(batches, **options):
+        yield obj
@@ -0,0 +1,15 @@
+"""
+Signals sent by instrumented exports, see metrics.py. The sender is the
+model exported.
+"""
+from django.dispatch import Signal
+
+# Sent when an export starts.
+export_started = Signal(providing_args=['instrument'])
+
+# Sent for each chunk of size bytes of an export written to the response,
+# the mailed archive or default storage.
+export_chunk_written = Signal(providing_args=['instrument', 'size'])
+
+# Sent when an export finishes, or fails, with its metrics.
+export_finished = Signal(providing_args=['instrument', 'metrics'])
@@ -0,0 +1,102 @@
+/*
+ * Search related objects for model filters of the export form. Selects with
+ * a data-autocomplete attribute only list selected objects, others are found
+ * by searching and double clicked to select them.
+ */
+(function() {
+    'use strict';
+
+    function init(select) {
+        var url = select.getAttribute('data-autocomplete') +
+            '?field=' + encodeURIComponent(select.name);
+        var input = document.createElement('input');
+        var results = document.createElement('select');
+        var more = document.createElement('a');
+        var term = null;
+        var page = 1;
+        var timer = null;
+
+        input.type = 'text';
+        input.className = 'vTextField';
+        input.placeholder = 'Search';
+        results.multiple = true;
+        results.size = 8;
+        more.href = '#';
+        more.textContent = 'More';
+        more.style.display = 'none';
+        select.parentNode.insertBefore(input, select);
+        select.parentNode.insertBefore(results, select);
+        select.parentNode.insertBefore(more, select);
+
+        function load() {
+            var request = new XMLHttpRequest();
+            request.open('GET', url + '&term=' + encodeURIComponent(term) +
+                '&page=' + page);
+            request.onload = function() {
+                if (request.status !== 200) {
+                    return;
+                }
+                var data = JSON.parse(request.responseText);
+                if (page === 1) {
+                    results.options.length = 0;
+                }
+                data.results.forEach(function(result) {
+                    results.add(new Option(result.text, result.id));
+                });
+                more.style.display = data.more ? '' : 'none';
+            };
+            request.send();
+        }
+
+        function search() {
+            if (input.value !== term) {
+                term = input.value;
+                page = 1;
+                load();
+            }
+        }
+
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            timer = setTimeout(search, 250);
+        });
+        input.addEventListener('focus', search);
+        more.addEventListener('click', function(event) {
+            event.preventDefault();
+            page += 1;
+            load();
+        });
+        results.addEventListener('dblclick', function() {
+            Array.prototype.forEach.call(results.selectedOptions, function(
+                option
+            ) {
+                var exists = Array.prototype.some.call(
+                    select.options, function(selected) {
+                        return selected.value === option.value;
+                    }
+                );
+                if (!exists) {
+                    select.add(new Option(option.text, option.value));
+                }
+            });
+        });
+        select.addEventListener('dblclick', function() {
+            Array.prototype.slice.call(select.selectedOptions).forEach(
+                function(option) {
+                    select.removeChild(option);
+                }
+            );
+        });
+        // Submit every listed object, not only highlighted ones.
+        select.form.addEventListener('submit', function() {
+            Array.prototype.forEach.call(select.options, function(option) {
+                option.selected = true;
+            });
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        var selects = document.querySelectorAll('select[data-autocomplete]');
+        Array.prototype.forEach.call(selects, init);
+    });
+})();
@@ -1,7 +1,45 @@
+import json
+
+from export import distributed, jobs
+from export.downloads import mail_export as mail_export_link
+from export.models import ExportJob
 from export.utils import mail_export
 
 try:
-    from celery import task
+    from celery import chord, task
     mail_export = task(mail_export)
+    mail_export_link = task(mail_export_link)
+    export_part = task(distributed.export_part)
+    merge_parts = task(distributed.merge_parts)
+    # Acknowledged once run, so the task of a worker that dies is
+    # redelivered and resumes the job.
+    run_export_job = task(acks_late=True)(jobs.run_job)
+    fail_export_distributed = task(distributed.fail_job)
+
+    @task
+    def mail_export_distributed(job_id):
+        """
+        Export the parts of an export job in a chord of export_part tasks
+        and mail them once merged by merge_parts.
+        """
+        job = ExportJob.objects.get(pk=job_id)
+        serializer_kwargs, query_kwargs, delta = jobs.get_kwargs(job)
+        parts = distributed.get_parts(serializer_kwargs, query_kwargs, delta)
+        names = distributed.get_part_names(
+            job.pk, serializer_kwargs['format'], len(parts)
+        )
+        job.parameters = json.dumps(
+            dict(json.loads(job.parameters), parts=names)
+        )
+        job.status = ExportJob.RUNNING
+        job.save(update_fields=['parameters', 'status', 'updated'])
+        chord(
+            export_part.s(*args + (name,))
+            for args, name in zip(parts, names)
+        )(merge_parts.s(
+            query_kwargs['model'], job.email, job.filename,
+            serializer_kwargs, job.download_url or None, delta, job.pk,
+            job.user_id
+        ).on_error(fail_export_distributed.si(job.pk)))
 except ImportError:
     pass
@@ -0,0 +1,138 @@
+import json
+import shutil
+import tempfile
+import zipfile
+
+from django.contrib.admin.models import ADDITION, CHANGE, LogEntry
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import six
+
+from export import aggregates, forms, jobs, tools
+
+
+class AggregatesTestCase(TestCase):
+    """
+    Testcase for exporting aggregates instead of objects.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            'super', 'super@user.com', 'super007'
+        )
+        for i in range(3):
+            user = User.objects.create_user('user%s' % i)
+            for flag in [ADDITION, CHANGE][:i + 1]:
+                LogEntry.objects.create(
+                    user=user, object_repr='entry', action_flag=flag
+                )
+
+    def get_form(self, **data):
+        data.setdefault('export_format', 'json')
+        return forms.Export(LogEntry, data)
+
+    def test_choices(self):
+        choices = dict(forms.get_metadata(LogEntry).aggregate_choices)
+        self.assertEqual(choices['pk__count'], 'Number of objects')
+        self.assertEqual(choices['action_flag__avg'], 'Average of action flag')
+        self.assertNotIn('id__sum', choices)
+
+    def test_form(self):
+        form = self.get_form(export_group_by=['user__username'])
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(
+            aggregates.get_aggregates(form.cleaned_data), ['pk__count']
+        )
+        form = self.get_form()
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertFalse(aggregates.is_aggregate(form.cleaned_data))
+        form = self.get_form(
+            export_format='xml', export_aggregates=['pk__count']
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn('__all__', form.errors)
+
+    def test_get_rows(self):
+        queryset = LogEntry.objects.all()
+        self.assertEqual(
+            aggregates.get_rows(
+                queryset, ['user__username'],
+                ['pk__count', 'action_flag__max']
+            ),
+            [('user0', 1, ADDITION), ('user1', 2, CHANGE),
+             ('user2', 2, CHANGE)]
+        )
+        self.assertEqual(
+            aggregates.get_rows(queryset, [], ['pk__count']), [(5,)]
+        )
+
+    def test_serialize(self):
+        with self.assertNumQueries(1):
+            data = aggregates.serialize(
+                'csv', LogEntry.objects.all(), ['action_flag'],
+                ['pk__count', 'action_flag__sum']
+            )
+        self.assertEqual(data.splitlines(), [
+            '"pk","model","action_flag","pk__count","action_flag__sum"',
+            '"NULL","admin.logentry","1","3","3"',
+            '"NULL","admin.logentry","2","2","4"',
+        ])
+
+    def test_get_data(self):
+        form = self.get_form(
+            export_group_by=['user'], export_aggregates=['pk__count'],
+            object_repr='entry'
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        format, data = tools.Export(LogEntry).get_data(form)
+        self.assertEqual(
+            [obj['fields'] for obj in json.loads(data)],
+            [
+                {'user': user.pk, 'pk__count': count}
+                for user, count in zip(
+                    User.objects.filter(username__startswith='user')
+                    .order_by('pk'),
+                    [1, 2, 2]
+                )
+            ]
+        )
+        format, stream = tools.Export(LogEntry).get_stream(form)
+        self.assertEqual(''.join(stream), data)
+
+    @override_settings(EXPORT_CACHE='default')
+    def test_cache_invalidation(self):
+        caches['default'].clear()
+        form = self.get_form(export_group_by=['user__username'])
+        self.assertTrue(form.is_valid(), form.errors)
+        export = tools.Export(LogEntry)
+        format, data = export.get_data(form)
+        self.assertIn('user0', data)
+        user = User.objects.get(username='user0')
+        user.username = 'renamed'
+        user.save()
+        format, data = export.get_data(form)
+        self.assertNotIn('user0', data)
+        self.assertIn('renamed', data)
+
+    @override_settings(
+        EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'
+    )
+    def test_mail(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        form = self.get_form(export_aggregates=['action_flag__min'])
+        self.assertTrue(form.is_valid(), form.errors)
+        with override_settings(MEDIA_ROOT=media_root):
+            job = jobs.create_job(
+                form, LogEntry, self.user, 'super@user.com', 'export.json'
+            )
+            jobs.run_job(job.pk)
+        name, content, mimetype = mail.outbox[-1].attachments[0]
+        zip_file = zipfile.ZipFile(six.BytesIO(content))
+        data = zip_file.read(name[:-len('.zip')]).decode('utf-8')
+        self.assertEqual(
+            json.loads(data)[0]['fields'], {'action_flag__min': ADDITION}
+        )
@@ -0,0 +1,85 @@
+import json
+
+from django.contrib.admin.models import LogEntry
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from export import autocomplete, forms
+from export.tests.test_export_tool import MockDjangoObject
+
+
+class AutocompleteTestCase(TestCase):
+    """
+    Testcase for autocomplete related model filters.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_superuser('super', 'super@user.com', 'super007')
+        for i in range(5):
+            User.objects.create_user('user%s' % i, 'user%s@user.com' % i)
+        cls.url = '/object-tools/admin/logentry/export/autocomplete/'
+
+    def setUp(self):
+        self.client.login(username='super', password='super007')
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content.decode('utf-8'))
+        return [result['text'] for result in data['results']], data['more']
+
+    def test_search_field(self):
+        self.assertEqual(autocomplete.get_search_field(User), 'username')
+        self.assertEqual(
+            autocomplete.get_search_field(LogEntry), 'object_repr'
+        )
+        self.assertIsNone(autocomplete.get_search_field(MockDjangoObject))
+
+    def test_render_selected_only(self):
+        form = forms.Export(LogEntry)
+        with self.assertNumQueries(0):
+            html = str(form['user'])
+        self.assertIn('data-autocomplete="autocomplete/"', html)
+        self.assertNotIn('<option', html)
+
+        user = User.objects.get(username='user1')
+        form = forms.Export(LogEntry, {'user': [user.pk]})
+        with self.assertNumQueries(1):
+            html = str(form['user'])
+        self.assertEqual(html.count('<option'), 1)
+        self.assertIn('user1', html)
+        self.assertIn('export/js/autocomplete.js', str(form.media))
+
+    def test_validate_submitted(self):
+        user = User.objects.get(username='user1')
+        form = forms.Export(LogEntry, {'user': [user.pk]})
+        with self.assertNumQueries(1):
+            self.assertTrue(form.is_valid())
+        self.assertEqual(list(form.cleaned_data['user']), [user])
+        form = forms.Export(LogEntry, {'user': [0]})
+        self.assertFalse(form.is_valid())
+
+    @override_settings(EXPORT_AUTOCOMPLETE_PAGE_SIZE=2)
+    def test_view(self):
+        self.assertEqual(
+            self.search(field='user', term='user'), (['user0', 'user1'], True)
+        )
+        self.assertEqual(
+            self.search(field='user', term='user', page=3), (['user4'], False)
+        )
+        self.assertEqual(
+            self.search(field='user', term='s'), (['super'], False)
+        )
+        self.assertEqual(
+            self.search(field='content_type', term='99'), ([], False)
+        )
+
+    def test_view_errors(self):
+        response = self.client.get(self.url, {'field': 'action_time'})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(self.url, {'field': 'user', 'page': 'x'})
+        self.assertEqual(response.status_code, 404)
+        self.client.logout()
+        response = self.client.get(self.url, {'field': 'user'})
+        self.assertEqual(response.status_code, 403)
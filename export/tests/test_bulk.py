@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import Group, Permission, User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import six
+
+from export import bulk, utils
+
+
+class BulkLoadTestCase(TestCase):
+    """
+    Testcase for loading exports in bulk.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        permissions = list(Permission.objects.order_by('pk')[:3])
+        for i in range(5):
+            group = Group.objects.create(name='group%s' % i)
+            group.permissions.add(*permissions[:i % 4])
+        User.objects.create_user('user')
+
+    def dump(self):
+        data = utils.serialize('csv', Group.objects.order_by('pk'))
+        expected = [
+            (group.pk, group.name, list(
+                group.permissions.order_by('pk').values_list('pk', flat=True)
+            ))
+            for group in Group.objects.order_by('pk')
+        ]
+        Group.objects.all().delete()
+        return data, expected
+
+    def assertLoaded(self, expected):
+        self.assertEqual(
+            [
+                (group.pk, group.name, list(
+                    group.permissions.order_by('pk').values_list(
+                        'pk', flat=True
+                    )
+                ))
+                for group in Group.objects.order_by('pk')
+            ],
+            expected
+        )
+
+    def test_load(self):
+        data, expected = self.dump()
+        self.assertEqual(bulk.load('csv', data, batch_size=2), 5)
+        self.assertLoaded(expected)
+        # Sequences are reset past the loaded primary keys.
+        self.assertGreater(
+            Group.objects.create(name='new').pk, expected[-1][0]
+        )
+
+    def test_load_queries(self):
+        data, expected = self.dump()
+        with CaptureQueriesContext(connection) as context:
+            bulk.load('csv', six.StringIO(data), batch_size=2)
+        # Objects and relations are inserted a batch at a time, the last
+        # group has no permissions.
+        inserts = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('INSERT')
+        ]
+        self.assertEqual(len(inserts), 5)
+        self.assertLoaded(expected)
+
+    def test_command(self):
+        data, expected = self.dump()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'groups.csv')
+        with open(path, 'wb') as f:
+            f.write(data.encode('utf-8'))
+        stdout = six.StringIO()
+        call_command('loadexport', path, stdout=stdout)
+        self.assertEqual(
+            stdout.getvalue(), 'Loaded 5 objects from %s\n' % path
+        )
+        self.assertLoaded(expected)
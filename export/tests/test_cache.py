@@ -0,0 +1,116 @@
+from django.contrib.auth.models import Group, User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from export import cache, forms, tools, utils
+
+
+@override_settings(EXPORT_CACHE='default')
+class CacheTestCase(TestCase):
+    """
+    Testcase for caching exports.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(3):
+            User.objects.create_user('user%s' % i, 'user%s@user.com' % i)
+
+    def setUp(self):
+        caches['default'].clear()
+        self.export = tools.Export(User)
+
+    def get_form(self, **data):
+        data.setdefault('export_format', 'json')
+        data.setdefault('export_order_by', 'username')
+        data.setdefault('export_order_direction', 'asc')
+        form = forms.Export(User, data)
+        self.assertTrue(form.is_valid())
+        return form
+
+    def get_result(self, form):
+        return cache.get_result(cache.get_key(User, form.cleaned_data))
+
+    def test_cache_hit(self):
+        form = self.get_form()
+        format, data = self.export.get_data(form)
+        self.assertEqual(
+            data, utils.serialize('json', User.objects.order_by('username'))
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(self.export.get_data(form), (format, data))
+        with self.assertNumQueries(0):
+            format, stream = self.export.get_stream(form)
+            self.assertEqual(list(stream), [data])
+
+    def test_fingerprint(self):
+        form = self.get_form(export_fields=['username', 'email'])
+        self.assertEqual(
+            cache.fingerprint(User, form.cleaned_data),
+            cache.fingerprint(
+                User,
+                self.get_form(export_fields=['email', 'username']).cleaned_data
+            )
+        )
+        for data in [
+            {'export_format': 'xml'},
+            {'export_order_direction': 'dsc'},
+            {'username': 'user1'},
+        ]:
+            self.assertNotEqual(
+                cache.fingerprint(User, form.cleaned_data),
+                cache.fingerprint(
+                    User, self.get_form(
+                        export_fields=['username', 'email'], **data
+                    ).cleaned_data
+                )
+            )
+        self.assertNotEqual(
+            cache.fingerprint(User, self.get_form().cleaned_data),
+            cache.fingerprint(Group, self.get_form().cleaned_data)
+        )
+
+    def test_invalidation(self):
+        form = self.get_form()
+        format, data = self.export.get_data(form)
+        user = User.objects.get(username='user0')
+        user.first_name = 'changed'
+        user.save()
+        format, changed = self.export.get_data(form)
+        self.assertNotEqual(changed, data)
+        self.assertIn('changed', changed)
+
+        user.groups.add(Group.objects.create(name='group'))
+        self.assertIsNone(self.get_result(form))
+        self.export.get_data(form)
+        user.delete()
+        self.assertIsNone(self.get_result(form))
+
+    def test_invalidated_during_export(self):
+        form = self.get_form()
+        serialize = self.export.serialize
+
+        def save_during_export(*args, **kwargs):
+            data = serialize(*args, **kwargs)
+            User.objects.filter(username='user0').update(first_name='changed')
+            cache.invalidate(User)
+            return data
+
+        self.export.serialize = save_during_export
+        format, data = self.export.get_data(form)
+        del self.export.serialize
+        self.assertIsNone(self.get_result(form))
+        format, changed = self.export.get_data(form)
+        self.assertIn('changed', changed)
+
+    def test_max_size(self):
+        form = self.get_form()
+        with self.settings(EXPORT_CACHE_MAX_SIZE=10):
+            self.export.get_data(form)
+        self.assertIsNone(self.get_result(form))
+
+    @override_settings(EXPORT_CACHE=None)
+    def test_disabled(self):
+        form = self.get_form()
+        self.export.get_data(form)
+        self.assertIsNone(self.get_result(form))
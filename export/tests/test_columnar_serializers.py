@@ -0,0 +1,75 @@
+import unittest
+
+from django.contrib.auth.models import Group, User
+from django.core import serializers
+from django.test import TestCase
+
+from export import utils
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+@unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+class ColumnarSerializersTestCase(TestCase):
+    """
+    Testcase for the Arrow and Parquet serializers.
+    """
+    formats = ['arrow', 'parquet']
+
+    @classmethod
+    def setUpTestData(cls):
+        group = Group.objects.create(name='group')
+        for i in range(5):
+            user = User.objects.create_user(
+                'user%s' % i, 'user%s@user.com' % i, is_staff=bool(i % 2)
+            )
+            user.groups.add(group)
+
+    def deserialize(self, format, data):
+        return [
+            obj.object for obj in serializers.deserialize(format, data)
+        ]
+
+    def test_round_trip(self):
+        queryset = User.objects.order_by('pk')
+        for format in self.formats:
+            with self.settings(EXPORT_CHUNK_SIZE=2):
+                data = utils.serialize(format, queryset)
+            objects = self.deserialize(format, data)
+            self.assertEqual(
+                [(obj.pk, obj.username, obj.is_staff, obj.date_joined)
+                 for obj in objects],
+                [(obj.pk, obj.username, obj.is_staff, obj.date_joined)
+                 for obj in queryset]
+            )
+
+    def test_schema(self):
+        data = utils.serialize(
+            'arrow', User.objects.all(), ['username', 'is_staff', 'groups']
+        )
+        schema = pyarrow.ipc.open_file(pyarrow.BufferReader(data)).schema
+        self.assertEqual(
+            schema.names, ['pk', 'model', 'username', 'is_staff', 'groups']
+        )
+        self.assertEqual(
+            schema.types, [
+                pyarrow.int64(), pyarrow.string(), pyarrow.string(),
+                pyarrow.bool_(), pyarrow.list_(pyarrow.int64())
+            ]
+        )
+
+    def test_empty(self):
+        for format in self.formats:
+            data = utils.serialize(format, User.objects.none())
+            self.assertEqual(self.deserialize(format, data), [])
+
+    def test_single_model(self):
+        for format in self.formats:
+            self.assertRaises(
+                serializers.base.SerializationError,
+                utils.serialize, format,
+                list(User.objects.all()) + list(Group.objects.all())
+            )
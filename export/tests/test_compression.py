@@ -0,0 +1,116 @@
+import gzip
+import zipfile
+from unittest import skipIf
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import six
+
+from export import cache, compression, forms, tools, utils
+
+
+def decompress(data, codec, filename):
+    if codec == 'gzip':
+        return gzip.GzipFile(fileobj=six.BytesIO(data)).read()
+    if codec == 'zip':
+        return zipfile.ZipFile(six.BytesIO(data)).read(filename)
+    return compression.zstandard.ZstdDecompressor().decompressobj() \
+        .decompress(data)
+
+
+class CompressionTestCase(TestCase):
+    """
+    Testcase for compressed downloads.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_superuser('super', 'super@user.com', 'super007')
+        for i in range(5):
+            User.objects.create_user('user%s' % i, 'user%s@user.com' % i)
+        cls.export_url = '/object-tools/auth/user/export/'
+
+    def setUp(self):
+        self.client.login(username='super', password='super007')
+
+    def assertCompressed(self, codec):
+        chunks = [b'pk,model\r\n'] + [b'%d,auth.user\r\n' % i
+                                      for i in range(1000)]
+        data = b''.join(compression.compress(chunks, codec, 'users.csv'))
+        self.assertEqual(
+            decompress(data, codec, 'users.csv'), b''.join(chunks)
+        )
+        self.assertLess(len(data), len(b''.join(chunks)))
+
+    def test_gzip(self):
+        self.assertCompressed('gzip')
+
+    def test_zip(self):
+        self.assertCompressed('zip')
+
+    @skipIf(compression.zstandard is None, 'zstandard required')
+    def test_zstd(self):
+        self.assertCompressed('zstd')
+
+    def test_text(self):
+        # Unencoded data is compressed UTF-8 encoded.
+        data = b''.join(compression.compress(u'\xe9', 'gzip', 'export.json'))
+        self.assertEqual(
+            decompress(data, 'gzip', 'export.json'), u'\xe9'.encode('utf-8')
+        )
+
+    @override_settings(EXPORT_COMPRESSION_LEVELS={'gzip': 0})
+    def test_levels(self):
+        self.assertEqual(compression.get_level('gzip'), 0)
+        self.assertEqual(compression.get_level('zip'), 6)
+        data = b''.join(compression.compress(b'a' * 1000, 'gzip', 'a'))
+        self.assertGreater(len(data), 1000)
+
+    def test_gen_filename(self):
+        export = tools.Export(User)
+        self.assertEqual(
+            export.gen_filename('csv', 'gzip'), 'export-auth-user.csv.gz'
+        )
+        self.assertEqual(
+            export.gen_filename('json', 'zip'), 'export-auth-user.json.zip'
+        )
+        self.assertEqual(export.gen_filename('csv'), 'export-auth-user.csv')
+
+    def test_fingerprint(self):
+        data = {'export_format': 'json'}
+        form = forms.Export(User, data)
+        compressed = forms.Export(User, dict(data, export_compression='gzip'))
+        self.assertTrue(form.is_valid())
+        self.assertTrue(compressed.is_valid())
+        self.assertEqual(
+            cache.fingerprint(User, form.cleaned_data),
+            cache.fingerprint(User, compressed.cleaned_data)
+        )
+
+    def test_download(self):
+        expected = utils.serialize('json', User.objects.order_by('pk'))
+        for streaming in [False, True]:
+            for codec in compression.get_codecs():
+                with override_settings(EXPORT_STREAMING=streaming):
+                    response = self.client.post(self.export_url, {
+                        'export_format': 'json',
+                        'export_compression': codec,
+                    })
+                if streaming:
+                    content = b''.join(response.streaming_content)
+                else:
+                    content = response.content
+                self.assertEqual(
+                    response['Content-Type'], compression.CONTENT_TYPES[codec]
+                )
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertEqual(
+                    response['Content-Disposition'],
+                    'attachment; filename=%s' % compression.get_filename(
+                        'export-auth-user.json', codec
+                    )
+                )
+                self.assertEqual(
+                    decompress(content, codec, 'export-auth-user.json'),
+                    expected.encode('utf-8')
+                )
@@ -0,0 +1,126 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth.models import Group, User
+from django.core import serializers
+from django.test import TestCase
+from django.utils import six
+from django.utils.six import StringIO
+
+from export.serializers import csv_serializer
+from export.serializers.csv_serializer import UnicodeWriter
+
+
+class CSVSerializerTestCase(TestCase):
+    """
+    Testcase for the CSV serializer.
+    """
+
+    def setUp(self):
+        self.serializer = serializers.get_serializer('csv')()
+
+    def test_serialize(self):
+        groups = [
+            Group(pk=1, name='TRUE'), Group(pk=2, name='[list]'),
+        ]
+        self.assertEqual(
+            self.serializer.serialize(groups),
+            '"pk","model","name","permissions"\r\n'
+            '"1","auth.group","\'TRUE\'","[]"\r\n'
+            '"2","auth.group","\'[list]\'","[]"\r\n'
+        )
+
+    def test_serialize_models(self):
+        objects = [
+            Group(pk=1, name='one'), Group(pk=2, name='two'),
+            User(pk=1, username='user'), Group(pk=3, name='three'),
+        ]
+        lines = self.serializer.serialize(
+            objects, fields=['name', 'username']
+        ).splitlines()
+        self.assertEqual(lines[0], '"pk","model","name"')
+        self.assertEqual(lines[3], '"pk","model","username"')
+        self.assertEqual(lines[5], '"pk","model","name"')
+        self.assertEqual(len(lines), 7)
+
+    def test_serialize_incrementally(self):
+        stream = StringIO()
+        written = []
+
+        def objects():
+            for i in range(3):
+                yield Group(pk=i, name='group%s' % i)
+                written.append(stream.getvalue().count('\n'))
+
+        self.serializer.serialize(objects(), stream=stream)
+        # The header and each row is written as soon as an object is visited.
+        self.assertEqual(written, [2, 3, 4])
+
+    def test_encoders(self):
+        encoders = csv_serializer.get_encoders(
+            User, ['id', 'username', 'is_staff', 'last_login', 'groups']
+        )
+        self.assertEqual(encoders, [
+            csv_serializer.encode_value, csv_serializer.encode_text,
+            csv_serializer.encode_bool, csv_serializer.encode_value,
+            csv_serializer.process_item,
+        ])
+        # Encoders encode values of their fields like process_item().
+        values = {
+            csv_serializer.encode_value: [
+                None, 0, 1.5, Decimal('1.50'), datetime.date(2017, 1, 1),
+            ],
+            csv_serializer.encode_bool: [None, True, False],
+            csv_serializer.encode_text: [
+                None, 'TRUE', 'NULL', '[a, b]', '[a\nb]', 'text', '', 1,
+            ],
+        }
+        for encode, field_values in values.items():
+            for value in field_values:
+                self.assertEqual(
+                    encode(value), csv_serializer.process_item(value)
+                )
+
+    def test_deserialize(self):
+        groups = [Group(pk=1, name='NULL'), Group(pk=2, name='[list]')]
+        data = self.serializer.serialize(groups)
+        for stream in [data, data.encode('utf-8'), StringIO(data),
+                       six.BytesIO(data.encode('utf-8'))]:
+            objects = list(serializers.deserialize('csv', stream))
+            self.assertEqual(
+                [(obj.object.pk, obj.object.name) for obj in objects],
+                [(1, 'NULL'), (2, '[list]')]
+            )
+        self.assertEqual(list(serializers.deserialize('csv', '')), [])
+
+    def test_deserialize_incrementally(self):
+        read = []
+
+        def lines():
+            yield '"pk","model","name","permissions"\r\n'
+            for i in range(3):
+                read.append(i)
+                yield '"%s","auth.group","group%s","[]"\r\n' % (i, i)
+
+        objects = serializers.deserialize('csv', lines())
+        # Objects are deserialized as rows are read.
+        self.assertEqual(next(objects).object.name, 'group0')
+        self.assertEqual(read, [0])
+        self.assertEqual(len(list(objects)), 2)
+
+
+class UnicodeWriterTestCase(TestCase):
+    """
+    Testcase for UnicodeWriter.
+    """
+
+    def test_writerows(self):
+        rows = [[u'1', u'caf\xe9'], [u'2', u'a "quote"']]
+        stream = StringIO()
+        writer = UnicodeWriter(stream)
+        writer.writerow(rows[0])
+        writer.writerows(rows[1:])
+        self.assertEqual(
+            stream.getvalue(),
+            u'"1","caf\xe9"\r\n"2","a ""quote"""\r\n'
+        )
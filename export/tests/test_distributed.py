@@ -0,0 +1,165 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from unittest import skipIf
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import six
+
+from export import (
+    distributed, downloads, forms, jobs, signals, tasks, utils
+)
+from export.models import ExportJob
+
+try:
+    from celery import current_app
+except ImportError:
+    current_app = None
+
+
+@skipIf(current_app is None, 'celery not installed')
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EXPORT_CELERY_SHARDS=3,
+    EXPORT_CHUNK_SIZE=2
+)
+class DistributedTestCase(TestCase):
+    """
+    Testcase for mailed exports distributed across Celery tasks.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(7):
+            User.objects.create_user('user%s' % i, 'user%s@user.com' % i)
+
+    def setUp(self):
+        # The part tasks are passed models and queries which only pickle
+        # serializes.
+        for name, value in [
+            ('task_always_eager', True),
+            ('task_serializer', 'pickle'),
+            ('accept_content', ['pickle']),
+        ]:
+            self.addCleanup(
+                setattr, current_app.conf, name, current_app.conf[name]
+            )
+            current_app.conf[name] = value
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def get_kwargs(self, format, **data):
+        data['export_format'] = format
+        form = forms.Export(User, data)
+        self.assertTrue(form.is_valid(), form.errors)
+        return (
+            {'format': format, 'fields': [], 'indent': 4},
+            {'form': form, 'model': User}
+        )
+
+    def mail_export(self, format, download_url=None, **data):
+        data['export_format'] = format
+        data.setdefault('export_indent', '4')
+        form = forms.Export(User, data)
+        self.assertTrue(form.is_valid(), form.errors)
+        job = jobs.create_job(
+            form, User, None, 'super@user.com', 'export.%s' % format,
+            download_url
+        )
+        tasks.mail_export_distributed.delay(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.DONE)
+        # Parts are deleted once merged.
+        parts = os.path.join(self.media_root, 'export', 'parts')
+        self.assertFalse(os.path.isdir(parts) and os.listdir(parts))
+
+    def read_attachment(self, format):
+        name, content, mimetype = mail.outbox[-1].attachments[0]
+        zip_file = zipfile.ZipFile(six.BytesIO(content))
+        return zip_file.read('export.%s' % format).decode('utf-8')
+
+    def test_parts(self):
+        serializer_kwargs, query_kwargs = self.get_kwargs('json')
+        parts = distributed.get_parts(serializer_kwargs, query_kwargs)
+        self.assertEqual(len(parts), 3)
+        self.assertEqual(
+            [part[3] for part in parts],
+            distributed.parallel.get_shards(User.objects.order_by('pk'), 3)
+        )
+
+        serializer_kwargs, query_kwargs = self.get_kwargs(
+            'json', export_order_by='username'
+        )
+        parts = distributed.get_parts(serializer_kwargs, query_kwargs)
+        self.assertEqual([part[3] for part in parts], [(None, None)])
+
+    def test_mail_export(self):
+        for format in ['csv', 'json', 'jsonl', 'xml', 'yaml']:
+            self.mail_export(format)
+            self.assertEqual(
+                self.read_attachment(format),
+                utils.serialize(format, User.objects.order_by('pk'))
+            )
+        self.mail_export('json', export_order_direction='dsc')
+        self.assertEqual(
+            self.read_attachment('json'),
+            utils.serialize('json', User.objects.order_by('-pk'))
+        )
+
+    def test_metrics(self):
+        finished = []
+
+        def receive(sender, **kwargs):
+            finished.append(kwargs['metrics'])
+        signals.export_finished.connect(receive, sender=User)
+        self.addCleanup(signals.export_finished.disconnect, receive, User)
+        self.mail_export('json')
+        record, = finished
+        self.assertEqual(
+            [record[name] for name in ['kind', 'format', 'rows', 'bytes']],
+            ['mail', 'json', 7, len(self.read_attachment('json'))]
+        )
+        self.assertIn('storage', record['phases'])
+
+    def test_failure(self):
+        form = forms.Export(User, {'export_format': 'json'})
+        self.assertTrue(form.is_valid(), form.errors)
+        job = jobs.create_job(form, User, None, 'super@user.com', 'export')
+        # Mailing the merged parts fails.
+        with override_settings(EMAIL_BACKEND='export.tests.missing.Backend'):
+            tasks.mail_export_distributed.delay(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.FAILED)
+        self.assertEqual(len(json.loads(job.parameters)['parts']), 3)
+        parts = os.path.join(self.media_root, 'export', 'parts')
+        self.assertEqual(os.listdir(parts), [])
+
+    def test_mail_empty_export(self):
+        self.mail_export('json', username='nobody')
+        self.assertEqual(
+            self.read_attachment('json'), utils.serialize('json', [])
+        )
+
+    def test_mail_link(self):
+        self.mail_export('csv', 'http://testserver/download/')
+        self.assertEqual(mail.outbox[-1].attachments, [])
+        token = re.search(
+            r'/download/(\S+)/', mail.outbox[-1].body
+        ).group(1)
+        name, label, user_id = downloads.unsign(token)
+        self.assertEqual((label, user_id), ('auth.user', None))
+        with default_storage.open(name) as f:
+            zip_file = zipfile.ZipFile(f)
+            self.assertEqual(
+                zip_file.read('export.csv').decode('utf-8'),
+                utils.serialize('csv', User.objects.order_by('pk'))
+            )
@@ -0,0 +1,147 @@
+import re
+import shutil
+import tempfile
+import zipfile
+
+from django.contrib.auth.models import Group, User
+from django.core import mail, signing
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import six
+
+from export import downloads, utils
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EXPORT_MAIL_LINK=True
+)
+class DownloadsTestCase(TestCase):
+    """
+    Testcase for exports delivered as download links.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_superuser('super', 'super@user.com', 'super007')
+        User.objects.create_user('another', 'another@user.com', 'another007')
+        cls.export_url = '/object-tools/auth/user/export/'
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.client.login(username='super', password='super007')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def mail_link(self):
+        response = self.client.post(self.export_url, {
+            'export_format': 'json',
+            'export_order_by': 'username',
+            'export_order_direction': 'asc',
+            '_export_mail': 'Email',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].attachments, [])
+        return re.search(r'http://\S+', mail.outbox[0].body).group(0)
+
+    def test_download(self):
+        url = self.mail_link()
+        self.assertTrue(url.startswith(
+            'http://testserver/object-tools/auth/user/export/download/'
+        ))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename=export-auth-user.json.zip'
+        )
+        content = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(content))
+        zip_file = zipfile.ZipFile(six.BytesIO(content))
+        self.assertEqual(
+            zip_file.read('export-auth-user.json').decode('utf-8'),
+            utils.serialize('json', User.objects.order_by('username'))
+        )
+
+    def test_range(self):
+        url = self.mail_link()
+        content = b''.join(self.client.get(url).streaming_content)
+        response = self.client.get(url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(
+            response['Content-Range'], 'bytes 10-19/%s' % len(content)
+        )
+        self.assertEqual(b''.join(response.streaming_content), content[10:20])
+        response = self.client.get(url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), content[-5:])
+        response = self.client.get(
+            url, HTTP_RANGE='bytes=%s-' % len(content)
+        )
+        self.assertEqual(response.status_code, 416)
+
+    def test_invalid_links(self):
+        url = self.mail_link()
+        self.assertEqual(self.client.get(url[:-2] + '/').status_code, 404)
+        with self.settings(EXPORT_LINK_MAX_AGE=-1):
+            self.assertEqual(self.client.get(url).status_code, 404)
+        superuser = User.objects.get(username='super')
+        token = downloads.sign('export/missing.zip', User, superuser.pk)
+        self.assertEqual(
+            self.client.get(
+                '%sdownload/%s/' % (self.export_url, token)
+            ).status_code,
+            404
+        )
+        self.client.login(username='another', password='another007')
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_bound_links(self):
+        url = self.mail_link()
+        name, label, user_id = downloads.unsign(url.split('/')[-2])
+        self.assertEqual(label, 'auth.user')
+        self.assertEqual(user_id, User.objects.get(username='super').pk)
+        # Links to another model's export, or sent to another user, are
+        # rejected by the export tool.
+        for token in [
+            downloads.sign(name, Group, user_id),
+            downloads.sign(name, User, user_id + 1),
+            downloads.sign(name, User),
+            signing.dumps(name, salt=downloads.SALT),
+        ]:
+            self.assertEqual(
+                self.client.get(
+                    '%sdownload/%s/' % (self.export_url, token)
+                ).status_code,
+                404
+            )
+        self.assertEqual(
+            self.client.get(
+                '%sdownload/%s/' % (
+                    self.export_url, downloads.sign(name, User, user_id)
+                )
+            ).status_code,
+            200
+        )
+
+    def test_parse_range(self):
+        self.assertEqual(downloads.parse_range('bytes=0-', 10), (0, 9))
+        self.assertEqual(downloads.parse_range('bytes=2-100', 10), (2, 9))
+        self.assertEqual(downloads.parse_range('bytes=-3', 10), (7, 9))
+        self.assertIsNone(downloads.parse_range('', 10))
+        self.assertIsNone(downloads.parse_range('bytes=0-1,3-4', 10))
+        self.assertRaises(ValueError, downloads.parse_range, 'bytes=5-2', 10)
+
+    def test_store_export(self):
+        name = downloads.store_export('export.csv', [b'a,b\r\n', b'1,2\r\n'])
+        self.assertTrue(name.startswith('export/'))
+        with default_storage.open(name, 'rb') as f:
+            self.assertEqual(
+                zipfile.ZipFile(f).read('export.csv'), b'a,b\r\n1,2\r\n'
+            )
@@ -1,17 +1,32 @@
+import datetime
 import json
+import zipfile
 
 from django.contrib.auth.models import User
+from django.core import mail, serializers
 from django.db import models
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.utils import six
 
-from export import tools
+from export import forms, tools, utils, values
+from export.models import Watermark
 
 
 class MockDjangoObject(models.Model):
     field1 = models.IntegerField()
     field2 = models.IntegerField()
 
+    class Meta:
+        # Never saved, so no table is needed now export has migrations.
+        managed = False
+
+
+class MockTimeObject(models.Model):
+    time = models.TimeField(null=True)
+
+    class Meta:
+        managed = False
+
 
 class ToolsTestCase(TestCase):
     """
@@ -151,3 +166,333 @@ class ExportFlowTestCase(TestCase):
         # is_staff, is_active columns
         self.assertContains(response, test_user)
         self.assertContains(response, another_user)
+
+    @override_settings(EXPORT_STREAMING=True)
+    def test_export_streaming(self):
+        export_form_data = {
+            "export_format": "json",
+            "export_order_by": "username",
+            "export_order_direction": "asc"
+        }
+        response = self.client.post(
+            path=self.export_url,
+            data=export_form_data,
+            follow=True
+        )
+        self.assertTrue(response.streaming)
+        self.assertEquals(response["content-type"], "application/json")
+        content = b"".join(response.streaming_content).decode("utf-8")
+        self.assertEquals(
+            content,
+            utils.serialize("json", User.objects.order_by("username"))
+        )
+
+
+class StreamSerializeTestCase(TestCase):
+    """
+    Testcase for utils.stream_serialize.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            User.objects.create_user("user%s" % i, "user%s@user.com" % i)
+
+    def test_stream_serialize_formats(self):
+        queryset = User.objects.order_by("pk")
+        for format in ["csv", "json", "xml", "yaml"]:
+            for chunk_size in [1, 2, 10]:
+                self.assertEqual(
+                    "".join(utils.stream_serialize(
+                        format, queryset, chunk_size=chunk_size
+                    )),
+                    utils.serialize(format, queryset)
+                )
+        self.assertEqual(
+            list(utils.stream_serialize("python", queryset, chunk_size=2)),
+            utils.serialize("python", queryset)
+        )
+
+    def test_stream_serialize_fields(self):
+        queryset = User.objects.order_by("pk")
+        self.assertEqual(
+            "".join(utils.stream_serialize(
+                "json", queryset, fields=["username"], chunk_size=2
+            )),
+            utils.serialize("json", queryset, fields=["username"])
+        )
+
+    def test_stream_serialize_empty(self):
+        queryset = User.objects.none()
+        for format in ["csv", "json", "xml", "yaml"]:
+            self.assertEqual(
+                "".join(utils.stream_serialize(format, queryset)),
+                utils.serialize(format, queryset)
+            )
+
+
+class ChunkTestCase(TestCase):
+    """
+    Testcase for chunked queryset iteration.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            User.objects.create_user("user%s" % i, "user%s@user.com" % i)
+
+    def chunk_pks(self, queryset, chunk_size):
+        return [
+            [obj.pk for obj in chunk]
+            for chunk in utils.iter_chunks(queryset, chunk_size)
+        ]
+
+    def test_keyset_chunks(self):
+        pks = list(User.objects.order_by("pk").values_list("pk", flat=True))
+        with self.assertNumQueries(3):
+            self.assertEqual(
+                self.chunk_pks(User.objects.order_by("pk"), 2),
+                [pks[0:2], pks[2:4], pks[4:]]
+            )
+        pks.reverse()
+        self.assertEqual(
+            self.chunk_pks(User.objects.order_by("-id"), 2),
+            [pks[0:2], pks[2:4], pks[4:]]
+        )
+        self.assertEqual(
+            sum(self.chunk_pks(User.objects.order_by("pk").reverse(), 2), []),
+            pks
+        )
+
+    def test_ordered_chunks(self):
+        queryset = User.objects.order_by("-username")
+        expected = list(queryset.values_list("pk", flat=True))
+        chunks = self.chunk_pks(queryset, 2)
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(sum(chunks, []), expected)
+
+    @override_settings(EXPORT_CHUNK_SIZE=4)
+    def test_chunk_size_setting(self):
+        self.assertEqual(
+            [len(chunk) for chunk in utils.iter_chunks(User.objects.all())],
+            [4, 1]
+        )
+
+    def test_serialize_does_not_cache(self):
+        queryset = User.objects.all()
+        utils.serialize("json", queryset)
+        self.assertIsNone(queryset._result_cache)
+
+
+class ValuesTestCase(TestCase):
+    """
+    Testcase for serializing from values_list() rows.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_superuser("super", "super@user.com", "super007")
+        User.objects.create_user("NULL", "", first_name="[test]")
+
+    def test_get_columns(self):
+        queryset = User.objects.all()
+        self.assertEqual(
+            [column[0] for column in values.get_columns(
+                "json", queryset, ["username", "is_staff"]
+            )],
+            ["username", "is_staff"]
+        )
+        # Many to many fields come last and are not fetched with values.
+        columns = values.get_columns("json", queryset)
+        self.assertEqual(
+            [column[:2] for column in columns[-2:]],
+            [("groups", None), ("user_permissions", None)]
+        )
+        # The xml serializer is not supported.
+        self.assertIsNone(values.get_columns("xml", queryset, ["username"]))
+        self.assertIsNone(values.get_columns("json", [], ["username"]))
+
+    def test_serialize_values(self):
+        queryset = User.objects.order_by("pk")
+        fields = [
+            "password", "last_login", "is_superuser", "username",
+            "first_name", "email", "is_active", "date_joined"
+        ]
+        for format in ["csv", "json", "python", "yaml"]:
+            with self.assertNumQueries(1):
+                data = utils.serialize(format, queryset, fields)
+            self.assertEqual(
+                data, utils.serialize(format, list(queryset), fields)
+            )
+            streamed = utils.stream_serialize(
+                format, queryset, fields, chunk_size=1
+            )
+            if format == "python":
+                self.assertEqual(list(streamed), data)
+            else:
+                self.assertEqual("".join(streamed), data)
+
+    def test_serialize_times(self):
+        objects = [
+            MockTimeObject(pk=1, time=datetime.time(12, 30)),
+            MockTimeObject(pk=2, time=None),
+        ]
+        rows = [(obj.pk, obj.time) for obj in objects]
+        for format in ["csv", "json", "python", "yaml"]:
+            columns = values.get_columns(format, MockTimeObject.objects.all())
+            self.assertEqual(
+                values.serialize(format, MockTimeObject, rows, columns),
+                serializers.serialize(format, objects)
+            )
+
+
+class IndentTestCase(TestCase):
+    """
+    Testcase for serializer indentation options.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(3):
+            User.objects.create_user("user%s" % i, "user%s@user.com" % i)
+
+    def test_serializer_options(self):
+        queryset = User.objects.all()
+        self.assertEqual(
+            utils.get_serializer_options("json", queryset, indent=2),
+            {"indent": 2}
+        )
+        self.assertEqual(
+            utils.get_serializer_options("json", queryset, indent=None),
+            {"indent": None, "separators": (",", ":")}
+        )
+        self.assertEqual(
+            utils.get_serializer_options("xml", queryset, ["username"], None),
+            {"indent": None, "fields": ["username"]}
+        )
+        self.assertEqual(
+            utils.get_serializer_options(
+                "json", queryset, indent=utils.AUTO_INDENT
+            ),
+            {"indent": 4}
+        )
+        with self.settings(EXPORT_COMPACT_THRESHOLD=2):
+            self.assertEqual(
+                utils.get_serializer_options(
+                    "xml", queryset, indent=utils.AUTO_INDENT
+                ),
+                {"indent": None}
+            )
+
+    def test_compact(self):
+        queryset = User.objects.order_by("pk")
+        for format in ["json", "xml", "yaml"]:
+            data = utils.serialize(format, queryset, indent=None)
+            self.assertLess(len(data), len(utils.serialize(format, queryset)))
+            self.assertEqual(
+                "".join(utils.stream_serialize(
+                    format, queryset, chunk_size=2, indent=None
+                )),
+                data
+            )
+        data = utils.serialize("json", queryset, indent=None)
+        self.assertNotIn("\n", data)
+        self.assertNotIn(": ", data)
+        self.assertEqual(len(json.loads(data)), 3)
+
+    def test_export_indent(self):
+        superuser = User.objects.create_superuser(
+            "super", "super@user.com", "super007"
+        )
+        self.client.force_login(superuser)
+        response = self.client.post(
+            path="/object-tools/auth/user/export/",
+            data={
+                "export_format": "json",
+                "export_order_by": "username",
+                "export_order_direction": "asc",
+                "export_indent": "compact",
+            }
+        )
+        content = response.content.decode("utf-8")
+        self.assertNotIn("\n", content)
+        self.assertEqual(len(json.loads(content)), 4)
+
+
+@override_settings(
+    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend"
+)
+class MailExportTestCase(TestCase):
+    """
+    Testcase for utils.mail_export.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(3):
+            User.objects.create_user("user%s" % i, "user%s@user.com" % i)
+
+    def mail_export(self, format):
+        form = forms.Export(User, {
+            "export_format": format,
+            "export_order_by": "username",
+            "export_order_direction": "asc",
+        })
+        self.assertTrue(form.is_valid())
+        utils.mail_export(
+            "super@user.com", "export.%s" % format,
+            {"format": format, "fields": [], "indent": 4},
+            {"form": form, "model": User}
+        )
+        name, content, mimetype = mail.outbox[-1].attachments[0]
+        self.assertEqual(name, "export.%s.zip" % format)
+        self.assertEqual(mimetype, "application/zip")
+        zip_file = zipfile.ZipFile(six.BytesIO(content))
+        self.assertEqual(zip_file.namelist(), ["export.%s" % format])
+        return zip_file.read("export.%s" % format)
+
+    def test_mail_export(self):
+        queryset = User.objects.order_by("username")
+        for format in ["csv", "json", "xml"]:
+            self.assertEqual(
+                self.mail_export(format).decode("utf-8"),
+                utils.serialize(format, queryset)
+            )
+        self.assertEqual(
+            self.mail_export("python").decode("utf-8"),
+            str(utils.serialize("python", queryset))
+        )
+
+
+class FormMetadataTestCase(TestCase):
+    """
+    Testcase for the per model metadata of forms.Export.
+    """
+
+    def test_metadata_cached(self):
+        metadata = forms.get_metadata(User)
+        self.assertIs(forms.get_metadata(User), metadata)
+        self.assertIsNot(forms.get_metadata(User, ['username']), metadata)
+        self.assertEqual(
+            list(forms.get_metadata(User, ['username']).filter_fields),
+            ['username']
+        )
+
+    def test_forms_copy_fields(self):
+        form = forms.Export(User)
+        other = forms.Export(User)
+        metadata = forms.get_metadata(User)
+        self.assertEqual(
+            list(form.fieldsets[1][1]['fields']), list(metadata.filter_fields)
+        )
+        for name, filter_field in metadata.filter_fields.items():
+            self.assertIsNot(form.fields[name], filter_field)
+            self.assertIsNot(form.fields[name], other.fields[name])
+        self.assertEqual(
+            form.fields['export_fields'].choices, metadata.field_choices
+        )
+
+    def test_model_fields_unchanged(self):
+        form = forms.Export(Watermark)
+        self.assertIn('updated', form.fields)
+        self.assertFalse(Watermark._meta.get_field('updated').editable)
@@ -0,0 +1,202 @@
+import datetime
+import json
+import shutil
+import tempfile
+import zipfile
+from unittest import skipIf
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import six, timezone
+
+from export import forms, jobs, tasks, utils
+from export.models import ExportJob, Watermark
+
+try:
+    import celery
+except ImportError:
+    celery = None
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EXPORT_JOB_PART_SIZE=2
+)
+class ExportJobTestCase(TestCase):
+    """
+    Testcase for mailed exports run as resumable jobs.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            'super', 'super@user.com', 'super007'
+        )
+        for i in range(6):
+            User.objects.create_user('user%s' % i, 'user%s@user.com' % i)
+        cls.export_url = '/object-tools/auth/user/export/'
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def create_job(self, **data):
+        data.setdefault('export_format', 'json')
+        form = forms.Export(User, data)
+        self.assertTrue(form.is_valid(), form.errors)
+        return jobs.create_job(
+            form, User, self.user, 'super@user.com', 'export.json'
+        )
+
+    def read_attachment(self):
+        name, content, mimetype = mail.outbox[-1].attachments[0]
+        zip_file = zipfile.ZipFile(six.BytesIO(content))
+        return zip_file.read(name[:-len('.zip')]).decode('utf-8')
+
+    def test_mail_response(self):
+        self.client.login(username='super', password='super007')
+        response = self.client.post(self.export_url, {
+            'export_format': 'json',
+            'export_fields': ['username', 'email'],
+            '_export_mail': 'Email',
+        })
+        self.assertEqual(response.status_code, 200)
+        job = ExportJob.objects.get()
+        self.assertEqual(job.status, ExportJob.DONE)
+        self.assertEqual(job.user, self.user)
+        self.assertEqual((job.total, job.rows_processed), (7, 7))
+        self.assertEqual(job.parts, 4)
+        self.assertEqual(
+            self.read_attachment(),
+            utils.serialize(
+                'json', User.objects.order_by('pk'), ['username', 'email']
+            )
+        )
+
+    def test_parameters(self):
+        form = forms.Export(User, {
+            'export_format': 'json',
+            'username': 'user',
+            'last_login_0': '2017-01-01', 'last_login_1': '00:00:00',
+            'csrfmiddlewaretoken': 'token',
+            '_export_mail': 'Email',
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        job = jobs.create_job(
+            form, User, self.user, 'super@user.com', 'export.json'
+        )
+        self.assertEqual(json.loads(job.parameters)['data'], {
+            'export_format': ['json'],
+            'username': ['user'],
+            'last_login_0': ['2017-01-01'],
+            'last_login_1': ['00:00:00'],
+        })
+
+    def test_resume(self):
+        job = self.create_job()
+        pks = list(User.objects.order_by('pk').values_list('pk', flat=True))
+        # Interrupt the job after the first two parts.
+        jobs.write_parts(
+            job, User.objects.filter(pk__lte=pks[3]), 'json', [], 4, 'pk'
+        )
+        self.assertEqual(job.checkpoint, str(pks[3]))
+        self.assertEqual(job.rows_processed, 4)
+
+        jobs.run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.DONE)
+        self.assertEqual(job.parts, 4)
+        self.assertEqual(job.rows_processed, 7)
+        self.assertEqual(
+            self.read_attachment(),
+            utils.serialize('json', User.objects.order_by('pk'))
+        )
+
+        # Finished jobs are not run again.
+        jobs.run_job(job.pk)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_resume_delta(self):
+        job = self.create_job(export_delta_field='id')
+        high = User.objects.latest('pk').pk
+        # The first run stores the high watermark before being interrupted.
+        jobs.filter_delta(
+            job, jobs.get_kwargs(job)[2], User.objects.order_by('pk')
+        )
+        self.assertEqual(json.loads(job.parameters)['high'], str(high))
+        User.objects.create_user('late', 'late@user.com')
+
+        jobs.run_job(job.pk)
+        self.assertEqual(
+            self.read_attachment(),
+            utils.serialize('json', User.objects.filter(pk__lte=high))
+        )
+        self.assertEqual(Watermark.objects.get().value, str(high))
+
+    def test_unordered_export(self):
+        job = self.create_job(export_order_by='username')
+        jobs.run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.parts, 0)
+        self.assertEqual(job.rows_processed, 7)
+        self.assertEqual(
+            self.read_attachment(),
+            utils.serialize('json', User.objects.order_by('username'))
+        )
+
+    def test_failed(self):
+        job = self.create_job()
+        parameters = json.loads(job.parameters)
+        parameters['data']['export_format'] = ['nope']
+        job.parameters = json.dumps(parameters)
+        job.save()
+        with self.assertRaises(ValueError):
+            jobs.run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.FAILED)
+        self.assertIn('ValueError', job.error)
+
+    def test_admin(self):
+        job = self.create_job()
+        self.client.login(username='super', password='super007')
+        response = self.client.get('/admin/export/exportjob/')
+        self.assertContains(response, 'http-equiv="refresh"')
+
+        response = self.client.post('/admin/export/exportjob/', {
+            'action': 'resume_jobs',
+            '_selected_action': [job.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.DONE)
+        response = self.client.get('/admin/export/exportjob/')
+        self.assertNotContains(response, 'http-equiv="refresh"')
+        self.assertContains(response, '100%')
+
+    @skipIf(celery is None, 'celery not installed')
+    def test_task(self):
+        # Redelivered if the worker running it dies.
+        self.assertTrue(tasks.run_export_job.acks_late)
+
+    def test_resumable(self):
+        pending, failed, running, stale, done = [
+            self.create_job() for i in range(5)
+        ]
+        ExportJob.objects.filter(pk=failed.pk).update(status=ExportJob.FAILED)
+        ExportJob.objects.filter(pk__in=[running.pk, stale.pk]).update(
+            status=ExportJob.RUNNING
+        )
+        ExportJob.objects.filter(pk=stale.pk).update(
+            updated=timezone.now() - datetime.timedelta(
+                seconds=jobs.STALE_AFTER + 1
+            )
+        )
+        ExportJob.objects.filter(pk=done.pk).update(status=ExportJob.DONE)
+        self.assertEqual(
+            set(jobs.get_resumable(ExportJob.objects.all())),
+            set([pending, failed, stale])
+        )
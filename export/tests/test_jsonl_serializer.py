@@ -0,0 +1,63 @@
+import json
+
+from django.contrib.auth.models import Group, User
+from django.core import serializers
+from django.test import TestCase
+from django.utils.six import StringIO
+
+from export import utils
+
+
+class JSONLSerializerTestCase(TestCase):
+    """
+    Testcase for the JSON Lines serializer.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        group = Group.objects.create(name='group')
+        for i in range(3):
+            user = User.objects.create_user(
+                'user%s' % i, 'user%s@user.com' % i
+            )
+            user.groups.add(group)
+
+    def test_serialize(self):
+        queryset = User.objects.order_by('pk')
+        data = utils.serialize('jsonl', queryset)
+        lines = data.splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(data.endswith('\n'))
+        self.assertNotIn(': ', lines[0])
+        self.assertEqual(
+            [json.loads(line)['fields']['username'] for line in lines],
+            ['user0', 'user1', 'user2']
+        )
+        self.assertEqual(
+            ''.join(utils.stream_serialize('jsonl', queryset, chunk_size=2)),
+            data
+        )
+        self.assertEqual(utils.serialize('jsonl', User.objects.none()), '')
+
+    def test_deserialize(self):
+        queryset = User.objects.order_by('pk')
+        data = utils.serialize('jsonl', queryset)
+        objects = list(serializers.deserialize('jsonl', StringIO(data)))
+        self.assertEqual(
+            [obj.object.username for obj in objects],
+            ['user0', 'user1', 'user2']
+        )
+        self.assertEqual(
+            [list(obj.m2m_data['groups']) for obj in objects],
+            [[Group.objects.get().pk]] * 3
+        )
+        self.assertEqual(
+            len(list(serializers.deserialize('jsonl', data.encode('utf-8')))),
+            3
+        )
+
+    def test_deserialize_error(self):
+        self.assertRaises(
+            serializers.base.DeserializationError, list,
+            serializers.deserialize('jsonl', '{"model": "auth.user"\n')
+        )
@@ -0,0 +1,231 @@
+import logging
+import shutil
+import socket
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from export import forms, jobs, metrics, signals, tools
+
+
+class RecordingBackend(object):
+    records = []
+
+    def record(self, metrics):
+        self.records.append(metrics)
+
+
+class ListHandler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EXPORT_METRICS_BACKEND='export.tests.test_metrics.RecordingBackend',
+    EXPORT_METRICS_LOG_QUERIES=True
+)
+class MetricsTestCase(TestCase):
+    """
+    Testcase for export instrumentation.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            'super', 'super@user.com', 'super007'
+        )
+        for i in range(5):
+            User.objects.create_user('user%s' % i, 'user%s@user.com' % i)
+        cls.export_url = '/object-tools/auth/user/export/'
+
+    def setUp(self):
+        self.client.login(username='super', password='super007')
+        del RecordingBackend.records[:]
+        self.sent = []
+        for signal in [signals.export_started, signals.export_chunk_written,
+                       signals.export_finished]:
+            signal.connect(self.receive, sender=User)
+            self.addCleanup(signal.disconnect, self.receive, sender=User)
+
+    def receive(self, signal, sender, **kwargs):
+        self.sent.append((signal, kwargs))
+
+    def get_sent(self, signal):
+        return [kwargs for sent, kwargs in self.sent if sent is signal]
+
+    def test_download(self):
+        response = self.client.post(self.export_url, {'export_format': 'csv'})
+        self.assertEqual(self.sent[0][0], signals.export_started)
+        self.assertEqual(self.sent[-1][0], signals.export_finished)
+        self.assertEqual(
+            sum(kwargs['size'] for kwargs in self.get_sent(
+                signals.export_chunk_written
+            )),
+            len(response.content)
+        )
+        record, = RecordingBackend.records
+        self.assertEqual(self.get_sent(signals.export_finished), [
+            {'instrument': self.sent[0][1]['instrument'], 'metrics': record}
+        ])
+        self.assertEqual(
+            [record[name] for name in ['model', 'format', 'kind', 'status']],
+            ['auth.user', 'csv', 'download', 'ok']
+        )
+        self.assertEqual(record['rows'], 6)
+        self.assertEqual(record['bytes'], len(response.content))
+        self.assertGreater(record['queries'], 0)
+        self.assertIn('serialize', record['phases'])
+        self.assertAlmostEqual(
+            sum(record['phases'].values()), record['duration'], places=2
+        )
+
+    def test_streamed_download(self):
+        with override_settings(EXPORT_STREAMING=True):
+            response = self.client.post(self.export_url, {
+                'export_format': 'json', 'export_compression': 'gzip'
+            })
+        self.assertEqual(RecordingBackend.records, [])
+        content = b''.join(response.streaming_content)
+        record, = RecordingBackend.records
+        self.assertEqual(record['rows'], 6)
+        self.assertEqual(record['bytes'], len(content))
+        self.assertEqual(
+            list(record['phases']), ['query', 'serialize', 'compress', 'other']
+        )
+        self.assertIsNone(metrics.get_current())
+
+    @override_settings(EXPORT_STREAMING=True, DEBUG=False)
+    def test_closed_stream(self):
+        export = tools.Export(User)
+        form = forms.Export(User, {'export_format': 'json'})
+        self.assertTrue(form.is_valid())
+        for i in range(3):
+            export.export_response(form).close()
+        self.assertEqual(metrics._get_stack(), [])
+        self.assertEqual(self.sent, [])
+        self.assertFalse(connection.force_debug_cursor)
+
+        response = export.export_response(form)
+        next(iter(response))
+        self.assertIsNotNone(metrics.get_current())
+        self.assertTrue(connection.force_debug_cursor)
+        response.close()
+        self.assertEqual(metrics._get_stack(), [])
+        self.assertFalse(connection.force_debug_cursor)
+        record, = RecordingBackend.records
+        self.assertEqual(record['status'], 'error')
+
+    def test_mail(self):
+        form = forms.Export(User, {'export_format': 'json'})
+        self.assertTrue(form.is_valid())
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        job = jobs.create_job(
+            form, User, self.user, 'super@user.com', 'export.json'
+        )
+        with override_settings(MEDIA_ROOT=media_root):
+            jobs.run_job(job.pk)
+        self.assertEqual(len(mail.outbox), 1)
+        record, = RecordingBackend.records
+        self.assertEqual((record['kind'], record['rows']), ('mail', 6))
+        job.refresh_from_db()
+        self.assertEqual(record['bytes'], job.bytes_written)
+        for phase in ['serialize', 'storage', 'compress', 'mail']:
+            self.assertIn(phase, record['phases'])
+
+    def test_error(self):
+        with self.assertRaises(ValueError):
+            with metrics.Instrument(User, 'csv', 'download'):
+                metrics.add_rows(1)
+                raise ValueError
+        record, = RecordingBackend.records
+        self.assertEqual((record['status'], record['rows']), ('error', 1))
+        self.assertIsNone(metrics.get_current())
+
+    def test_phases(self):
+        with metrics.Instrument(User, 'csv', 'download') as instrument:
+            data = metrics.iter_phase(
+                metrics.iter_phase(iter([1, 2]), 'serialize'), 'compress'
+            )
+            self.assertEqual(list(data), [1, 2])
+            with metrics.phase('mail'):
+                self.assertEqual(instrument.current, 'mail')
+            self.assertEqual(instrument.current, 'other')
+        self.assertEqual(
+            list(RecordingBackend.records[0]['phases']),
+            ['serialize', 'compress', 'mail', 'other']
+        )
+
+    def test_uninstrumented(self):
+        data = iter([b'a'])
+        self.assertIs(metrics.iter_phase(data, 'serialize'), data)
+        self.assertIs(metrics.iter_written(data), data)
+        metrics.add_rows(1)
+        with metrics.phase('serialize'):
+            pass
+
+    @override_settings(EXPORT_METRICS_BACKEND=None)
+    def test_no_backend(self):
+        self.assertIsNone(metrics.get_backend())
+        with metrics.Instrument(User, 'csv', 'download'):
+            pass
+        self.assertEqual(len(self.get_sent(signals.export_finished)), 1)
+
+
+class BackendTestCase(TestCase):
+    """
+    Testcase for metrics backends.
+    """
+
+    def setUp(self):
+        self.metrics = metrics.Instrument(User, 'csv', 'download')
+        self.metrics.start()
+        self.metrics.rows = 10
+        self.metrics.bytes = 100
+        with override_settings(EXPORT_METRICS_BACKEND=None):
+            self.metrics.finish()
+        self.metrics = self.metrics.get_metrics()
+
+    def test_logging_backend(self):
+        handler = ListHandler()
+        metrics.logger.addHandler(handler)
+        self.addCleanup(metrics.logger.removeHandler, handler)
+        level = metrics.logger.level
+        metrics.logger.setLevel(logging.INFO)
+        self.addCleanup(metrics.logger.setLevel, level)
+        metrics.LoggingBackend().record(self.metrics)
+        record, = handler.records
+        message = record.getMessage()
+        self.assertTrue(message.startswith(
+            'export_finished model=auth.user format=csv kind=download '
+            'status=ok export_rows=10 export_bytes=100 '
+            'export_duration_seconds='
+        ), message)
+        self.assertIn(' export_other_seconds=', message)
+        self.assertIs(record.export_metrics, self.metrics)
+
+    def test_statsd_backend(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(server.close)
+        server.bind(('127.0.0.1', 0))
+        server.settimeout(5)
+        with override_settings(EXPORT_STATSD_ADDRESS=server.getsockname()):
+            metrics.StatsdBackend().record(self.metrics)
+        lines = server.recv(65536).decode('utf-8').split('\n')
+        tags = '|#model:auth.user,format:csv,kind:download,status:ok'
+        self.assertEqual(lines[:3], [
+            'export.count:1|c' + tags,
+            'export.rows:10|c' + tags,
+            'export.bytes:100|c' + tags,
+        ])
+        self.assertTrue(lines[3].startswith('export.duration:'))
+        self.assertTrue(all(line.endswith(tags) for line in lines))
@@ -0,0 +1,79 @@
+from unittest import skipIf
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from export import parallel, tools, utils
+
+
+@skipIf(parallel.ProcessPoolExecutor is None, 'concurrent.futures required')
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ParallelTestCase(TestCase):
+    """
+    Testcase for serializing exports across worker processes.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(7):
+            User.objects.create_user('user%s' % i, 'user%s@user.com' % i)
+
+    def test_shards(self):
+        queryset = User.objects.order_by('pk')
+        pks = list(queryset.values_list('pk', flat=True))
+        shards = parallel.get_shards(queryset, 3)
+        self.assertEqual(
+            shards, [(None, pks[3]), (pks[3], pks[6]), (pks[6], None)]
+        )
+        self.assertEqual(
+            [
+                list(parallel.filter_shard(queryset, shard).values_list(
+                    'pk', flat=True
+                ))
+                for shard in shards
+            ],
+            [pks[:3], pks[3:6], pks[6:]]
+        )
+        self.assertEqual(
+            parallel.get_shards(User.objects.order_by('-pk'), 3),
+            shards[::-1]
+        )
+
+    def test_serialize(self):
+        for ordering in ['pk', '-pk']:
+            queryset = User.objects.order_by(ordering)
+            for format in ['csv', 'json', 'jsonl', 'python', 'xml', 'yaml']:
+                for indent in [4, None]:
+                    self.assertEqual(
+                        parallel.serialize(format, queryset, [], indent, 3),
+                        utils.serialize(format, queryset, [], indent)
+                    )
+        queryset = User.objects.order_by('pk')
+        self.assertEqual(
+            parallel.serialize('json', queryset, ['username'], 4, 3),
+            utils.serialize('json', queryset, ['username'], 4)
+        )
+
+    def test_join_empty_shards(self):
+        queryset = User.objects.order_by('pk')
+        data = utils.serialize('csv', queryset)
+        self.assertEqual(parallel.join('csv', [None, data, None]), data)
+        self.assertIsNone(parallel.join('csv', [None, None]))
+
+    def test_can_shard(self):
+        queryset = User.objects.order_by('pk')
+        self.assertTrue(parallel.can_shard('json', queryset))
+        self.assertFalse(parallel.can_shard('parquet', queryset))
+        self.assertFalse(
+            parallel.can_shard('json', User.objects.order_by('username'))
+        )
+        self.assertFalse(parallel.can_shard('json', queryset.reverse()))
+        self.assertFalse(parallel.can_shard('json', list(queryset)))
+
+    @override_settings(EXPORT_PROCESSES=3)
+    def test_export_serialize(self):
+        queryset = User.objects.order_by('-pk')
+        self.assertEqual(
+            tools.Export(User).serialize('xml', queryset),
+            utils.serialize('xml', queryset)
+        )
@@ -0,0 +1,94 @@
+from django.contrib.auth.models import Group, Permission, User
+from django.core import serializers
+from django.test import TestCase, override_settings
+
+from export import prefetch, utils
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class PrefetchTestCase(TestCase):
+    """
+    Testcase for fetching many to many relations a chunk at a time.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        groups = [Group.objects.create(name='group%s' % i) for i in range(3)]
+        permissions = list(Permission.objects.order_by('-pk')[:3])
+        for i in range(6):
+            user = User.objects.create_user('user%s' % i)
+            user.groups.add(*groups[i % 3:])
+            user.user_permissions.add(*permissions[:i % 4])
+
+    def assertSerialized(self, format, queryset, fields=[], queries=0):
+        expected = serializers.serialize(
+            format, list(queryset), fields=fields or None, indent=4
+        )
+        with self.assertNumQueries(queries):
+            data = utils.serialize(format, queryset, fields)
+        self.assertEqual(data, expected)
+        with self.assertNumQueries(queries):
+            streamed = list(
+                utils.stream_serialize(format, queryset, fields)
+            )
+        if format != 'python':
+            streamed = ''.join(streamed)
+        self.assertEqual(streamed, expected)
+
+    def test_get_m2m_fields(self):
+        self.assertEqual(
+            [field.name for field in prefetch.get_m2m_fields(User)],
+            ['groups', 'user_permissions']
+        )
+        self.assertEqual(
+            [
+                field.name
+                for field in prefetch.get_m2m_fields(User, ['groups'])
+            ],
+            ['groups']
+        )
+        self.assertEqual(prefetch.get_m2m_fields(User, ['username']), [])
+
+    def test_get_related(self):
+        field = User._meta.get_field('user_permissions')
+        users = list(User.objects.order_by('pk'))
+        with self.assertNumQueries(1):
+            related = prefetch.get_related(
+                field, [user.pk for user in users]
+            )
+        for user in users:
+            self.assertEqual(
+                related.get(user.pk, []),
+                list(user.user_permissions.values_list('pk', flat=True))
+            )
+
+    def test_values(self):
+        # One query per chunk and one per many to many field and chunk.
+        queryset = User.objects.order_by('pk')
+        for format in ['csv', 'json', 'python', 'yaml']:
+            self.assertSerialized(format, queryset, queries=10)
+            self.assertSerialized(
+                format, queryset, ['username', 'groups'], queries=7
+            )
+            self.assertSerialized(format, queryset, ['username'], queries=4)
+
+    def test_instances(self):
+        queryset = User.objects.order_by('pk')
+        self.assertSerialized('xml', queryset, queries=10)
+        self.assertSerialized(
+            'xml', queryset, ['username', 'user_permissions'], queries=7
+        )
+        # Many to many relations of querysets not ordered on their primary
+        # key are fetched per chunk too.
+        self.assertSerialized(
+            'json', User.objects.order_by('username'), queries=7
+        )
+        self.assertSerialized(
+            'json', Group.objects.order_by('pk'), queries=4
+        )
+
+    def test_queries_per_chunk(self):
+        queryset = User.objects.order_by('pk')
+        with override_settings(EXPORT_CHUNK_SIZE=6):
+            self.assertSerialized('json', queryset, queries=4)
+            self.assertSerialized('xml', queryset, queries=4)
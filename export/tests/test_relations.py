@@ -0,0 +1,101 @@
+import json
+
+from django.contrib.admin.models import ADDITION, LogEntry
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.core.exceptions import FieldDoesNotExist
+from django.test import TestCase, override_settings
+
+from export import forms, relations, tools, utils
+
+
+class RelationsTestCase(TestCase):
+    """
+    Testcase for exporting fields of related objects by relation path.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        content_type = ContentType.objects.get_for_model(User)
+        for i in range(3):
+            user = User.objects.create_user('user%s' % i)
+            LogEntry.objects.create(
+                user=user, content_type=content_type if i else None,
+                object_id=str(user.pk), object_repr='entry%s' % i,
+                action_flag=ADDITION
+            )
+
+    def get_form(self, **data):
+        data.setdefault('export_format', 'csv')
+        data.setdefault('export_fields', [
+            'object_repr', 'user__username', 'content_type__model'
+        ])
+        return forms.Export(LogEntry, data)
+
+    def test_get_path_fields(self):
+        self.assertEqual(
+            relations.get_path_fields(LogEntry, 'user__username'),
+            [
+                LogEntry._meta.get_field('user'),
+                User._meta.get_field('username')
+            ]
+        )
+        for path in ['user__groups', 'object_repr__id', 'user__missing']:
+            with self.assertRaises(FieldDoesNotExist):
+                relations.get_path_fields(LogEntry, path)
+
+    def test_get_choices(self):
+        choices = dict(relations.get_choices(LogEntry))
+        self.assertEqual(choices['user__username'], 'User / Username')
+        self.assertIn('content_type__app_label', choices)
+        self.assertNotIn('user__groups', choices)
+        self.assertEqual(relations.get_choices(LogEntry, depth=0), [])
+
+    def test_form(self):
+        self.assertTrue(self.get_form().is_valid())
+        self.assertTrue(self.get_form(export_format='json').is_valid())
+        form = self.get_form(export_format='xml')
+        self.assertFalse(form.is_valid())
+        self.assertIn('__all__', form.errors)
+
+    def test_serialize(self):
+        queryset = LogEntry.objects.order_by('pk')
+        fields = ['object_repr', 'user__username', 'content_type__model']
+        # The related fields are joined into a single query.
+        with self.assertNumQueries(1):
+            data = utils.serialize('csv', queryset, fields)
+        lines = data.splitlines()
+        self.assertEqual(
+            lines[0],
+            '"pk","model","object_repr","user__username",'
+            '"content_type__model"'
+        )
+        pks = list(queryset.values_list('pk', flat=True))
+        self.assertEqual(lines[1:], [
+            '"%s","admin.logentry","entry0","user0","NULL"' % pks[0],
+            '"%s","admin.logentry","entry1","user1","user"' % pks[1],
+            '"%s","admin.logentry","entry2","user2","user"' % pks[2],
+        ])
+        with self.assertNumQueries(1):
+            objects = json.loads(utils.serialize('json', queryset, fields))
+        self.assertEqual(
+            objects[1]['fields'],
+            {
+                'object_repr': 'entry1', 'user__username': 'user1',
+                'content_type__model': 'user'
+            }
+        )
+
+    @override_settings(EXPORT_CACHE='default')
+    def test_cache_invalidation(self):
+        caches['default'].clear()
+        form = self.get_form()
+        self.assertTrue(form.is_valid())
+        export = tools.Export(LogEntry)
+        format, data = export.get_data(form)
+        self.assertEqual(export.get_data(form), (format, data))
+        User.objects.get(username='user1').save()
+        # Counted for automatic indentation and serialized again.
+        with self.assertNumQueries(2):
+            export.get_data(form)
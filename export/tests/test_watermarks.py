@@ -0,0 +1,112 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from export import fields, forms, tools, utils, watermarks
+from export.models import Watermark
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'
+)
+class WatermarkTestCase(TestCase):
+    """
+    Testcase for delta exports.
+    """
+
+    def setUp(self):
+        self.export = tools.Export(User)
+        self.user = User.objects.create_user('admin', 'admin@user.com')
+        for i in range(3):
+            User.objects.create_user('user%s' % i, 'user%s@user.com' % i)
+
+    def get_form(self, **data):
+        data.setdefault('export_format', 'json')
+        data.setdefault('export_order_by', 'username')
+        data.setdefault('export_order_direction', 'asc')
+        data.setdefault('export_delta_field', 'id')
+        form = forms.Export(User, data)
+        self.assertTrue(form.is_valid(), form.errors)
+        return form
+
+    def get_usernames(self, data):
+        return [obj['fields']['username'] for obj in json.loads(data)]
+
+    def test_watermark_fields(self):
+        self.assertEqual(
+            [field.name for field in watermarks.get_watermark_fields(User)],
+            ['id']
+        )
+        self.assertEqual(
+            forms.Export(User).fields['export_delta_field'].choices,
+            [('', 'All objects'), ('id', 'ID')]
+        )
+
+    def test_zero_bounds(self):
+        queryset = User.objects.all()
+        self.assertEqual(
+            fields.filter_range('id', (None, 0), queryset).count(), 0
+        )
+        self.assertEqual(
+            fields.filter_range('id', (0, None), queryset).count(), 4
+        )
+        delta = watermarks.Delta(User, 'id', 'fingerprint')
+        delta.high = 0
+        delta.commit()
+        self.assertEqual(delta.get_low(), 0)
+        self.assertEqual(delta.filter(queryset).count(), 4)
+
+    def test_delta(self):
+        format, data = self.export.get_data(self.get_form(), self.user)
+        self.assertEqual(len(json.loads(data)), 4)
+        self.assertEqual(
+            Watermark.objects.get(user=self.user).value,
+            str(User.objects.latest('id').pk)
+        )
+
+        format, data = self.export.get_data(self.get_form(), self.user)
+        self.assertEqual(json.loads(data), [])
+
+        User.objects.create_user('user3', 'user3@user.com')
+        format, data = self.export.get_data(self.get_form(), self.user)
+        self.assertEqual(self.get_usernames(data), ['user3'])
+
+        # Full exports ignore and keep the watermark.
+        form = self.get_form(export_delta_field='')
+        format, data = self.export.get_data(form, self.user)
+        self.assertEqual(len(json.loads(data)), 5)
+        self.assertEqual(Watermark.objects.count(), 1)
+
+    def test_delta_per_user_and_filters(self):
+        self.export.get_data(self.get_form(), self.user)
+
+        format, data = self.export.get_data(self.get_form())
+        self.assertEqual(len(json.loads(data)), 4)
+
+        form = self.get_form(username='user1')
+        format, data = self.export.get_data(form, self.user)
+        self.assertEqual(self.get_usernames(data), ['user1'])
+        self.assertEqual(Watermark.objects.count(), 3)
+
+    def test_delta_stream(self):
+        format, stream = self.export.get_stream(self.get_form(), self.user)
+        self.assertFalse(Watermark.objects.exists())
+        self.assertEqual(len(json.loads(''.join(stream))), 4)
+        self.assertTrue(Watermark.objects.exists())
+
+        format, stream = self.export.get_stream(self.get_form(), self.user)
+        self.assertEqual(json.loads(''.join(stream)), [])
+
+    def test_delta_mail(self):
+        form = self.get_form()
+        delta = self.export.get_delta(form, self.user)
+        utils.mail_export(
+            'admin@user.com', 'export.json',
+            {'format': 'json', 'fields': [], 'indent': 4},
+            {'form': form, 'model': User}, delta
+        )
+        self.assertEqual(len(mail.outbox), 1)
+        format, data = self.export.get_data(self.get_form(), self.user)
+        self.assertEqual(json.loads(data), [])
@@ -3,14 +3,23 @@ import mimetypes
 from django import template
 from django.conf import settings
 
+from django.conf.urls import url
 from django.contrib import messages
 from django.contrib.admin import helpers
-from django.http import HttpResponse
+from django.core import signing
+from django.core.exceptions import PermissionDenied
+from django.core.files.storage import default_storage
+from django.http import (
+    Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+)
 from django.shortcuts import render
 from django.utils.translation import ugettext as _
 
 import object_tools
-from export import forms, tasks, utils
+from export import (
+    aggregates, autocomplete, cache, compression, distributed, downloads,
+    fields, forms, jobs, metrics, parallel, tasks, utils, watermarks
+)
 
 
 class Export(object_tools.ObjectTool):
@@ -19,15 +28,31 @@ class Export(object_tools.ObjectTool):
     help_text = 'Export filtered objects for download.'
     form_class = forms.Export
 
-    def serialize(self, format, queryset, fields=[]):
-        return utils.serialize(format, queryset, fields)
+    def serialize(self, format, queryset, fields=[], indent=4):
+        return parallel.serialize(format, queryset, fields, indent)
 
-    def gen_filename(self, format):
+    def stream_serialize(self, format, queryset, fields=[], indent=4):
+        return utils.stream_serialize(
+            format, queryset, fields, indent=indent
+        )
+
+    def aggregate(self, format, queryset, cleaned_data, indent=4):
+        return aggregates.serialize(
+            format, queryset, aggregates.get_group_by(cleaned_data),
+            aggregates.get_aggregates(cleaned_data), indent
+        )
+
+    def stream_aggregate(self, format, queryset, cleaned_data, indent=4):
+        # Aggregated once the response is sent, like streamed exports.
+        yield self.aggregate(format, queryset, cleaned_data, indent)
+
+    def gen_filename(self, format, codec=None):
         app_label = self.model._meta.app_label
         object_name = self.model._meta.object_name.lower()
         if format == 'python':
             format = 'py'
-        return '%s-%s-%s.%s' % (self.name, app_label, object_name, format)
+        filename = '%s-%s-%s.%s' % (self.name, app_label, object_name, format)
+        return compression.get_filename(filename, codec)
 
     def order(self, queryset, by, direction):
         return utils.order_queryset(queryset, by, direction)
@@ -35,23 +60,116 @@ class Export(object_tools.ObjectTool):
     def has_celery(self):
         return 'djcelery' in getattr(settings, 'INSTALLED_APPS', [])
 
+    def is_streaming(self):
+        return getattr(settings, 'EXPORT_STREAMING', False)
+
+    def has_mail_link(self):
+        return getattr(settings, 'EXPORT_MAIL_LINK', False)
+
+    def is_distributed(self, format):
+        return self.has_celery() and distributed.get_shard_count() > 1 and \
+            distributed.can_distribute(format)
+
     def get_queryset(self, form):
         return utils.get_queryset(form, self.model)
 
-    def get_data(self, form):
+    def get_delta(self, form, user=None):
+        user_id = getattr(user, 'pk', None)
+        return watermarks.get_delta(form, self.model, user_id)
+
+    def get_data(self, form, user=None):
+        format = form.cleaned_data['export_format']
+        delta = self.get_delta(form, user)
+        key = None
+        if delta is None:
+            key = cache.get_key(self.model, form.cleaned_data)
+            data = cache.get_result(key)
+            if data is not None:
+                return format, data
+
         queryset = self.get_queryset(form)
+        if delta is not None:
+            queryset = delta.filter(queryset)
+        fields = form.cleaned_data['export_fields']
+        indent = form.cleaned_data['export_indent']
+        with metrics.phase('serialize'):
+            if aggregates.is_aggregate(form.cleaned_data):
+                data = self.aggregate(
+                    format, queryset, form.cleaned_data, indent
+                )
+            else:
+                data = self.serialize(format, queryset, fields, indent)
+        if delta is None:
+            cache.set_result(key, data)
+        else:
+            delta.commit()
+
+        return format, data
+
+    def get_stream(self, form, user=None):
         format = form.cleaned_data['export_format']
+        delta = self.get_delta(form, user)
+        if delta is None:
+            data = cache.get_result(
+                cache.get_key(self.model, form.cleaned_data)
+            )
+            if data is not None:
+                return format, [data]
+
+        queryset = self.get_queryset(form)
+        if delta is not None:
+            queryset = delta.filter(queryset)
         fields = form.cleaned_data['export_fields']
-        data = self.serialize(format, queryset, fields)
+        indent = form.cleaned_data['export_indent']
+        if aggregates.is_aggregate(form.cleaned_data):
+            data = self.stream_aggregate(
+                format, queryset, form.cleaned_data, indent
+            )
+        else:
+            data = self.stream_serialize(format, queryset, fields, indent)
+        if delta is not None:
+            data = delta.commit_after(data)
 
         return format, data
 
-    def export_response(self, form):
-        format, data = self.get_data(form)
-        filename = self.gen_filename(format)
-        response = HttpResponse(
-            data, content_type=mimetypes.guess_type(filename)[0]
+    def encode(self, instrument, form, format, data):
+        """
+        Return the filename, content type and chunks of bytes of the
+        response of an export's data, compressed as selected.
+        """
+        codec = form.cleaned_data.get('export_compression')
+        filename = self.gen_filename(format, codec)
+        if codec:
+            data = instrument.iter_phase(compression.compress(
+                data, codec, self.gen_filename(format)
+            ), 'compress')
+            content_type = compression.CONTENT_TYPES[codec]
+        else:
+            content_type = mimetypes.guess_type(filename)[0]
+        data = instrument.iter_written(compression.iter_bytes(data))
+        return filename, content_type, data
+
+    def export_response(self, form, user=None):
+        instrument = metrics.Instrument(
+            self.model, form.cleaned_data['export_format'], 'download'
         )
+        if self.is_streaming():
+            # Streamed exports are instrumented while the response is sent.
+            format, data = self.get_stream(form, user)
+            filename, content_type, data = self.encode(
+                instrument, form, format,
+                instrument.iter_phase(data, 'serialize')
+            )
+            response = StreamingHttpResponse(
+                metrics.Stream(instrument, data), content_type=content_type
+            )
+        else:
+            with instrument:
+                format, data = self.get_data(form, user)
+                filename, content_type, data = self.encode(
+                    instrument, form, format, data
+                )
+                response = HttpResponse(data, content_type=content_type)
         response['Content-Disposition'] = 'attachment; filename=%s' % filename
         return response
 
@@ -60,24 +178,26 @@ class Export(object_tools.ObjectTool):
         format = form.cleaned_data['export_format']
         filename = self.gen_filename(format)
 
-        serializer_kwargs = {
-            'fields': form.cleaned_data['export_fields'],
-            'format': format
-        }
+        download_url = None
+        if self.has_mail_link():
+            download_url = request.build_absolute_uri(
+                '%sdownload/' % self.reverse()
+            )
 
-        query_kwargs = {
-            'form': form,
-            'model': self.model
-        }
+        job = jobs.create_job(
+            form, self.model, request.user, request.user.email, filename,
+            download_url
+        )
+        if self.is_distributed(format) and \
+                not aggregates.is_aggregate(form.cleaned_data):
+            return tasks.mail_export_distributed.delay(job.pk)
+        return self.start_job(job)
 
+    def start_job(self, job):
         # if celery is available send the task, else run as normal
         if self.has_celery():
-            return tasks.mail_export.delay(
-                request.user.email, filename, serializer_kwargs, query_kwargs
-            )
-        return utils.mail_export(
-            request.user.email, filename, serializer_kwargs, query_kwargs
-        )
+            return tasks.run_export_job.delay(job.pk)
+        return jobs.run_job(job.pk)
 
     def view(self, request, extra_context=None, process_form=True):
         form = extra_context['form']
@@ -88,7 +208,7 @@ class Export(object_tools.ObjectTool):
                 messages.add_message(request, messages.SUCCESS, message)
                 self.mail_response(request, extra_context)
             else:
-                return self.export_response(form)
+                return self.export_response(form, request.user)
 
         adminform = helpers.AdminForm(form, form.fieldsets, {})
 
@@ -101,4 +221,53 @@ class Export(object_tools.ObjectTool):
             context,
         )
 
+    def download_view(self, request, token):
+        if not self.has_permission(request.user):
+            raise PermissionDenied
+        try:
+            name, label, user_id = downloads.unsign(token)
+        except signing.BadSignature:
+            raise Http404
+        # Links are only valid for the model and user they were sent for.
+        if label != self.model._meta.label_lower or \
+                user_id != request.user.pk:
+            raise Http404
+        if not default_storage.exists(name):
+            raise Http404
+        return downloads.download_response(request, name)
+
+    def autocomplete_view(self, request):
+        if not self.has_permission(request.user):
+            raise PermissionDenied
+        filter_field = forms.get_metadata(self.model).filter_fields.get(
+            request.GET.get('field')
+        )
+        if not isinstance(filter_field, fields.ModelMultipleChoiceField):
+            raise Http404
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            raise Http404
+        results, more = autocomplete.search(
+            filter_field, request.GET.get('term', ''), page
+        )
+        return JsonResponse({'results': results, 'more': more})
+
+    def _urls(self):
+        info = (
+            self.model._meta.app_label, self.model._meta.model_name,
+            self.name,
+        )
+        return super(Export, self)._urls() + [
+            url(
+                r'^%s/download/(?P<token>[^/]+)/$' % self.name,
+                self.download_view, name='%s_%s_%s_download' % info
+            ),
+            url(
+                r'^%s/autocomplete/$' % self.name,
+                self.autocomplete_view, name='%s_%s_%s_autocomplete' % info
+            ),
+        ]
+    urls = property(_urls)
+
 object_tools.tools.register(Export)
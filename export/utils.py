@@ -1,43 +1,382 @@
-try:
-    from StringIO import StringIO
-except ImportError:
-    from io import StringIO
+from itertools import chain, islice
+import sys
+import tempfile
 import zipfile
 
+import django
+from django.conf import settings
 from django.core import serializers
 from django.core.mail import EmailMessage
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.utils import six
 from django.utils.translation import ugettext as _
 
+from export import metrics, prefetch, values
 
-def mail_export(email, filename, serializer_kwargs, query_kwargs):
+# Default number of objects fetched and serialized at a time, override with
+# the EXPORT_CHUNK_SIZE setting.
+CHUNK_SIZE = 1000
+
+# Indent small exports and serialize large ones compactly.
+AUTO_INDENT = 'auto'
+
+# Default number of objects above which AUTO_INDENT serializes compactly,
+# override with the EXPORT_COMPACT_THRESHOLD setting.
+COMPACT_THRESHOLD = 10000
+
+# Size in bytes above which temporary files are written to disk.
+SPOOL_SIZE = 1024 * 1024
+
+
+def mail_export(email, filename, serializer_kwargs, query_kwargs,
+                delta=None):
     queryset = get_queryset(**query_kwargs)
-    data = serialize(queryset=queryset, **serializer_kwargs)
+    with metrics.Instrument(queryset.model, serializer_kwargs['format'],
+                            'mail', queryset.db):
+        if delta is not None:
+            queryset = delta.filter(queryset)
+        data = metrics.iter_written(metrics.iter_phase(
+            stream_bytes(queryset=queryset, **serializer_kwargs),
+            'serialize'
+        ))
+        mail_zip(email, filename, data)
+
+    if delta is not None:
+        delta.commit()
+
+
+def mail_zip(email, filename, data):
+    """
+    Email a zip archive containing a file named filename with the chunks of
+    bytes in data.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as zip_data:
+        with metrics.phase('compress'):
+            write_zip(zip_data, filename, data)
+        zip_data.seek(0)
 
-    zip_data = StringIO()
+        subject = _("Database Export")
+        message = _("Database Export Attached")
+        email = EmailMessage(subject, message, to=[email])
+        email.attach("%s.zip" % filename, zip_data.read(), 'application/zip')
+        with metrics.phase('mail'):
+            email.send()
+
+
+def write_zip(fileobj, filename, data):
+    """
+    Write a zip archive to fileobj containing a file named filename with the
+    chunks of bytes in data.
+    """
     zip_file = zipfile.ZipFile(
-        zip_data, mode='w', compression=zipfile.ZIP_DEFLATED
+        fileobj, mode='w', compression=zipfile.ZIP_DEFLATED
     )
-    zip_file.writestr(str(filename), str(data))
+    if sys.version_info >= (3, 6):
+        with zip_file.open(str(filename), 'w', force_zip64=True) as f:
+            for chunk in data:
+                f.write(chunk)
+    else:
+        # Archive members can't be written to incrementally, spool the data
+        # to a temporary file and archive that.
+        with tempfile.NamedTemporaryFile() as f:
+            for chunk in data:
+                f.write(chunk)
+            f.flush()
+            zip_file.write(f.name, str(filename))
     zip_file.close()
 
-    subject = _("Database Export")
-    message = _("Database Export Attached")
-    email = EmailMessage(subject, message, to=[email])
-    email.attach("%s.zip" % filename, zip_data.getvalue(), 'application/zip')
-    email.send()
-
-    zip_data.close()
 
+def serialize(format, queryset, fields=[], indent=4):
+    """
+    Serialize queryset in format. Querysets of models with fields that can be
+    read with values_list() are serialized from values, skipping model
+    instantiation. Many to many relations are fetched a chunk at a time.
+    """
+    options = get_serializer_options(format, queryset, fields, indent)
+    columns = values.get_columns(format, queryset, fields)
+    if columns is not None:
+        rows = values.iter_rows(
+            queryset.model,
+            iter_chunks(values.values_queryset(queryset, columns)),
+            columns, queryset.db
+        )
+        return values.serialize(
+            format, queryset.model, rows, columns, **options
+        )
 
-def serialize(format, queryset, fields=[]):
     serializer = serializers.get_serializer(format)()
+    objects = prefetch.iter_objects(
+        serializer, queryset, iter_chunks(queryset), fields
+    )
+    return serializer.serialize(objects, **options)
+
+
+def get_compact_threshold():
+    return getattr(settings, 'EXPORT_COMPACT_THRESHOLD', COMPACT_THRESHOLD)
+
+
+def get_serializer_options(format, queryset, fields=[], indent=4):
+    """
+    Return the options to serialize queryset in format with.
+
+    indent is the number of spaces to indent with, None to serialize
+    compactly or AUTO_INDENT to indent querysets of up to
+    EXPORT_COMPACT_THRESHOLD objects by 4 spaces and serialize larger ones,
+    or iterators of unknown length, compactly.
+    """
+    if indent == AUTO_INDENT:
+        if isinstance(queryset, QuerySet):
+            count = queryset.count()
+        elif hasattr(queryset, '__len__'):
+            count = len(queryset)
+        else:
+            count = None
+        if count is None or count > get_compact_threshold():
+            indent = None
+        else:
+            indent = 4
+
+    options = {'indent': indent}
     if fields:
-        return serializer.serialize(queryset, fields=fields, indent=4)
+        options['fields'] = fields
+    if indent is None and format == 'json':
+        options['separators'] = (',', ':')
+    return options
+
+
+def get_chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', CHUNK_SIZE)
+
+
+def get_keyset_ordering(queryset):
+    """
+    Return 'pk' or '-pk' if queryset can be paginated on its primary key
+    without changing the order of its results, else None.
+    """
+    if not queryset.query.can_filter() or queryset.query.distinct_fields or \
+            not queryset.query.standard_ordering:
+        # Querysets flipped by reverse() are left alone.
+        return None
+    ordering = queryset.query.order_by
+    if not ordering and queryset.query.default_ordering:
+        ordering = queryset.model._meta.ordering
+    if not ordering:
+        return 'pk'
+    if len(ordering) != 1 or not isinstance(ordering[0], six.string_types):
+        return None
+    pk_names = ('pk', queryset.model._meta.pk.name)
+    if ordering[0] in pk_names:
+        return 'pk'
+    if ordering[0].startswith('-') and ordering[0][1:] in pk_names:
+        return '-pk'
+    return None
+
+
+def _get_pk(obj):
+    # values_list() rows used for exports start with the primary key.
+    if isinstance(obj, tuple):
+        return obj[0]
+    return obj.pk
+
+
+def iter_keyset_chunks(queryset, chunk_size, ordering):
+    # Each chunk is a separate query starting after the last primary key of
+    # the previous chunk, so the cost of a chunk does not grow with the
+    # offset into the results.
+    queryset = queryset.order_by(ordering)
+    lookup = 'pk__lt' if ordering.startswith('-') else 'pk__gt'
+    chunk = list(queryset[:chunk_size])
+    while chunk:
+        yield chunk
+        if len(chunk) < chunk_size:
+            break
+        page = queryset.filter(**{lookup: _get_pk(chunk[-1])})
+        chunk = list(page[:chunk_size])
+
+
+def iter_chunks(queryset, chunk_size=None):
+    """
+    Yield lists of at most chunk_size objects from queryset without caching
+    results on the queryset.
+
+    On PostgreSQL results are streamed from a server-side cursor. Elsewhere
+    querysets ordered on their primary key are paginated on it, other
+    querysets fall back to iterator().
+    """
+    chunk_size = chunk_size or get_chunk_size()
+    if not hasattr(queryset, 'iterator'):
+        iterator = iter(queryset)
     else:
-        return serializer.serialize(queryset, indent=4)
+        ordering = None
+        if connections[queryset.db].vendor != 'postgresql':
+            ordering = get_keyset_ordering(queryset)
+        if ordering is not None:
+            for chunk in iter_keyset_chunks(queryset, chunk_size, ordering):
+                metrics.add_rows(len(chunk))
+                yield chunk
+            return
+        if django.VERSION >= (2, 0):
+            iterator = queryset.iterator(chunk_size=chunk_size)
+        else:
+            # Django < 2.0 fetches a fixed number of rows at a time.
+            iterator = queryset.iterator()
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            break
+        metrics.add_rows(len(chunk))
+        yield chunk
+
+
+def iter_objects(queryset, chunk_size=None):
+    """
+    Iterate over the objects in queryset a chunk at a time.
+    """
+    return chain.from_iterable(iter_chunks(queryset, chunk_size))
+
+
+def _split_document(data, opening, closing):
+    # Split a serialized document into the part up to and including the
+    # opening token, the objects and the closing token with the whitespace
+    # preceding it.
+    start = data.index(opening) + len(opening)
+    end = len(data[:data.rindex(closing)].rstrip())
+    return data[:start], data[start:end], data[end:]
+
+
+def _split_json(data, first):
+    head, body, tail = _split_document(data, '[', ']')
+    if not first:
+        # Separate objects the way the json serializer does, a newline
+        # follows the comma when indenting.
+        body = (',' if body.startswith('\n') else ', ') + body
+    return head, body, tail
+
+
+def _split_xml(data, first):
+    return _split_document(
+        data, '<django-objects version="1.0">', '</django-objects>'
+    )
+
+
+def _split_csv(data, first):
+    # The first line is the header, it is repeated for every chunk.
+    header, body = data.split('\r\n', 1)
+    return header + '\r\n', body, ''
+
+
+def _split_lines(data, first):
+    # Objects are serialized one after the other without a document around
+    # them.
+    return '', data, ''
+
+
+# Functions splitting the serialized data of a chunk into a head, body and
+# tail for formats that can be streamed. Bodies of consecutive chunks are
+# concatenated between the head and tail of the first chunk.
+STREAM_SPLITTERS = {
+    'csv': _split_csv,
+    'json': _split_json,
+    'jsonl': _split_lines,
+    'xml': _split_xml,
+    'yaml': _split_lines,
+}
+
+
+def join_chunks(format, chunks):
+    """
+    Yield the serialized data of consecutive chunks of a queryset in format
+    joined into one document, nothing if there are no chunks.
+    """
+    splitter = STREAM_SPLITTERS[format]
+    tail = None
+    for data in chunks:
+        head, body, chunk_tail = splitter(data, tail is None)
+        if tail is None:
+            tail = chunk_tail
+            yield head
+        yield body
+    if tail is not None:
+        yield tail
+
+
+def serialize_chunks(format, queryset, options, chunk_size=None):
+    """
+    Yield the serialized data of each chunk of queryset.
+    """
+    columns = values.get_columns(format, queryset, options.get('fields'))
+    if columns is not None:
+        rows = values.values_queryset(queryset, columns)
+        for chunk in iter_chunks(rows, chunk_size):
+            chunk = values.iter_rows(
+                queryset.model, [chunk], columns, queryset.db
+            )
+            yield values.serialize(
+                format, queryset.model, chunk, columns, **options
+            )
+    else:
+        for chunk in iter_chunks(queryset, chunk_size):
+            serializer = serializers.get_serializer(format)()
+            objects = prefetch.iter_objects(
+                serializer, queryset, [chunk], options.get('fields')
+            )
+            yield serializer.serialize(objects, **options)
+
+
+def stream_serialize(format, queryset, fields=[], chunk_size=None, indent=4):
+    """
+    Serialize queryset chunk_size objects at a time, yielding serialized
+    data as it is produced. Formats without a splitter are serialized in one
+    go.
+    """
+    options = get_serializer_options(format, queryset, fields, indent)
+    chunks = serialize_chunks(format, queryset, options, chunk_size)
+    if format == 'python':
+        for data in chunks:
+            for obj in data:
+                yield obj
+        return
+
+    if format not in STREAM_SPLITTERS:
+        yield serialize(format, queryset, fields, options['indent'])
+        return
+
+    empty = True
+    for data in join_chunks(format, chunks):
+        empty = False
+        yield data
+    if empty:
+        yield serialize(format, [], fields, options['indent'])
+
+
+def stream_bytes(format, queryset, fields=[], indent=4):
+    """
+    Serialize queryset like stream_serialize, yielding UTF-8 encoded data.
+    The python format is yielded as the repr of a list of objects.
+    """
+    data = stream_serialize(format, queryset, fields, indent=indent)
+    if format == 'python':
+        data = _repr_list(data)
+    for chunk in data:
+        if isinstance(chunk, six.text_type):
+            chunk = chunk.encode('utf-8')
+        yield chunk
+
+
+def _repr_list(objects):
+    yield '['
+    for i, obj in enumerate(objects):
+        if i:
+            yield ', '
+        yield repr(obj)
+    yield ']'
 
 
 def order_queryset(queryset, by, direction):
+    # Querysets ordered on the primary key can be paginated and sharded on
+    # it, it is the default.
+    by = by or 'pk'
     if direction == 'dsc':
         order_str = '-%s' % by
     else:
@@ -0,0 +1,246 @@
+"""
+Serialize querysets from values_list() rows instead of model instances.
+
+Building a model instance per row only for the serializer to read its field
+values back is the largest cost of an export. For models whose selected
+fields can be read with values_list() the rows are fed to the serializer
+directly, producing the same output as serializing instances. The primary
+keys related by many to many fields are added to the rows a chunk at a time,
+see export.prefetch, fields of related objects are joined into the query,
+see export.relations.
+"""
+from collections import OrderedDict
+
+from django.core import serializers
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.utils.duration import duration_string
+from django.utils.encoding import force_text, is_protected_type
+
+from export import prefetch, relations
+
+# Serializers producing their output from get_dump_object() in end_object().
+VALUES_SERIALIZER_MODULES = (
+    'django.core.serializers.json',
+    'django.core.serializers.python',
+    'django.core.serializers.pyyaml',
+    'export.serializers.arrow_serializer',
+    'export.serializers.csv_serializer',
+    'export.serializers.jsonl_serializer',
+    'export.serializers.parquet_serializer',
+)
+
+# Fields with values the python serializer passes through unchanged, either
+# protected types or text.
+UNCHANGED_FIELDS = (
+    models.AutoField, models.BooleanField, models.CharField,
+    models.DateField, models.DecimalField, models.FloatField,
+    models.IntegerField, models.NullBooleanField, models.TextField,
+    models.TimeField,
+)
+
+
+def _unbound(method):
+    return getattr(method, '__func__', method)
+
+
+# value_to_string() implementations that convert values like
+# value_to_text() does, the date and time ones are only called for values
+# that are not protected types.
+TEXT_VALUE_TO_STRING = [
+    _unbound(models.Field.value_to_string),
+    _unbound(models.DateField.value_to_string),
+    _unbound(models.DateTimeField.value_to_string),
+    _unbound(models.TimeField.value_to_string),
+]
+
+
+def value_to_text(value):
+    if is_protected_type(value):
+        return value
+    return force_text(value)
+
+
+def duration_to_text(value):
+    if value is None:
+        return value
+    return duration_string(value)
+
+
+def time_to_text(value):
+    if value is None:
+        return value
+    return force_text(value)
+
+
+def m2m_to_text(pks):
+    return [force_text(pk, strings_only=True) for pk in pks]
+
+
+def get_converter(field):
+    """
+    Return a function converting a values_list() value of field to what the
+    python serializer produces for it, None if the value is used as is.
+    Raise ValueError if field can't be serialized from values.
+    """
+    field_class = type(field)
+    if field.many_to_many or isinstance(field, models.FileField) or \
+            _unbound(field_class.value_from_object) is not \
+            _unbound(models.Field.value_from_object):
+        raise ValueError(field)
+    if isinstance(field, models.DurationField):
+        return duration_to_text
+    if _unbound(field_class.value_to_string) not in TEXT_VALUE_TO_STRING:
+        raise ValueError(field)
+    if isinstance(field, UNCHANGED_FIELDS):
+        return None
+    return value_to_text
+
+
+def get_format_converter(module, field, converter):
+    """
+    Return the converter of field serialized by the serializer module, the
+    pyyaml serializer writes times as text.
+    """
+    if module == 'django.core.serializers.pyyaml' and \
+            isinstance(field, models.TimeField):
+        return time_to_text
+    return converter
+
+
+def get_export_converter(field):
+    """
+    Return the converter of values of field that are only exported, never
+    loaded, like values of related objects. Values of fields that can't be
+    serialized from values are converted to text.
+    """
+    try:
+        return get_converter(field)
+    except ValueError:
+        return value_to_text
+
+
+def get_columns(format, queryset, fields=[]):
+    """
+    Return a list of (name, attname, converter) tuples for the fields of
+    queryset serialized in format, or None if it can't be serialized from
+    values. Relation paths in fields follow the fields of the model, named
+    and fetched by their path, many to many fields come last with an
+    attname of None.
+    """
+    if not hasattr(queryset, 'values_list') or queryset._fields is not None:
+        return None
+    module = serializers.get_serializer(format).__module__
+    if module not in VALUES_SERIALIZER_MODULES:
+        return None
+
+    # Select fields the way the serializer does.
+    concrete_model = queryset.model._meta.concrete_model
+    columns = []
+    for field in concrete_model._meta.local_fields:
+        if not field.serialize:
+            continue
+        if field.remote_field is None:
+            name = field.attname
+        else:
+            name = field.attname[:-3]
+        if fields and name not in fields:
+            continue
+        try:
+            converter = get_converter(field)
+        except ValueError:
+            return None
+        converter = get_format_converter(module, field, converter)
+        columns.append((field.name, field.attname, converter))
+    for path in fields or []:
+        if not relations.is_path(path):
+            continue
+        try:
+            field = relations.get_path_fields(concrete_model, path)[-1]
+        except FieldDoesNotExist:
+            return None
+        converter = get_format_converter(
+            module, field, get_export_converter(field)
+        )
+        columns.append((path, path, converter))
+    for field in prefetch.get_m2m_fields(concrete_model, fields):
+        columns.append((field.name, None, m2m_to_text))
+    return columns
+
+
+def values_queryset(queryset, columns):
+    """
+    Return queryset as a values_list() queryset of the primary key followed
+    by the values of columns, without many to many columns.
+    """
+    return queryset.values_list('pk', *[
+        column[1] for column in columns if column[1] is not None
+    ])
+
+
+def iter_rows(model, chunks, columns, using=None):
+    """
+    Yield the rows of chunks of values_queryset() rows with the lists of
+    primary keys related by the many to many columns appended, fetched with
+    one query per field and chunk.
+    """
+    meta = model._meta.concrete_model._meta
+    fields = [
+        meta.get_field(column[0]) for column in columns if column[1] is None
+    ]
+    for chunk in chunks:
+        if fields:
+            pks = [row[0] for row in chunk]
+            related = [
+                prefetch.get_related(field, pks, using) for field in fields
+            ]
+            chunk = [
+                row + tuple(pks.get(row[0], []) for pks in related)
+                for row in chunk
+            ]
+        for row in chunk:
+            yield row
+
+
+class ValuesRow(object):
+    """
+    Stand-in for a model instance passed to the serializer, which only
+    needs its options and primary key to build the serialized object.
+    """
+    __slots__ = ('_meta', 'pk')
+
+    def __init__(self, meta, pk):
+        self._meta = meta
+        self.pk = pk
+
+    def _get_pk_val(self):
+        return self.pk
+
+
+def serialize(format, model, rows, columns, **options):
+    """
+    Serialize rows of values fetched with values_queryset(), and
+    iter_rows() if there are many to many columns, in format.
+    """
+    serializer = serializers.get_serializer(format)()
+    serializer.options = options
+    serializer.stream = options.pop('stream', serializer.stream_class())
+    serializer.selected_fields = options.pop('fields', None)
+    serializer.use_natural_foreign_keys = False
+    serializer.use_natural_primary_keys = False
+
+    meta = model._meta
+    names = [column[0] for column in columns]
+    converters = [column[2] for column in columns]
+    serializer.start_serialization()
+    serializer.first = True
+    for row in rows:
+        values = [
+            value if converter is None else converter(value)
+            for converter, value in zip(converters, row[1:])
+        ]
+        serializer._current = OrderedDict(zip(names, values))
+        serializer.end_object(ValuesRow(meta, row[0]))
+        serializer.first = False
+    serializer.end_serialization()
+    return serializer.getvalue()
@@ -0,0 +1,120 @@
+"""
+Delta exports of only the objects added or changed since the last export.
+
+A watermark field is a field whose values only ever increase, an AutoField
+or a DateTimeField with auto_now or auto_now_add. After each delta export
+the highest value of the field exported is stored per user, model, filters
+and field, and the next delta export includes only objects with higher
+values.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.utils.encoding import force_text
+
+from export import cache, fields
+from export.models import Watermark
+
+
+def is_watermark_field(field):
+    if isinstance(field, models.AutoField):
+        return True
+    return isinstance(field, models.DateTimeField) and \
+        (field.auto_now or field.auto_now_add)
+
+
+def get_watermark_fields(model):
+    return [field for field in model._meta.fields if is_watermark_field(field)]
+
+
+def get_fingerprint(form, model):
+    """
+    Return a digest of model and the filters of an export form.
+    """
+    options = form.fieldsets[0][1]['fields']
+    return cache.fingerprint(model, dict(
+        (name, value) for name, value in form.cleaned_data.items()
+        if name not in options
+    ))
+
+
+def get_delta(form, model, user_id=None):
+    """
+    Return the Delta selected in an export form, None if all objects are
+    exported.
+    """
+    name = form.cleaned_data.get('export_delta_field')
+    if not name:
+        return None
+    return Delta(model, name, get_fingerprint(form, model), user_id)
+
+
+class Delta(object):
+    """
+    The objects of model with values of field name beyond the watermark
+    stored for user_id and filters fingerprint.
+    """
+
+    def __init__(self, model, name, fingerprint, user_id=None):
+        self.model = model
+        self.name = name
+        self.fingerprint = fingerprint
+        self.user_id = user_id
+        self.high = None
+
+    @property
+    def field(self):
+        return self.model._meta.get_field(self.name)
+
+    def get_lookup(self):
+        return {
+            'user_id': self.user_id,
+            'content_type': ContentType.objects.get_for_model(self.model),
+            'fingerprint': self.fingerprint,
+            'field': self.name,
+        }
+
+    def get_low(self):
+        """
+        Return the stored watermark, None if nothing was exported yet.
+        """
+        value = Watermark.objects.filter(
+            **self.get_lookup()
+        ).values_list('value', flat=True).first()
+        if value is None:
+            return None
+        return self.field.to_python(value)
+
+    def filter(self, queryset, high=None):
+        """
+        Filter queryset on objects beyond the stored watermark, up to high
+        or the highest value present now so objects added while exporting
+        are left for the next delta.
+        """
+        if high is None:
+            high = queryset.aggregate(high=models.Max(self.name))['high']
+        self.high = high
+        if self.high is None:
+            return queryset.none()
+        low = self.get_low()
+        queryset = fields.filter_range(self.name, (low, self.high), queryset)
+        if low is not None:
+            queryset = queryset.exclude(**{self.name: low})
+        return queryset
+
+    def commit(self):
+        """
+        Store the highest value exported by the last filtered queryset.
+        """
+        if self.high is None:
+            return
+        Watermark.objects.update_or_create(
+            defaults={'value': force_text(self.high)}, **self.get_lookup()
+        )
+
+    def commit_after(self, data):
+        """
+        Yield the chunks of data, committing once they are all consumed.
+        """
+        for chunk in data:
+            yield chunk
+        self.commit()
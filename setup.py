@@ -8,7 +8,7 @@ setup(
     author='Praekelt Consulting',
     author_email='dev@praekelt.com',
     url='http://github.com/praekelt/django-export',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks']),
     install_requires=[
         'django-object-tools',
         'pyyaml>=3.11'
@@ -21,7 +21,10 @@ INSTALLED_APPS = [
 ]
 
 SERIALIZATION_MODULES = {
-    'csv': 'export.serializers.csv_serializer'
+    'arrow': 'export.serializers.arrow_serializer',
+    'csv': 'export.serializers.csv_serializer',
+    'jsonl': 'export.serializers.jsonl_serializer',
+    'parquet': 'export.serializers.parquet_serializer',
 }
 
 EMAIL_BACKEND = 'django.core.mail.backends.dummy.EmailBackend'